@@ -3,55 +3,39 @@ Chat Controller com Agno Agent
 - Combina RAG (Knowledge Base) + Wren BI
 - Agent decide quando usar cada ferramenta
 - Mantém contexto da conversa
+- Contexto de cada turno dentro do orçamento de tokens do modelo
 """
 
+import asyncio
+import inspect
+import json
 import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
 from agno.agent import Agent
-from app.schemas.chat_schemas import ChatRequest, ChatResponse
+from agno.run.agent import RunEvent
+
+from app.schamas.chat_schemas import ChatRequest, ChatResponse
+from tools.WrenAi_tools import BI_TOOLS
+from utils.context_budget import ContextBudget, ContextUsage, context_assembler
 from utils.knowledge import knowledge
+from utils.knowledge_service import knowledge_service
 from utils.llm import LLMConfig
 from utils.settings import settings
-from wren_tools_improved import BI_TOOLS
 
 logger = logging.getLogger(__name__)
 
-# Agent global (singleton)
-_agent: Agent = None
-
-
-def get_agent(model_name: str = "llama-3.3-70b") -> Agent:
-    """
-    Obter ou criar agent que combina RAG + Wren BI
-    
-    Args:
-        model_name: Nome do modelo LLM
-    
-    Returns:
-        Agent configurado
-    """
-    global _agent
-    
-    # Reutilizar agent se já existe
-    if _agent is not None:
-        return _agent
-    
-    logger.info(f"🚀 Criando Agent com modelo: {model_name}")
-    
-    # Obter LLM
-    llm = LLMConfig.get_model(model_name)
-    
-    # Criar agent
-    _agent = Agent(
-        name="BI Intelligence Assistant",
-        model=llm,
-        knowledge=knowledge,  # RAG para buscar em documentos
-        
-        description="""
+# Instruções compartilhadas por todos os agents (montadas uma única vez)
+AGENT_DESCRIPTION = """
         Assistente inteligente de Business Intelligence.
         Combina análise de documentos com consultas de dados.
-        """,
-        
-        instructions="""
+        """
+
+AGENT_INSTRUCTIONS = """
         Você é um assistente de BI especializado que ajuda usuários a entender dados e documentos.
         
         COMPORTAMENTO:
@@ -80,27 +64,327 @@ def get_agent(model_name: str = "llama-3.3-70b") -> Agent:
         - Modelos LLM disponíveis: {available_models}
         - Modo debug: {debug_mode}
         """.format(
-            db_sources="sales, crm, analytics",
-            available_models=list(LLMConfig.list_models().keys()),
-            debug_mode=settings.debug_mode
-        ),
+    db_sources="sales, crm, analytics",
+    available_models=list(LLMConfig.list_models().keys()),
+    debug_mode=settings.debug_mode
+)
+
+DEFAULT_MODEL_NAME = "llama-3.3-70b"
+DEFAULT_SESSION_ID = "default"
+
+# Tool de busca do agno: a saída já foi limitada pelo knowledge_retriever
+KNOWLEDGE_TOOL_NAME = "search_knowledge_base"
+# Tool do agno que lê o histórico: ao truncar, manter as mensagens recentes
+CHAT_HISTORY_TOOL_NAME = "get_chat_history"
+# Tokens garantidos a cada saída de tool mesmo com o orçamento do run esgotado
+MIN_TOOL_OUTPUT_TOKENS = 200
+# Intervalo entre verificações de desconexão do cliente durante o stream
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Tokens das instruções do agent (iguais para todas as sessões)
+INSTRUCTIONS_TOKENS = context_assembler.count(AGENT_DESCRIPTION) + context_assembler.count(AGENT_INSTRUCTIONS)
+
+
+def _knowledge_retriever(budget: ContextBudget, usage: ContextUsage) -> Callable:
+    """Retriever do agent: busca híbrida com os chunks limitados ao orçamento de knowledge"""
+
+    async def retrieve(
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        documents = await knowledge_service.retrieve(query, num_documents=num_documents, filters=filters)
+        available = max(budget.knowledge_tokens - usage.knowledge, 0)
+        # Deduplicação e contagem de tokens fora do event loop
+        selected, tokens = await asyncio.to_thread(context_assembler.assemble_knowledge, documents, available)
+        usage.knowledge += tokens
+        usage.dropped_chunks += len(documents) - len(selected)
+        return selected
+
+    return retrieve
+
+
+def _tool_output_hook(budget: ContextBudget, usage: ContextUsage) -> Callable:
+    """Hook das tools: saídas somadas limitadas ao orçamento de tools do run"""
+
+    async def budget_tool_output(function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+        result = function_call(**arguments)
+        if inspect.isawaitable(result):
+            result = await result
+        if not isinstance(result, str) or function_name == KNOWLEDGE_TOOL_NAME:
+            return result
+
+        available = max(budget.tool_tokens - usage.tools, MIN_TOOL_OUTPUT_TOKENS)
+        keep = "tail" if function_name == CHAT_HISTORY_TOOL_NAME else "head"
+        compressed = await asyncio.to_thread(
+            context_assembler.compress_tool_output, result, available, keep=keep
+        )
+        if compressed != result:
+            usage.truncated_tools += 1
+            logger.info(f"✂️ Saída de {function_name} reduzida para caber no contexto ({available} tokens)")
+        usage.tools += context_assembler.count(compressed)
+        return compressed
+
+    return budget_tool_output
+
+
+def _build_agent(model_name: str, session_id: str, budget: ContextBudget, usage: ContextUsage) -> Agent:
+    """
+    Criar agent para uma sessão reaproveitando os componentes pesados
+    (cliente LLM, knowledge base e tools são compartilhados)
+
+    Args:
+        model_name: Nome do modelo LLM
+        session_id: ID da sessão de chat
+        budget: Orçamento de contexto do modelo
+        usage: Tokens do turno atual (atualizado pelo retriever e pelo hook das tools)
+
+    Returns:
+        Agent configurado
+    """
+    return Agent(
+        name="BI Intelligence Assistant",
+        model=LLMConfig.get_shared_model(model_name),
+        knowledge=knowledge,  # RAG para buscar em documentos
+        knowledge_retriever=_knowledge_retriever(budget, usage),  # Busca híbrida (BM25 + denso)
+        session_id=session_id,
+        cache_session=True,  # Histórico da sessão em memória
+        
+        description=AGENT_DESCRIPTION,
+        instructions=AGENT_INSTRUCTIONS,
         
         # Tools disponíveis
         tools=BI_TOOLS,
+        tool_hooks=[_tool_output_hook(budget, usage)],  # Saídas dentro do orçamento
         
         # Configurações
         markdown=True,
         search_knowledge=True,  # Habilitar RAG
         read_chat_history=True,  # Manter contexto
+        add_history_to_context=True,  # Turnos recentes (quantidade definida a cada run)
+        max_tool_calls_from_history=settings.context_history_tool_calls,
         debug_mode=settings.debug_mode,
         
         # Limites
-        max_iterations=10,  # Máximo de tool calls
-        max_tokens=2000,  # Máximo de tokens na resposta
+        tool_call_limit=10,  # Máximo de tool calls por run
+        # Máximo de tokens na resposta: AGENT_MAX_TOKENS, aplicado no modelo (utils/llm.py)
     )
+
+
+@dataclass
+class AgentSession:
+    """Estado de uma sessão de chat dentro do pool"""
+    session_id: str
+    model_name: str
+    agent: Agent
+    budget: ContextBudget
+    usage: ContextUsage
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    runs: int = 0
+
+
+class AgentPool:
+    """
+    Pool de agents por (session_id, modelo) com limite e despejo LRU
+
+    - Cada sessão tem seu próprio Agent (histórico isolado)
+    - Runs da mesma sessão são serializados pelo lock da sessão
+    - Sessões menos usadas recentemente são descartadas ao atingir o limite
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._sessions: OrderedDict[Tuple[str, str], AgentSession] = OrderedDict()
+        self._created = 0
+        self._evictions = 0
+
+    def find(self, session_id: str, model_name: str) -> Optional[AgentSession]:
+        """Sessão existente para o par (session_id, modelo), sem criar"""
+        key = (session_id, model_name)
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            session.last_used = time.monotonic()
+        return session
+
+    def get(self, session_id: str, model_name: str) -> AgentSession:
+        """
+        Obter (ou criar) a sessão para o par (session_id, modelo)
+
+        Args:
+            session_id: ID da sessão de chat
+            model_name: Nome do modelo LLM
+
+        Returns:
+            AgentSession da sessão
+        """
+        session = self.find(session_id, model_name)
+        if session is not None:
+            return session
+
+        logger.info(f"🚀 Criando Agent para sessão {session_id} com modelo: {model_name}")
+        budget = context_assembler.budget_for(model_name, settings.agent_max_tokens)
+        usage = ContextUsage()
+        session = AgentSession(
+            session_id=session_id,
+            model_name=model_name,
+            agent=_build_agent(model_name, session_id, budget, usage),
+            budget=budget,
+            usage=usage,
+        )
+        self._sessions[(session_id, model_name)] = session
+        self._created += 1
+
+        while len(self._sessions) > self.max_size:
+            evicted_key, evicted = self._sessions.popitem(last=False)
+            self._evictions += 1
+            logger.info(f"♻️ Sessão despejada do pool: {evicted_key[0]} ({evicted.model_name})")
+
+        return session
+
+    def remove(self, session_id: str) -> int:
+        """Remover todas as entradas de uma sessão (qualquer modelo)"""
+        keys = [key for key in self._sessions if key[0] == session_id]
+        for key in keys:
+            del self._sessions[key]
+        return len(keys)
+
+    def clear(self):
+        """Remover todas as sessões"""
+        self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool"""
+        return {
+            "sessions": len(self._sessions),
+            "max_size": self.max_size,
+            "created": self._created,
+            "evictions": self._evictions,
+            "busy": sum(1 for s in self._sessions.values() if s.lock.locked()),
+        }
+
+
+# Pool global de agents
+_agent_pool = AgentPool(max_size=settings.agent_pool_max_size)
+
+# Sessões criadas para requests sem session_id (pool separado e menor)
+_anonymous_pool = AgentPool(max_size=settings.agent_pool_anonymous_max_size)
+
+
+def _get_session(request: ChatRequest) -> AgentSession:
+    """
+    Resolver a sessão de um request de chat
+
+    Requests sem session_id recebem uma sessão nova, evitando que
+    usuários anônimos compartilhem o mesmo histórico. Essas sessões ficam
+    no pool anônimo, então tráfego anônimo não despeja sessões nomeadas;
+    o id gerado volta na resposta e pode ser reenviado para continuar a
+    conversa enquanto a sessão estiver no pool.
+    """
+    model_name = request.model or DEFAULT_MODEL_NAME
+    if request.session_id is None:
+        return _anonymous_pool.get(str(uuid.uuid4()), model_name)
+
+    session = _anonymous_pool.find(request.session_id, model_name)
+    if session is not None:
+        return session
+    return _agent_pool.get(request.session_id, model_name)
+
+
+def get_agent(model_name: str = DEFAULT_MODEL_NAME, session_id: str = DEFAULT_SESSION_ID) -> Agent:
+    """
+    Obter ou criar agent que combina RAG + Wren BI
     
-    logger.info("✓ Agent criado com sucesso")
-    return _agent
+    Args:
+        model_name: Nome do modelo LLM
+        session_id: ID da sessão de chat
+    
+    Returns:
+        Agent configurado
+    """
+    return _agent_pool.get(session_id, model_name).agent
+
+
+def _knowledge_filters(request: ChatRequest) -> Optional[Dict[str, Any]]:
+    """Filtros das buscas do agent na knowledge base (repassados ao knowledge_retriever)"""
+    return request.knowledge_filters.to_dict() if request.knowledge_filters else None
+
+
+def validate_chat_request(request: ChatRequest) -> None:
+    """
+    Validar a requisição antes de rodar o agent (ou de iniciar o streaming)
+
+    Raises:
+        ValueError: Filtros de busca desconhecidos
+    """
+    knowledge_service.build_filter(_knowledge_filters(request))
+
+
+async def _session_turns(session: AgentSession) -> List[Tuple[str, str]]:
+    """Turnos anteriores da sessão: [(mensagem do usuário, resposta)]"""
+    try:
+        messages = await session.agent.aget_chat_history(session_id=session.session_id)
+    except Exception as e:
+        logger.debug(f"Histórico da sessão {session.session_id} indisponível: {e}")
+        return []
+
+    turns: List[List[str]] = []
+    for message in messages:
+        if message.role == "user":
+            turns.append([message.get_content_string(), ""])
+        elif message.role == "assistant" and turns:
+            turns[-1][1] += message.get_content_string()
+    return [(user_message, answer) for user_message, answer in turns]
+
+
+async def _prepare_context(session: AgentSession, message: str) -> None:
+    """
+    Ajustar o histórico do próximo run ao orçamento do modelo
+
+    Chamado com o lock da sessão: define quantos turnos recentes entram no
+    prompt e resume os que ficaram de fora.
+    """
+    budget, usage, agent = session.budget, session.usage, session.agent
+    usage.reset()
+    usage.instructions = INSTRUCTIONS_TOKENS
+    usage.message = context_assembler.count(message)
+
+    reserved = usage.instructions + usage.message + budget.knowledge_tokens + budget.tool_tokens
+    if reserved + budget.summary_tokens > budget.input_tokens:
+        logger.warning(
+            f"⚠️ Mensagem de ~{usage.message} tokens deixa pouco espaço no contexto "
+            f"({budget.input_tokens} tokens de entrada)"
+        )
+    history_tokens = max(min(budget.history_tokens, budget.input_tokens - reserved - budget.summary_tokens), 0)
+
+    turns = await _session_turns(session)
+    kept, summary, used = context_assembler.trim_history(turns, history_tokens, budget.summary_tokens)
+    agent.add_history_to_context = kept > 0
+    agent.num_history_runs = kept or None
+    agent.additional_context = summary
+    usage.history, usage.history_runs = used, kept
+    usage.summary = context_assembler.count(summary)
+
+
+def _usage_payload(session: AgentSession, metrics: Any) -> Dict[str, Any]:
+    """
+    Tokens do turno: reportados pelo Groq (soma das chamadas ao modelo no
+    run) e estimativa do contexto montado
+    """
+    payload = {
+        "prompt_tokens": getattr(metrics, "input_tokens", None),
+        "completion_tokens": getattr(metrics, "output_tokens", None),
+        "input_budget": session.budget.input_tokens,
+        "context": session.usage.to_dict(),
+    }
+    logger.info(
+        f"🧮 Contexto: ~{session.usage.total} tokens estimados (orçamento {session.budget.input_tokens}, "
+        f"{session.usage.history_runs} turnos no histórico), prompt_tokens={payload['prompt_tokens']}"
+    )
+    return payload
 
 
 async def chat_with_agent(request: ChatRequest) -> ChatResponse:
@@ -116,14 +400,23 @@ async def chat_with_agent(request: ChatRequest) -> ChatResponse:
     try:
         logger.info(f"💬 Nova mensagem: {request.message[:60]}...")
         
-        # Obter agent
-        agent = get_agent(request.model)
+        # Obter sessão (agent isolado por session_id + modelo)
+        session = _get_session(request)
         
         # Executar agent
         logger.debug(f"Model: {request.model}")
+        logger.debug(f"Session: {session.session_id}")
         logger.debug(f"Stream: {request.stream}")
         
-        response = await agent.arun(request.message)
+        async with session.lock:
+            session.runs += 1
+            await _prepare_context(session, request.message)
+            response = await session.agent.arun(
+                request.message,
+                session_id=session.session_id,
+                knowledge_filters=_knowledge_filters(request),
+            )
+            usage = _usage_payload(session, getattr(response, "metrics", None))
         
         # Extrair texto da resposta
         response_text = response.content if hasattr(response, 'content') else str(response)
@@ -132,7 +425,9 @@ async def chat_with_agent(request: ChatRequest) -> ChatResponse:
         
         return ChatResponse(
             response=response_text,
-            model=request.model
+            model=request.model,
+            session_id=session.session_id,
+            usage=usage,
         )
         
     except Exception as e:
@@ -140,44 +435,182 @@ async def chat_with_agent(request: ChatRequest) -> ChatResponse:
         raise
 
 
-async def chat_stream_generator(request: ChatRequest):
+def _sse(event: str, data: dict) -> str:
+    """Formatar um evento Server-Sent Events"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _watch_disconnect(is_disconnected: Callable[[], Awaitable[bool]]) -> None:
+    """Retornar quando o cliente desconectar (verificação periódica)"""
+    while not await is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def _next_event(stream: AsyncIterator[Any], watcher: Optional[asyncio.Task]) -> Tuple[bool, Any]:
     """
-    Gerar resposta em streaming
-    
+    Aguardar o próximo evento do agent ou a desconexão do cliente
+
+    Returns:
+        (False, evento) ou (True, None) se o stream acabou ou o cliente desconectou
+    """
+    if watcher is None:
+        try:
+            return False, await stream.__anext__()
+        except StopAsyncIteration:
+            return True, None
+
+    pending = asyncio.ensure_future(stream.__anext__())
+    await asyncio.wait({pending, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if not pending.done():
+        # Cliente saiu no meio de uma tool call/geração lenta: interromper a espera
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        return True, None
+    try:
+        return False, pending.result()
+    except StopAsyncIteration:
+        return True, None
+
+
+def _tool_payload(tool: Any) -> dict:
+    """Extrair dados serializáveis de uma execução de tool"""
+    if tool is None:
+        return {}
+    return {
+        "id": getattr(tool, "tool_call_id", None),
+        "name": getattr(tool, "tool_name", None),
+        "args": getattr(tool, "tool_args", None),
+        "error": getattr(tool, "tool_call_error", None),
+    }
+
+
+async def chat_stream_generator(
+    request: ChatRequest,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Gerar resposta em streaming (SSE) a partir dos eventos do Agent
+
+    Eventos emitidos:
+    - token: delta de conteúdo gerado pelo modelo
+    - tool_start: início de uma chamada de ferramenta
+    - tool_end: fim de uma chamada de ferramenta
+    - error: falha durante a execução
+    - done: fim do stream (com o uso de tokens do turno)
+
+    O generator só avança o stream do agent quando o cliente consome o
+    evento anterior (backpressure natural do StreamingResponse). A
+    desconexão é observada por uma task separada, inclusive durante uma
+    tool call lenta: a execução do agent é cancelada (sem continuar
+    consumindo tokens do Groq e queries no Wren) e o lock da sessão é
+    liberado sem esperar o próximo evento.
+
     Args:
         request: ChatRequest
-    
+        is_disconnected: Callable que indica se o cliente desconectou
+
     Yields:
-        Chunks de texto da resposta
+        Eventos SSE formatados
     """
+    run_id = str(uuid.uuid4())
+    finished = False
+    stream = None
+    watcher = None
+
     try:
         logger.info(f"🎬 Iniciando stream para: {request.message[:60]}...")
-        
-        agent = get_agent(request.model)
-        
-        # Streaming não é natively suportado em agno,
-        # então fazemos "fake streaming" enviando chunks
-        response = await agent.arun(request.message)
-        response_text = response.content if hasattr(response, 'content') else str(response)
-        
-        # Dividir em chunks e enviar
-        chunk_size = 100
-        for i in range(0, len(response_text), chunk_size):
-            chunk = response_text[i:i + chunk_size]
-            yield chunk
-            
-        logger.info("✓ Stream finalizado")
-        
+
+        session = _get_session(request)
+
+        async with session.lock:
+            session.runs += 1
+            await _prepare_context(session, request.message)
+            stream = session.agent.arun(
+                request.message,
+                stream=True,
+                stream_events=True,
+                run_id=run_id,
+                session_id=session.session_id,
+                knowledge_filters=_knowledge_filters(request),
+            )
+
+            if is_disconnected is not None:
+                watcher = asyncio.create_task(_watch_disconnect(is_disconnected))
+
+            while True:
+                ended, event = await _next_event(stream, watcher)
+                if watcher is not None and watcher.done():
+                    logger.info(f"🔌 Cliente desconectou, cancelando run {run_id}")
+                    break
+                if ended:
+                    break
+
+                event_type = getattr(event, "event", None)
+
+                if event_type == RunEvent.run_content.value:
+                    if event.content:
+                        yield _sse("token", {"content": event.content})
+
+                elif event_type == RunEvent.tool_call_started.value:
+                    yield _sse("tool_start", _tool_payload(event.tool))
+
+                elif event_type == RunEvent.tool_call_completed.value:
+                    yield _sse("tool_end", _tool_payload(event.tool))
+
+                elif event_type == RunEvent.run_error.value:
+                    yield _sse("error", {"message": event.content})
+
+                elif event_type == RunEvent.run_completed.value:
+                    finished = True
+                    yield _sse("done", {
+                        "run_id": run_id,
+                        "model": request.model,
+                        "session_id": session.session_id,
+                        "usage": _usage_payload(session, getattr(event, "metrics", None)),
+                    })
+
+        if finished:
+            logger.info("✓ Stream finalizado")
+
+    except asyncio.CancelledError:
+        logger.info(f"🔌 Stream cancelado pelo servidor, run {run_id}")
+        raise
+
     except Exception as e:
         logger.error(f"❌ Erro no stream: {e}")
-        yield f"Erro: {e}"
+        yield _sse("error", {"message": str(e)})
+
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if not finished:
+            # Interromper o run do agent (tool calls e geração em andamento)
+            Agent.cancel_run(run_id)
+        if stream is not None and hasattr(stream, "aclose"):
+            await stream.aclose()
+
+
+def reset_agent(session_id: Optional[str] = None):
+    """
+    Resetar agents (útil para testes ou mudança de modelo)
+
+    Args:
+        session_id: Sessão a resetar (todas se não informado)
+    """
+    if session_id is None:
+        _agent_pool.clear()
+        _anonymous_pool.clear()
+        logger.info("✓ Agents resetados")
+    else:
+        _agent_pool.remove(session_id)
+        _anonymous_pool.remove(session_id)
+        logger.info(f"✓ Agent da sessão {session_id} resetado")
 
 
-def reset_agent():
-    """Resetar agent (útil para testes ou mudança de modelo)"""
-    global _agent
-    _agent = None
-    logger.info("✓ Agent resetado")
+def get_agent_pool_stats() -> Dict[str, Any]:
+    """Obter estatísticas do pool de agents"""
+    return {**_agent_pool.get_stats(), "anonymous": _anonymous_pool.get_stats()}
 
 
 async def get_agent_info() -> dict:
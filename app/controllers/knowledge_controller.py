@@ -2,12 +2,19 @@
 Controllers para operações de knowledge base
 """
 
+import asyncio
+import hashlib
+import json
+import logging
 import os
-import tempfile
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+from urllib.parse import urlparse
 
 from agno.knowledge.chunking.recursive import RecursiveChunking
-from agno.knowledge.reader.json_reader import JSONReader
-from agno.knowledge.reader.pdf_reader import PDFReader
+from agno.knowledge.chunking.strategy import ChunkingStrategy
+from agno.knowledge.document.base import Document
 from agno.knowledge.reader.website_reader import WebsiteReader
 from fastapi import UploadFile
 
@@ -15,238 +22,562 @@ from app.schamas.document_schemas import (
     AddContentResponse,
     AddURLRequest,
     DocumentItem,
+    IngestionJobResponse,
     KnowledgeStatusResponse,
     ListDocumentsResponse,
 )
-from utils.knowledge import knowledge
+from utils.crawler import PageCache, WebCrawler
+from utils.embedding_service import embedding_service
+from utils.hash_index import chunk_hash, chunk_hash_index
+from utils.ingestion_jobs import IngestionJob, IngestionJobQueue, JobStore, ProgressCallback
+from utils.knowledge_service import decode_cursor, encode_cursor, knowledge_service
+from utils.reranker import reranker
 from utils.settings import settings
-from utils.vector_db import vector_db
+from utils.streaming_readers import (
+    abatch,
+    close_pdf_pool,
+    iter_batches_in_thread,
+    iter_json_documents,
+    iter_pdf_documents_parallel,
+    prefetch,
+)
+from utils.vector_db import get_batch_writer
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos ao copiar uploads para o disco
+_SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Um job por origem de cada vez (o índice de hashes é por origem)
+_source_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Cache de páginas do crawler (GET condicional), aberto sob demanda
+_page_cache: Optional[PageCache] = None
+
+
+def _chunking_strategy(content_type: str) -> ChunkingStrategy:
+    """Estratégia de chunking para o tipo de conteúdo"""
+    if content_type == "url":
+        return RecursiveChunking(chunk_size=1000, overlap=100)
+    if content_type == "json":
+        # Configuração otimizada para chunks menores e mais focados
+        return RecursiveChunking(
+            chunk_size=settings.json_chunk_size,  # Chunks menores para dados estruturados
+            overlap=settings.json_overlap,  # Overlap menor
+        )
+    if content_type == "pdf":
+        return RecursiveChunking()
+    raise ValueError(f"Tipo de conteúdo não suportado: {content_type}")
+
+
+def _get_crawler(job: IngestionJob) -> WebCrawler:
+    """Crawler assíncrono configurado para o job"""
+    global _page_cache
+    if _page_cache is None and settings.crawler_cache_path:
+        _page_cache = PageCache(settings.crawler_cache_path)
+
+    return WebCrawler(
+        max_depth=job.params.get("max_depth", 1),
+        max_links=job.params.get("max_links", 10),
+        concurrency=settings.crawler_concurrency,
+        per_host_concurrency=settings.crawler_per_host_concurrency,
+        per_host_delay=settings.crawler_per_host_delay,
+        timeout=settings.crawler_timeout,
+        user_agent=settings.crawler_user_agent,
+        respect_robots=settings.crawler_respect_robots,
+        cache=_page_cache,
+    )
+
+
+async def _iter_crawled_chunks(
+    crawler: WebCrawler, start_url: str, chunking_strategy: ChunkingStrategy
+) -> AsyncIterator[Document]:
+    """Chunks das páginas do crawl, à medida que cada página chega"""
+    async for page in crawler.crawl(start_url):
+        if not page.text:
+            continue
+        document = Document(
+            name=page.url,
+            id=page.url,
+            meta_data={"url": page.url},
+            content=page.text,
+        )
+        for chunk in chunking_strategy.chunk(document):
+            yield chunk
+
+
+async def _iter_batches(
+    job: IngestionJob, batch_size: int, crawler: Optional[WebCrawler] = None
+) -> AsyncIterator[List[Document]]:
+    """
+    Lotes de chunks do job sob demanda
+
+    Arquivos são lidos do spool de forma incremental (PDF em faixas de
+    páginas num pool de processos, JSON item a item). URLs usam o crawler
+    assíncrono informado (ou o WebsiteReader, sem crawler).
+    """
+    chunking_strategy = _chunking_strategy(job.content_type)
+
+    if job.content_type == "url":
+        if crawler is not None:
+            return abatch(_iter_crawled_chunks(crawler, job.source, chunking_strategy), batch_size)
+
+        reader = WebsiteReader(
+            max_depth=job.params.get("max_depth", 1),
+            max_links=job.params.get("max_links", 10),
+            chunking_strategy=chunking_strategy
+        )
+        chunks = iter(await reader.async_read(job.source))
+    else:
+        name = os.path.splitext(job.params.get("filename") or job.source)[0].replace(" ", "_")
+        if job.content_type == "pdf":
+            chunks = iter_pdf_documents_parallel(
+                job.spool_path,
+                name,
+                chunking_strategy,
+                workers=settings.pdf_parse_workers,
+                pages_per_task=settings.pdf_pages_per_task,
+            )
+        else:
+            chunks = iter_json_documents(job.spool_path, name, chunking_strategy)
+
+    return iter_batches_in_thread(chunks, batch_size)
+
+
+async def _known_hashes(source: str) -> Set[str]:
+    """Hashes já gravados de uma origem (índice local, reconstruído do Qdrant se ausente)"""
+    if await asyncio.to_thread(chunk_hash_index.has_source, source):
+        return await asyncio.to_thread(chunk_hash_index.get_hashes, source)
+
+    hashes = await knowledge_service.get_source_hashes(source)
+    if hashes:
+        await asyncio.to_thread(chunk_hash_index.add, source, hashes)
+    return hashes
+
+
+async def _process_ingestion_job(job: IngestionJob, update: ProgressCallback) -> None:
+    """
+    Executar um job de ingestão: leitura/chunking, embedding e upsert
+
+    Pipeline em lotes de `ingestion_batch_size`: o próximo lote é lido
+    enquanto o atual é embedado e gravado, então no máximo dois lotes ficam
+    em memória.
+
+    Metadados gravados em cada chunk (filtros de busca): source,
+    content_type, ingested_at, tags e, para URLs, o domínio da página.
+
+    Deduplicação por hash do chunk (guardado em meta_data.chunk_hash junto
+    de meta_data.source):
+    - chunks já gravados para a origem são pulados (sem embedding); só
+      ingested_at e tags são atualizados no payload
+    - chunks novos ou alterados são gravados
+    - chunks que sumiram da origem são removidos ao final, desde que a
+      leitura tenha visto a origem inteira (crawl sem falhas nem links
+      descartados; o WebsiteReader não informa isso, então nada é removido)
+
+    Os pontos vão para o Qdrant pelo QdrantBatchWriter (lotes paralelos);
+    os hashes de cada lote entram no índice assim que o upsert do lote é
+    confirmado. Se o job for interrompido (ou um upsert falhar), a nova
+    tentativa pula os lotes já gravados e regrava só o restante (ids
+    estáveis, sem duplicar).
+    """
+    source = job.source
+
+    async with _source_locks[source]:
+        update(job, stage="reading", chunks_processed=0, chunks_skipped=0, resumed_from=0)
+        crawler = _get_crawler(job) if job.content_type == "url" and settings.crawler_enabled else None
+        batches = prefetch(await _iter_batches(job, settings.ingestion_batch_size, crawler))
+        known = await _known_hashes(source)
+
+        # Mesmo content_hash para a mesma origem (ids dos pontos estáveis).
+        # Cada lote é um upsert simples: nada é apagado por content_hash
+        # (o async_upsert do agno apagaria os lotes anteriores da origem);
+        # remoções só dos hashes que sumiram, ao final
+        content_hash = hashlib.md5(f"{job.content_type}:{source}".encode()).hexdigest()
+        update(job, stage="indexing")
+
+        async def record_written(documents: List[Document]) -> None:
+            await asyncio.to_thread(chunk_hash_index.add, source, [doc.id for doc in documents])
+
+        writer = get_batch_writer(on_written=record_written)
+        meta_data: Dict[str, Any] = {
+            "source": source,
+            "content_type": job.content_type,
+            "ingested_at": time.time(),
+            "tags": job.params.get("tags") or [],
+        }
+        seen: Set[str] = set()
+        processed = skipped = 0
+        added = job.chunks_added
+        refresh = {"ingested_at": meta_data["ingested_at"], "tags": meta_data["tags"]}
+        async for batch in batches:
+            new_chunks = []
+            unchanged = []
+            for chunk in batch:
+                digest = chunk_hash(chunk.content)
+                if digest in seen or digest in known:
+                    skipped += 1
+                    if digest not in seen:
+                        unchanged.append(digest)
+                else:
+                    chunk.id = digest
+                    chunk.meta_data.update(meta_data, chunk_hash=digest)
+                    if job.content_type == "url":
+                        chunk.meta_data["domain"] = urlparse(chunk.meta_data.get("url") or source).netloc
+                    new_chunks.append(chunk)
+                seen.add(digest)
+
+            if new_chunks:
+                await writer.add(new_chunks, content_hash)
+                added += len(new_chunks)
+            if unchanged:
+                await knowledge_service.update_chunks_metadata(source, unchanged, refresh)
+
+            processed += len(batch)
+            update(job, chunks_processed=processed, chunks_added=added, chunks_skipped=skipped)
+
+        # Barreira: ao retornar, todos os pontos do job estão gravados e indexados
+        await writer.flush()
+        update(job, points_per_second=writer.get_stats()["points_per_second"])
+
+        vanished = known - seen
+        complete = job.content_type != "url" or (crawler is not None and crawler.complete)
+        if vanished and not complete:
+            logger.warning(
+                f"⚠️ Leitura parcial de {source}: {len(vanished)} chunks ausentes mantidos "
+                "(falhas no crawl ou limite de links)"
+            )
+            vanished = set()
+        if vanished:
+            update(job, stage="cleanup")
+            await knowledge_service.delete_chunks(source, vanished)
+            await asyncio.to_thread(chunk_hash_index.remove, source, vanished)
+
+        update(job, chunks_total=processed, chunks_removed=len(vanished))
+
+
+_ingestion_queue: Optional[IngestionJobQueue] = None
+
+
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Obter fila de ingestão singleton"""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        _ingestion_queue = IngestionJobQueue(
+            handler=_process_ingestion_job,
+            store=JobStore(settings.ingestion_jobs_dir),
+            workers=settings.ingestion_workers,
+            keep_finished=settings.ingestion_jobs_keep_finished,
+        )
+    return _ingestion_queue
+
+
+async def start_ingestion_workers() -> None:
+    """Iniciar workers de ingestão e retomar jobs pendentes (startup da aplicação)"""
+    await get_ingestion_queue().start()
+
+
+async def stop_ingestion_workers() -> None:
+    """Parar workers de ingestão (shutdown da aplicação)"""
+    if _ingestion_queue is not None:
+        await _ingestion_queue.stop()
+    close_pdf_pool()
+
+
+async def _spool_upload(file: UploadFile, job: IngestionJob, suffix: str) -> str:
+    """
+    Salvar o arquivo enviado junto ao estado do job (cópia em blocos, memória limitada)
+
+    Returns:
+        Hash (SHA-256) do conteúdo
+    """
+    job.spool_path = get_ingestion_queue().store.spool_path(job.id, suffix)
+    return await asyncio.to_thread(_copy_upload, file, job.spool_path)
+
+
+def _copy_upload(file: UploadFile, path: str) -> str:
+    digest = hashlib.sha256()
+    file.file.seek(0)
+    with open(path, "wb") as out:
+        while block := file.file.read(_SPOOL_CHUNK_SIZE):
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest()
+
+
+async def _submit_upload(
+    file: UploadFile,
+    content_type: str,
+    suffix: str,
+    tags: Optional[List[str]],
+    source_id: Optional[str],
+) -> IngestionJob:
+    """
+    Salvar o upload e enfileirar o job
+
+    A origem (chave da deduplicação e da remoção de chunks) é o `source_id`
+    informado, para que um reenvio substitua a versão anterior, ou o nome
+    do arquivo com o hash do conteúdo: arquivos diferentes com o mesmo nome
+    não removem os chunks um do outro.
+    """
+    job = IngestionJob(
+        content_type=content_type,
+        source=source_id or "",
+        params={"tags": tags or [], "filename": file.filename},
+    )
+    digest = await _spool_upload(file, job, suffix)
+    if not source_id:
+        job.source = f"{file.filename}#{digest[:16]}"
+    await get_ingestion_queue().submit(job)
+    return job
+
+
+def _job_response(job: IngestionJob, message: str) -> AddContentResponse:
+    return AddContentResponse(
+        success=True,
+        message=message,
+        content_type=job.content_type,
+        details={"source": job.source, **job.params},
+        job_id=job.id,
+    )
 
 
 async def add_url_to_knowledge(request: AddURLRequest) -> AddContentResponse:
     """
-    Adiciona conteúdo de uma URL à base de conhecimento
+    Enfileira a ingestão de uma URL na base de conhecimento
     
     Args:
         request: Requisição com URL e configurações
         
     Returns:
-        AddContentResponse com status da operação
+        AddContentResponse com o id do job de ingestão
     """
-    reader = WebsiteReader(
-        max_depth=request.max_depth,
-        max_links=request.max_links,
-        chunking_strategy=RecursiveChunking(chunk_size=1000, overlap=100)
-    )
-
-    await knowledge.add_content_async(
-        url=str(request.url),
-        reader=reader
-        
-    )
-    
-    return AddContentResponse(
-        success=True,
-        message="URL adicionada com sucesso",
+    job = IngestionJob(
         content_type="url",
-        details={
-            "url": str(request.url),
-            "max_depth": request.max_depth,
-            "max_links": request.max_links
-        }
+        source=str(request.url),
+        params={"max_depth": request.max_depth, "max_links": request.max_links, "tags": request.tags},
     )
+    await get_ingestion_queue().submit(job)
+    
+    return _job_response(job, "URL enfileirada para ingestão")
 
 
-async def add_json_to_knowledge(file: UploadFile) -> AddContentResponse:
+async def add_json_to_knowledge(
+    file: UploadFile,
+    tags: Optional[List[str]] = None,
+    source_id: Optional[str] = None,
+) -> AddContentResponse:
     """
-    Adiciona conteúdo de um arquivo JSON à base de conhecimento
+    Enfileira a ingestão de um arquivo JSON na base de conhecimento
     
     Args:
         file: Arquivo JSON enviado
+        tags: Tags gravadas nos chunks (filtro de busca)
+        source_id: Id estável da origem (padrão: nome + hash do conteúdo)
         
     Returns:
-        AddContentResponse com status da operação
+        AddContentResponse com o id do job de ingestão
     """
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-
-        # Configuração otimizada para chunks menores e mais focados
-        reader = JSONReader(
-            chunking_strategy=RecursiveChunking(
-                chunk_size=settings.json_chunk_size,  # Chunks menores para dados estruturados
-                overlap=settings.json_overlap,  # Overlap menor
-            )
-        )
-        await knowledge.add_content_async(
-            path=tmp_path,
-            reader=reader
-        )
-        
-        
-        return AddContentResponse(
-            success=True,
-            message="Arquivo JSON adicionado com sucesso",
-            content_type="json",
-            details={"filename": file.filename}
-        )
+    job = await _submit_upload(file, "json", ".json", tags, source_id)
     
-    finally:
-        # Remove arquivo temporário
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    return _job_response(job, "Arquivo JSON enfileirado para ingestão")
 
 
-async def add_pdf_to_knowledge(file: UploadFile) -> AddContentResponse:
+async def add_pdf_to_knowledge(
+    file: UploadFile,
+    tags: Optional[List[str]] = None,
+    source_id: Optional[str] = None,
+) -> AddContentResponse:
     """
-    Adiciona conteúdo de um arquivo PDF à base de conhecimento
+    Enfileira a ingestão de um arquivo PDF na base de conhecimento
     
     Args:
         file: Arquivo PDF enviado
+        tags: Tags gravadas nos chunks (filtro de busca)
+        source_id: Id estável da origem (padrão: nome + hash do conteúdo)
         
     Returns:
-        AddContentResponse com status da operação
-    """
-    tmp_path = None
-    try:
-        # Salva arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-        
-        # Adiciona ao knowledge
-        reader = PDFReader(
-        chunking_strategy=RecursiveChunking()     
-        )
+        AddContentResponse com o id do job de ingestão
+    """
+    job = await _submit_upload(file, "pdf", ".pdf", tags, source_id)
+    
+    return _job_response(job, "Arquivo PDF enfileirado para ingestão")
 
-        await knowledge.add_content_async(
-            path=tmp_path,
-            reader=reader
-        )
+
+def get_ingestion_job(job_id: str) -> Optional[IngestionJobResponse]:
+    """
+    Retorna estado e progresso de um job de ingestão
+    
+    Args:
+        job_id: Id do job
         
-        return AddContentResponse(
-            success=True,
-            message="Arquivo PDF adicionado com sucesso",
-            content_type="pdf",
-            details={"filename": file.filename}
-        )
+    Returns:
+        IngestionJobResponse ou None se o job não existir
+    """
+    job = get_ingestion_queue().get(job_id)
+    return IngestionJobResponse(**job.to_dict()) if job else None
+
+
+def list_ingestion_jobs(limit: int = 50) -> List[IngestionJobResponse]:
+    """Lista os jobs de ingestão mais recentes"""
+    return [IngestionJobResponse(**job.to_dict()) for job in get_ingestion_queue().list(limit)]
+
+
+def cancel_ingestion_job(job_id: str) -> Optional[IngestionJobResponse]:
+    """
+    Cancela um job de ingestão enfileirado ou em execução
     
-    finally:
-        # Remove arquivo temporário
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    Args:
+        job_id: Id do job
+        
+    Returns:
+        IngestionJobResponse ou None se o job não existir
+    """
+    job = get_ingestion_queue().cancel(job_id)
+    return IngestionJobResponse(**job.to_dict()) if job else None
 
 
-def get_knowledge_status() -> KnowledgeStatusResponse:
+async def get_knowledge_status() -> KnowledgeStatusResponse:
     """
     Retorna status da base de conhecimento
     
     Returns:
         KnowledgeStatusResponse com informações da base
     """
-    # Tenta obter informações do vector DB
-    collection_info = vector_db.client.get_collection(vector_db.collection)
-    # print(collection_info)
-    print(vector_db.collection)
+    # Contagem exata (a listagem usa a aproximada, em cache)
+    total = await knowledge_service.get_points_count(exact=True)
     
     return KnowledgeStatusResponse(
-        total_documents=collection_info.points_count,
-        collection_name=vector_db.collection,
+        total_documents=total,
+        collection_name=knowledge_service.collection,
         embedder_model=settings.embedder_model,
     )
 
 
-def clear_knowledge_base() -> dict:
+async def clear_knowledge_base() -> dict:
     """
     Limpa toda a base de conhecimento
     
     Returns:
         Dict com status da operação
     """
-    vector_db.client.delete_collection(vector_db.collection)
-    
-    # Recria a coleção
-    vector_db.client.create_collection(
-        collection_name=vector_db.collection,
-        vectors_config={"size": 384, "distance": "Cosine"}
-    )
+    await knowledge_service.recreate_collection()
+    await asyncio.to_thread(chunk_hash_index.clear)
     
     return {"success": True, "message": "Base de conhecimento limpa"}
 
 
-def list_documents(limit: int = 10, offset: int = 0) -> ListDocumentsResponse:
+def _with_payload(fields: Optional[List[str]]) -> Union[bool, List[str]]:
+    """Campos do payload a buscar no Qdrant (None = todos)"""
+    return True if not fields else fields
+
+
+async def list_documents(
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> ListDocumentsResponse:
     """
-    Lista documentos armazenados na base de conhecimento
+    Lista documentos armazenados na base de conhecimento (paginação por cursor)
     
     Args:
         limit: Número máximo de documentos a retornar
-        offset: Número de documentos a pular
+        cursor: Cursor da página (`next_cursor` da resposta anterior)
+        fields: Campos do payload a retornar (ex.: ["name", "meta_data"]; None = todos)
         
     Returns:
-        ListDocumentsResponse com lista de documentos
+        ListDocumentsResponse com a página e o cursor da próxima
+
+    Raises:
+        ValueError: Cursor inválido
     """
-    # Obtém informações da coleção
-    collection_info = vector_db.client.get_collection(vector_db.collection)
-    total = collection_info.points_count
-    
-    # Busca documentos
-    scroll_result = vector_db.client.scroll(
-        collection_name=vector_db.collection,
-        limit=limit,
-        offset=offset,
-        with_payload=True,
-        with_vectors=False
+    offset = decode_cursor(cursor)
+
+    # Total aproximado em cache + página do scroll em paralelo
+    total, (points, next_offset) = await asyncio.gather(
+        knowledge_service.get_points_count(max_age=settings.knowledge_count_cache_ttl, exact=False),
+        knowledge_service.scroll(limit=limit, offset=offset, with_payload=_with_payload(fields)),
     )
     
-    points = scroll_result[0]  # scroll retorna (points, next_page_offset)
-    
     documents = []
     for point in points:
+        payload = point.payload or {}
         doc = DocumentItem(
             id=str(point.id),
-            content=point.payload.get("content", ""),
-            metadata={k: v for k, v in point.payload.items() if k != "content"}
+            content=payload.get("content"),
+            metadata={k: v for k, v in payload.items() if k != "content"}
         )
         documents.append(doc)
     
     return ListDocumentsResponse(
         total=total,
         limit=limit,
-        offset=offset,
-        documents=documents
+        documents=documents,
+        next_cursor=encode_cursor(next_offset)
     )
 
 
-def search_documents(query: str, limit: int = 5) -> ListDocumentsResponse:
+async def export_documents(fields: Optional[List[str]] = None) -> AsyncIterator[str]:
     """
-    Busca documentos por similaridade semântica
+    Exporta a coleção inteira em NDJSON (um ponto por linha)
+
+    Os pontos são lidos em páginas do scroll e enviados à medida que chegam,
+    então a memória não cresce com o tamanho da coleção.
+
+    Args:
+        fields: Campos do payload a exportar (None = todos)
+
+    Yields:
+        Blocos de linhas NDJSON
+    """
+    batch_size = settings.knowledge_export_batch_size
+    lines = []
+    async for point in knowledge_service.iter_points(batch_size=batch_size, with_payload=_with_payload(fields)):
+        lines.append(json.dumps({"id": str(point.id), **(point.payload or {})}, ensure_ascii=False, default=str))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def search_documents(
+    query: str,
+    limit: int = 5,
+    mode: Optional[str] = None,
+    rerank: Optional[bool] = None,
+    rerank_budget_ms: Optional[float] = None,
+    filters: Optional[dict] = None,
+) -> ListDocumentsResponse:
+    """
+    Busca documentos por similaridade semântica, BM25 ou híbrida
     
     Args:
         query: Texto de busca
         limit: Número máximo de resultados
+        mode: dense, sparse ou hybrid (padrão: KNOWLEDGE_SEARCH_MODE)
+        rerank: Reordenar com cross-encoder (padrão: RERANK_ENABLED)
+        rerank_budget_ms: Orçamento de latência da busca (padrão: RERANK_BUDGET_MS)
+        filters: Filtros de metadados (source, domain, content_type, tags, ingested_after/before)
         
     Returns:
         ListDocumentsResponse com documentos mais similares
     """
-    # Usa o knowledge para buscar (max_results é o parâmetro correto)
-    results = knowledge.search(query=query, max_results=limit)
+    # Embedding em pool de threads + consulta assíncrona ao Qdrant
+    results = await knowledge_service.search(
+        query=query, limit=limit, mode=mode, rerank=rerank, budget_ms=rerank_budget_ms, filters=filters
+    )
     
-    documents = []
-    for result in results:
-        # Gera um ID baseado no hash do conteúdo se não houver ID
-        doc_id = result.id if hasattr(result, 'id') and result.id else str(abs(hash(result.content)))
-        
-        doc = DocumentItem(
-            id=doc_id,
+    documents = [
+        DocumentItem(
+            id=result.id,
             content=result.content,
-            metadata=result.meta_data if hasattr(result, 'meta_data') else {},
-            score=result.score if hasattr(result, 'score') else None
+            metadata=result.meta_data,
+            score=result.score,
+            rerank_score=result.rerank_score
         )
-        documents.append(doc)
+        for result in results
+    ]
     
     return ListDocumentsResponse(
         total=len(documents),
@@ -254,3 +585,23 @@ def search_documents(query: str, limit: int = 5) -> ListDocumentsResponse:
         offset=0,
         documents=documents
     )
+
+
+def get_embedding_stats() -> dict:
+    """
+    Retorna estatísticas do serviço de embeddings (micro-batching)
+
+    Returns:
+        Dicionário com workers, lotes processados e tamanho médio do lote
+    """
+    return embedding_service.get_stats()
+
+
+def get_rerank_stats() -> dict:
+    """
+    Retorna métricas do reranker
+
+    Returns:
+        Dicionário com contadores, tempo de rerank (ms) e distribuição dos scores
+    """
+    return reranker.get_stats()
@@ -5,61 +5,379 @@ Controlador Wren AI para Consultas BI
 - Tratamento robusto de erros
 """
 
+import asyncio
+import base64
 import hashlib
+import json
 import logging
-from typing import Any, Dict, Optional
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
-from app.schemas.bi_schemas import BIRequest, BIResponse
-from httpx import AsyncClient, HTTPError, TimeoutException
+from httpx import (
+    AsyncClient,
+    HTTPError,
+    HTTPStatusError,
+    Limits,
+    Response,
+    Timeout,
+    TimeoutException,
+    TransportError,
+)
 
+from app.schamas.bi_schemas import (
+    BIColumnarResponse,
+    BIExportRequest,
+    BIRequest,
+    BIResponse,
+    BIRowsRequest,
+    BIRowsResponse,
+)
+from utils.cache import CacheBackend, LRUCache
+from utils.columnar import ColumnarResult
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+from utils.semantic_cache import SemanticIntentCache
 from utils.settings import settings
+from utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Comentários, strings e identificadores entre aspas (ignorados na análise do SQL)
+_SQL_LITERAL_RE = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", re.S)
+_SQL_WRITE_RE = re.compile(
+    r"\b(insert|update|delete|merge|drop|alter|truncate|create|grant|revoke|copy|call|vacuum|into)\b",
+    re.I,
+)
+_SQL_ORDER_BY_RE = re.compile(r"\border\s+by\b", re.I)
+_SQL_LIMIT_RE = re.compile(r"\b(limit|offset|fetch)\b", re.I)
+_SQL_TRAILING_LIMIT_RE = re.compile(r"\blimit\s+(\d+)\s*$", re.I)
+
+
+def _strip_sql_literals(sql: str) -> str:
+    """Remover comentários e trechos entre aspas do SQL"""
+    return _SQL_LITERAL_RE.sub(" '' ", sql)
+
+
+def _top_level_sql(sql: str) -> str:
+    """Manter apenas o nível externo do SQL (conteúdo entre parênteses removido)"""
+    depth = 0
+    chars = []
+    for char in _strip_sql_literals(sql):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            chars.append(char)
+            continue
+        chars.append(" ")
+    return "".join(chars)
+
+
+@dataclass
+class BIResult:
+    """Resultado interno de uma consulta BI (colunar até a borda da API)"""
+    sql: str
+    table: ColumnarResult
+    chart_prompt: str
+    total_rows: Optional[int] = None
+    truncated: bool = False
+    
+    def to_response(self) -> BIResponse:
+        """Converter para a resposta da API (linhas como dicts)"""
+        return BIResponse(
+            sql=self.sql,
+            result=self.table.to_rows(),
+            chart_prompt=self.chart_prompt,
+            total_rows=self.total_rows,
+            truncated=self.truncated
+        )
+    
+    def to_columnar_response(self) -> BIColumnarResponse:
+        """Converter para a resposta compacta da API (valores por coluna)"""
+        compact = self.table.to_compact()
+        return BIColumnarResponse(
+            sql=self.sql,
+            columns=compact["columns"],
+            data=compact["data"],
+            chart_prompt=self.chart_prompt,
+            total_rows=self.total_rows,
+            truncated=self.truncated
+        )
+
+
 class WrenAIClient:
     """Cliente Wren AI com cache e retry logic"""
     
-    def __init__(self, base_url: str = None, timeout: int = 60):
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: Optional[float] = None,
+        sql_cache: Optional[CacheBackend] = None,
+        result_cache: Optional[CacheBackend] = None,
+        semantic_cache: Optional[SemanticIntentCache] = None
+    ):
         self.base_url = base_url or settings.wren_url
-        self.timeout = timeout
+        self.timeout = Timeout(
+            connect=settings.wren_connect_timeout,
+            read=timeout or settings.wren_read_timeout,
+            write=settings.wren_write_timeout,
+            pool=settings.wren_pool_timeout,
+        )
+        self.limits = Limits(
+            max_connections=settings.wren_max_connections,
+            max_keepalive_connections=settings.wren_max_keepalive_connections,
+            keepalive_expiry=settings.wren_keepalive_expiry,
+        )
+        self.http2 = settings.wren_http2
         self.client: Optional[AsyncClient] = None
-        self._query_cache: Dict[str, BIResponse] = {}
-        self._cache_hits = 0
-        self._cache_misses = 0
+        
+        # Camada 1: intent -> SQL (etapa cara de LLM, estável)
+        self._sql_cache: CacheBackend = sql_cache or LRUCache(
+            max_entries=settings.wren_sql_cache_max_entries,
+            max_bytes=settings.wren_sql_cache_max_bytes,
+            default_ttl=settings.wren_sql_cache_ttl,
+        )
+        # Camada 2: SQL -> dados (TTL curto, dados mudam)
+        self._result_cache: CacheBackend = result_cache or LRUCache(
+            max_entries=settings.wren_result_cache_max_entries,
+            max_bytes=settings.wren_result_cache_max_bytes,
+            default_ttl=settings.wren_result_cache_ttl,
+        )
+        # Camada 1b: intents semelhantes -> SQL (embeddings)
+        self._semantic_cache = semantic_cache
+        if self._semantic_cache is None and settings.wren_semantic_cache_enabled:
+            from utils.vector_db import embedder
+            
+            self._semantic_cache = SemanticIntentCache(
+                embedder=embedder,
+                threshold=settings.wren_semantic_cache_threshold,
+                max_entries=settings.wren_semantic_cache_max_entries,
+            )
+        self._cache_hits = {"sql": 0, "results": 0}
+        self._cache_misses = {"sql": 0, "results": 0}
+        
+        # Deduplicação de chamadas concorrentes idênticas
+        self._inflight = SingleFlight(timeout=settings.wren_inflight_timeout)
+        
+        # Resiliência: retry com backoff, orçamento de retries e circuit breaker
+        self._retry_policy = RetryPolicy(
+            max_attempts=settings.wren_retry_max_attempts,
+            base_delay=settings.wren_retry_base_delay,
+            max_delay=settings.wren_retry_max_delay,
+        )
+        self._retry_budget = RetryBudget(ratio=settings.wren_retry_budget_ratio)
+        self._breaker = CircuitBreaker(
+            failure_threshold=settings.wren_breaker_failure_threshold,
+            recovery_timeout=settings.wren_breaker_recovery_timeout,
+        )
+        self._retries = 0
     
     async def __aenter__(self):
         """Context manager setup"""
-        self.client = AsyncClient(
-            base_url=self.base_url,
-            timeout=self.timeout
-        )
+        await self.init()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager cleanup"""
-        if self.client:
-            await self.client.aclose()
+        await self.close()
+    
+    def _create_http_client(self) -> AsyncClient:
+        """Criar cliente HTTP com pool de conexões configurado"""
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(
+                    "⚠️ Pacote 'h2' não instalado (`uv sync --extra http2`), usando HTTP/1.1 para o Wren"
+                )
+                http2 = False
+        
+        return AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+        )
     
     async def init(self):
         """Inicializar cliente"""
         if not self.client:
-            self.client = AsyncClient(
-                base_url=self.base_url,
-                timeout=self.timeout
+            self.client = self._create_http_client()
+            logger.info(
+                f"✓ Cliente Wren inicializado ({self.base_url}, "
+                f"max_connections={self.limits.max_connections})"
             )
     
     async def close(self):
         """Fechar cliente"""
         if self.client:
             await self.client.aclose()
+            self.client = None
+            logger.info("✓ Cliente Wren fechado")
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool de conexões HTTP"""
+        stats = {
+            "initialized": self.client is not None,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "http2": self.http2,
+        }
+        
+        # httpx não expõe o pool publicamente; inspeciona o pool do httpcore
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            idle = sum(1 for conn in connections if conn.is_idle())
+            stats.update({
+                "connections": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+                "utilization": f"{(len(connections) - idle) / self.limits.max_connections * 100:.1f}%",
+            })
+        
+        return stats
     
     def _get_cache_key(self, intent: str, db_source: str) -> str:
         """Gerar chave de cache para query"""
         key_str = f"{intent}_{db_source}"
         return hashlib.md5(key_str.encode()).hexdigest()
     
+    def _get_sql_cache_key(self, sql: str, db_source: str) -> str:
+        """Gerar chave de cache para resultado de um SQL"""
+        normalized = " ".join(sql.split())
+        key_str = f"{normalized}_{db_source}"
+        return hashlib.md5(key_str.encode()).hexdigest()
+    
+    @staticmethod
+    def _is_read_only(sql: str) -> bool:
+        """
+        SQL sem efeitos colaterais (seguro para retry)
+        
+        Um único comando de leitura, sem comandos de escrita em subqueries/CTEs.
+        """
+        cleaned = _strip_sql_literals(sql).strip().rstrip(";")
+        if not cleaned or ";" in cleaned:
+            return False
+        first_word = cleaned.lstrip(" \n\t(").split(None, 1)[0].lower()
+        return (
+            first_word in {"select", "with", "show", "describe", "explain"}
+            and not _SQL_WRITE_RE.search(cleaned)
+        )
+    
+    @staticmethod
+    def _is_ordered(sql: str) -> bool:
+        """SQL com ORDER BY no nível externo e sem LIMIT/OFFSET próprios (paginável)"""
+        top = _top_level_sql(sql.strip().rstrip(";"))
+        return bool(_SQL_ORDER_BY_RE.search(top)) and not _SQL_LIMIT_RE.search(top)
+    
+    @staticmethod
+    def _split_limit(sql: str) -> Optional[Tuple[str, int]]:
+        """
+        Separar um `LIMIT n` final do nível externo (top-N gerado pelo LLM)
+        
+        Returns:
+            (SQL sem o LIMIT, n) ou None se não houver LIMIT final simples
+        """
+        inner = sql.strip().rstrip(";")
+        top = _top_level_sql(inner).rstrip()
+        top_match = _SQL_TRAILING_LIMIT_RE.search(top)
+        match = _SQL_TRAILING_LIMIT_RE.search(inner)
+        if top_match is None or match is None or top_match.group(1) != match.group(1):
+            return None
+        body = inner[:match.start()].rstrip()
+        if _SQL_LIMIT_RE.search(_top_level_sql(body)):
+            return None  # OFFSET/FETCH próprios
+        return body, int(match.group(1))
+    
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Dict[str, Any]] = None,
+        idempotent: bool = True
+    ) -> Response:
+        """
+        Requisição ao Wren com circuit breaker e retry
+        
+        - Falha imediata (CircuitOpenError) com o circuito aberto
+        - Retry com backoff exponencial + jitter apenas para chamadas idempotentes,
+          em erros de transporte/timeout e status 429/5xx, limitado pelo orçamento
+        - Cada chamada lógica conta no máximo uma falha para o breaker
+        
+        Raises:
+            CircuitOpenError, TimeoutException, HTTPError
+        """
+        probe = self._breaker.before_call()
+        try:
+            return await self._request_with_retry(method, url, json, idempotent)
+        finally:
+            # Exceções fora de TransportError/HTTPError e cancelamentos não
+            # podem deixar o half_open preso com a chamada de teste em curso
+            if probe:
+                self._breaker.release_probe()
+    
+    async def _request_with_retry(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Dict[str, Any]],
+        idempotent: bool
+    ) -> Response:
+        self._retry_budget.deposit()
+        await self.init()
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self.client.request(method, url, json=json)
+                if (
+                    response.status_code >= 500
+                    or response.status_code in self._retry_policy.retry_on_status
+                ):
+                    response.raise_for_status()
+            except (TransportError, HTTPError) as e:
+                can_retry = (
+                    idempotent
+                    and attempt < self._retry_policy.max_attempts
+                    and self._retry_budget.try_withdraw()
+                )
+                if not can_retry:
+                    self._breaker.record_failure()
+                    raise
+                
+                delay = self._retry_policy.get_delay(attempt)
+                self._retries += 1
+                logger.warning(
+                    f"🔁 Retry {attempt}/{self._retry_policy.max_attempts - 1} "
+                    f"para {url} em {delay:.2f}s ({type(e).__name__})"
+                )
+                await asyncio.sleep(delay)
+                continue
+            
+            # 4xx não indica indisponibilidade do serviço
+            self._breaker.record_success()
+            response.raise_for_status()
+            return response
+    
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Estatísticas de retries e circuit breaker"""
+        return {
+            "retries": self._retries,
+            "retry_budget": self._retry_budget.get_stats(),
+            "circuit_breaker": self._breaker.get_stats(),
+        }
+    
     async def health_check(self) -> bool:
         """Verificar saúde do Wren Engine"""
+        if self._breaker.state == CircuitBreaker.OPEN:
+            logger.warning("⚠️ Circuito aberto, Wren considerado indisponível")
+            return False
+        
         try:
             await self.init()
             response = await self.client.get("/health")
@@ -87,16 +405,46 @@ class WrenAIClient:
         """
         # Verificar cache
         cache_key = self._get_cache_key(intent, db_source)
-        if use_cache and cache_key in self._query_cache:
-            self._cache_hits += 1
-            logger.info(f"✓ Cache HIT para: {intent[:50]}...")
-            return self._query_cache[cache_key].sql
+        cached_sql = self._sql_cache.get(cache_key) if use_cache else None
+        if cached_sql is not None:
+            self._cache_hits["sql"] += 1
+            logger.info(f"✓ Cache HIT (SQL) para: {intent[:50]}...")
+            return cached_sql
+        
+        # Chamadas concorrentes da mesma intent aguardam uma única geração
+        try:
+            return await self._inflight.do(
+                ("sql", cache_key, use_cache),
+                lambda: self._generate_sql(intent, db_source, cache_key, use_cache)
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"⏱️ Timeout aguardando geração de SQL para: {intent[:50]}...")
+            return None
+    
+    async def _generate_sql(
+        self,
+        intent: str,
+        db_source: str,
+        cache_key: str,
+        use_cache: bool
+    ) -> Optional[str]:
+        """Gerar SQL (cache semântico ou Wren) e popular o cache"""
+        # Verificar cache semântico (intents equivalentes com outra escrita)
+        intent_vector = None
+        if use_cache and self._semantic_cache is not None:
+            try:
+                similar_sql, intent_vector = await self._semantic_cache.alookup(intent, db_source)
+                if similar_sql is not None:
+                    self._cache_hits["sql"] += 1
+                    self._sql_cache.set(cache_key, similar_sql)
+                    logger.info(f"✓ Cache HIT (semântico) para: {intent[:50]}...")
+                    return similar_sql
+            except Exception as e:
+                logger.warning(f"⚠️ Cache semântico indisponível: {e}")
         
-        self._cache_misses += 1
+        self._cache_misses["sql"] += 1
         
         try:
-            await self.init()
-            
             payload = {
                 "intent": intent,
                 "db_source": db_source,
@@ -104,24 +452,37 @@ class WrenAIClient:
             }
             
             logger.info(f"🔄 Consultando Wren para: {intent[:50]}...")
-            response = await self.client.post(
+            response = await self._request(
+                "POST",
                 "/mcp/sql",
                 json=payload
             )
             
-            response.raise_for_status()
             data = response.json()
 
+            sql = data.get("sql")
+            if sql and use_cache:
+                self._sql_cache.set(cache_key, sql)
+                if intent_vector is not None:
+                    self._semantic_cache.add_vector(intent_vector, intent, db_source, sql)
+
             logger.info("✓ SQL gerado com sucesso")
-            return data.get("sql")
+            return sql
             
+        except CircuitOpenError:
+            logger.error("⛔ Wren indisponível (circuito aberto), pulando geração de SQL")
+            return None
         except TimeoutException:
             logger.error(f"⏱️ Timeout ao conectar Wren: {self.base_url}")
             return None
-        except HTTPError as e:
+        except HTTPStatusError as e:
             logger.error(f"❌ Erro HTTP Wren: {e.response.status_code}")
             logger.error(f"   Resposta: {e.response.text[:200]}")
             return None
+        except HTTPError as e:
+            # Erros de transporte não têm resposta
+            logger.error(f"❌ Erro de conexão com o Wren: {type(e).__name__}: {e}")
+            return None
         except Exception as e:
             logger.error(f"❌ Erro ao converter intent: {e}")
             return None
@@ -129,79 +490,261 @@ class WrenAIClient:
     async def execute_sql(
         self,
         sql: str,
-        db_source: str = "default"
-    ) -> Optional[Dict[str, Any]]:
+        db_source: str = "default",
+        use_cache: bool = True
+    ) -> Optional[ColumnarResult]:
         """
         Executar SQL no banco de dados
         
         Args:
             sql: Comando SQL
             db_source: Fonte de dados
+            use_cache: Usar cache de resultados
         
         Returns:
-            Resultado da query ou None
+            Resultado colunar da query ou None
         """
+        cache_key = self._get_sql_cache_key(sql, db_source)
+        cached_result = self._result_cache.get(cache_key) if use_cache else None
+        if cached_result is not None:
+            self._cache_hits["results"] += 1
+            logger.info("✓ Cache HIT (resultado) para SQL")
+            return cached_result
+        
+        # Execuções concorrentes do mesmo SQL aguardam uma única chamada
+        try:
+            return await self._inflight.do(
+                ("results", cache_key, use_cache),
+                lambda: self._run_sql(sql, db_source, cache_key, use_cache)
+            )
+        except asyncio.TimeoutError:
+            logger.error("⏱️ Timeout aguardando execução de SQL")
+            return None
+    
+    async def _run_sql(
+        self,
+        sql: str,
+        db_source: str,
+        cache_key: str,
+        use_cache: bool
+    ) -> Optional[ColumnarResult]:
+        """Executar SQL no Wren e popular o cache de resultados"""
+        self._cache_misses["results"] += 1
+        
         try:
-            await self.init()
-            
             payload = {
                 "sql": sql,
                 "db_source": db_source
             }
 
             logger.info("📊 Executando SQL...")
-            response = await self.client.post(
+            response = await self._request(
+                "POST",
                 "/mcp/query",
-                json=payload
+                json=payload,
+                idempotent=self._is_read_only(sql)
             )
             
-            response.raise_for_status()
-            data = response.json()
+            # Converter para colunar logo na entrada (nomes de colunas uma vez só)
+            result = ColumnarResult.from_payload(response.json())
+            
+            if use_cache:
+                self._result_cache.set(cache_key, result)
             
-            logger.info(f"✓ Query executada, {len(data.get('data', []))} linhas retornadas")
-            return data
+            logger.info(f"✓ Query executada, {result.num_rows} linhas retornadas")
+            return result
             
+        except CircuitOpenError:
+            logger.error("⛔ Wren indisponível (circuito aberto), pulando execução de SQL")
+            return None
         except Exception as e:
             logger.error(f"❌ Erro ao executar SQL: {e}")
             return None
     
+    @classmethod
+    def _paginate_sql(cls, sql: str, limit: int, offset: int = 0) -> str:
+        """
+        Aplicar LIMIT/OFFSET ao SQL para executar a paginação no banco
+        
+        Com ORDER BY no nível externo, LIMIT/OFFSET são anexados ao próprio SQL
+        e as páginas seguem essa ordem. Um `LIMIT n` final do próprio SQL
+        (top-N) é mantido: sem alteração se já couber na página, senão
+        reduzido, preservando o ORDER BY que o acompanha. Sem ordenação o SQL
+        é envolvido numa subquery, o que só vale para a primeira página: a
+        ordem das linhas não é garantida entre execuções.
+        
+        Raises:
+            ValueError: Offset em SQL sem ORDER BY
+        """
+        inner = sql.strip().rstrip(";")
+        split = cls._split_limit(inner)
+        if split is not None:
+            body, own_limit = split
+            if offset and not cls._is_ordered(body):
+                raise ValueError("Paginação requer ORDER BY determinístico no SQL")
+            if not offset and own_limit <= limit:
+                return inner
+            paged = f"{body} LIMIT {max(min(int(limit), own_limit - int(offset)), 0)}"
+        elif cls._is_ordered(inner):
+            paged = f"{inner} LIMIT {int(limit)}"
+        elif offset:
+            raise ValueError("Paginação requer ORDER BY determinístico no SQL (sem LIMIT/OFFSET próprios)")
+        else:
+            paged = f"SELECT * FROM ({inner}) AS wren_page LIMIT {int(limit)}"
+        if offset:
+            paged += f" OFFSET {int(offset)}"
+        return paged
+    
+    async def count_sql(self, sql: str, db_source: str = "default") -> Optional[int]:
+        """
+        Contar linhas do resultado de um SQL sem trafegar as linhas
+        
+        Args:
+            sql: Comando SQL
+            db_source: Fonte de dados
+        
+        Returns:
+            Total de linhas ou None se falhar
+        """
+        inner = sql.strip().rstrip(";")
+        result = await self.execute_sql(
+            f"SELECT COUNT(*) AS total FROM ({inner}) AS wren_count",
+            db_source
+        )
+        if not result or result.num_rows == 0:
+            return None
+        
+        value = result.data[0][0]
+        return int(value) if value is not None else None
+    
+    async def fetch_page(
+        self,
+        sql: str,
+        db_source: str = "default",
+        limit: int = 100,
+        offset: int = 0,
+        use_cache: bool = True
+    ) -> Optional[Tuple[ColumnarResult, bool]]:
+        """
+        Buscar uma página do resultado de um SQL
+        
+        Busca limit + 1 linhas para saber se há mais páginas sem contar.
+        
+        Args:
+            sql: Comando SQL
+            db_source: Fonte de dados
+            limit: Linhas por página
+            offset: Linhas a pular (requer ORDER BY no SQL)
+            use_cache: Usar cache de resultados
+        
+        Returns:
+            (linhas da página, se há mais linhas) ou None se falhar
+        
+        Raises:
+            ValueError: Offset em SQL sem ORDER BY
+        """
+        result = await self.execute_sql(
+            self._paginate_sql(sql, limit=limit + 1, offset=offset),
+            db_source,
+            use_cache=use_cache
+        )
+        if result is None:
+            return None
+        
+        return result.head(limit), result.num_rows > limit
+    
+    async def iter_rows(
+        self,
+        sql: str,
+        db_source: str = "default",
+        page_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterar todas as linhas de um SQL página a página (memória constante)
+        
+        As páginas não passam pelo cache de resultados: uma exportação
+        expulsaria do cache os resultados das consultas interativas.
+        
+        Args:
+            sql: Comando SQL com ORDER BY determinístico
+            db_source: Fonte de dados
+            page_size: Linhas por página
+        
+        Yields:
+            Linhas do resultado
+        
+        Raises:
+            ValueError: SQL sem ORDER BY
+            RuntimeError: Se uma página falhar
+        """
+        if not self._is_ordered(sql):
+            raise ValueError("Exportação requer ORDER BY determinístico no SQL (sem LIMIT/OFFSET próprios)")
+        
+        offset = 0
+        while True:
+            page = await self.fetch_page(
+                sql, db_source, limit=page_size, offset=offset, use_cache=False
+            )
+            if page is None:
+                raise RuntimeError(f"Falha ao buscar linhas a partir do offset {offset}")
+            
+            table, has_more = page
+            for row in table.iter_rows():
+                yield row
+            
+            if not has_more:
+                break
+            offset += page_size
+    
     async def full_query(
         self,
         intent: str,
-        db_source: str = "default"
-    ) -> Optional[BIResponse]:
+        db_source: str = "default",
+        max_rows: Optional[int] = None,
+        count_rows: bool = True
+    ) -> Optional["BIResult"]:
         """
         Pipeline completo: intent -> SQL -> execução -> resultado
         
         Args:
             intent: Pergunta do usuário
             db_source: Fonte de dados
+            max_rows: Limite de linhas buscadas (LIMIT aplicado no banco);
+                None busca o resultado completo
+            count_rows: Contar o total de linhas quando o resultado for truncado
         
         Returns:
-            BIResponse com SQL e dados
+            BIResult com SQL e dados (colunar)
         """
         # Passo 1: Converter intent em SQL
         sql = await self.query_to_sql(intent, db_source)
         if not sql:
             return None
         
-        # Passo 2: Executar SQL
-        result = await self.execute_sql(sql, db_source)
-        if not result:
-            return None
+        # Passo 2: Executar SQL (apenas as linhas necessárias, se limitado)
+        if max_rows is None:
+            table = await self.execute_sql(sql, db_source)
+            if table is None:
+                return None
+            truncated = False
+            total_rows = table.num_rows
+        else:
+            page = await self.fetch_page(sql, db_source, limit=max_rows)
+            if page is None:
+                return None
+            table, truncated = page
+            total_rows = table.num_rows
+            if truncated:
+                total_rows = await self.count_sql(sql, db_source) if count_rows else None
         
-        # Passo 3: Formatar resposta
-        response = BIResponse(
+        # Passo 3: Montar resultado
+        return BIResult(
             sql=sql,
-            result=result.get("data", []),
-            chart_prompt=self._generate_chart_suggestion(intent)
+            table=table,
+            chart_prompt=self._generate_chart_suggestion(intent),
+            total_rows=total_rows,
+            truncated=truncated
         )
-        
-        # Cachear resultado
-        cache_key = self._get_cache_key(intent, db_source)
-        self._query_cache[cache_key] = response
-        
-        return response
     
     def _generate_chart_suggestion(self, intent: str) -> str:
         """Sugerir tipo de visualização baseado na pergunta"""
@@ -216,24 +759,69 @@ class WrenAIClient:
         else:
             return "Tabela com os resultados"
     
-    def get_cache_stats(self) -> Dict[str, Any]:
-        """Estatísticas de cache"""
-        total = self._cache_hits + self._cache_misses
-        hit_rate = (self._cache_hits / total * 100) if total > 0 else 0
+    def _get_tier_stats(self, tier: str, cache: CacheBackend) -> Dict[str, Any]:
+        """Estatísticas de uma camada de cache"""
+        hits = self._cache_hits[tier]
+        misses = self._cache_misses[tier]
+        total = hits + misses
+        hit_rate = (hits / total * 100) if total > 0 else 0
+        backend_stats = cache.get_stats()
         
         return {
-            "hits": self._cache_hits,
-            "misses": self._cache_misses,
+            "hits": hits,
+            "misses": misses,
             "total": total,
             "hit_rate": f"{hit_rate:.1f}%",
-            "cached_queries": len(self._query_cache)
+            "entries": len(cache),
+            "bytes": backend_stats.get("bytes", 0),
+            "max_bytes": backend_stats.get("max_bytes"),
+            "evictions": backend_stats.get("evictions", 0),
+            "expirations": backend_stats.get("expirations", 0),
         }
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas de cache (intent -> SQL e SQL -> resultado)"""
+        sql_stats = self._get_tier_stats("sql", self._sql_cache)
+        result_stats = self._get_tier_stats("results", self._result_cache)
+        
+        return {
+            # Camada intent -> SQL (evita a chamada de LLM do Wren)
+            "hits": sql_stats["hits"],
+            "misses": sql_stats["misses"],
+            "total": sql_stats["total"],
+            "hit_rate": sql_stats["hit_rate"],
+            "cached_queries": sql_stats["entries"],
+            "cached_bytes": sql_stats["bytes"] + result_stats["bytes"],
+            "evictions": sql_stats["evictions"] + result_stats["evictions"],
+            "expirations": sql_stats["expirations"] + result_stats["expirations"],
+            "sql_cache": sql_stats,
+            "result_cache": result_stats,
+            "semantic_cache": (
+                self._semantic_cache.get_stats() if self._semantic_cache is not None else None
+            ),
+            "inflight": self._inflight.get_stats(),
+        }
+    
+    def invalidate_sql_cache(self):
+        """Limpar cache intent -> SQL (ex: após mudança no MDL)"""
+        self._sql_cache.clear()
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
+        logger.info("✓ Cache de SQL limpo")
+    
+    def invalidate_result_cache(self):
+        """Limpar cache SQL -> resultado (ex: após refresh dos dados)"""
+        self._result_cache.clear()
+        logger.info("✓ Cache de resultados limpo")
+    
     def clear_cache(self):
-        """Limpar cache de queries"""
-        self._query_cache.clear()
-        self._cache_hits = 0
-        self._cache_misses = 0
+        """Limpar todas as camadas de cache"""
+        self._sql_cache.clear()
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
+        self._result_cache.clear()
+        self._cache_hits = {"sql": 0, "results": 0}
+        self._cache_misses = {"sql": 0, "results": 0}
         logger.info("✓ Cache limpo")
 
 
@@ -249,29 +837,159 @@ async def get_wren_client() -> WrenAIClient:
     return _wren_client
 
 
-async def bi_query(request: BIRequest) -> BIResponse:
+async def init_wren_client() -> WrenAIClient:
+    """Criar e conectar o cliente Wren (startup da aplicação)"""
+    client = await get_wren_client()
+    await client.init()
+    return client
+
+
+async def close_wren_client():
+    """Fechar o pool de conexões do cliente Wren (shutdown da aplicação)"""
+    global _wren_client
+    if _wren_client is not None:
+        await _wren_client.close()
+        _wren_client = None
+
+
+async def get_resilience_statistics() -> Dict[str, Any]:
+    """Obter estatísticas de retry e circuit breaker do Wren"""
+    client = await get_wren_client()
+    return client.get_resilience_stats()
+
+
+async def get_pool_statistics() -> Dict[str, Any]:
+    """Obter estatísticas do pool HTTP do Wren"""
+    client = await get_wren_client()
+    return client.get_pool_stats()
+
+
+async def bi_query_result(request: BIRequest) -> BIResult:
     """
-    Controlador principal para queries BI
+    Executar query BI mantendo o resultado em formato colunar
     
     Args:
         request: BIRequest com intent e db_source
     
     Returns:
-        BIResponse com SQL e resultado
+        BIResult com SQL e resultado colunar
     """
     client = await get_wren_client()
     
-    response = await client.full_query(
+    result = await client.full_query(
         intent=request.message,
-        db_source=request.db_source
+        db_source=request.db_source,
+        max_rows=request.max_rows,
+        count_rows=settings.bi_count_truncated_rows
     )
     
-    if not response:
+    if not result:
         raise ValueError(
             f"Não foi possível processar query: {request.message}"
         )
     
-    return response
+    return result
+
+
+async def bi_query(request: BIRequest) -> BIResponse:
+    """
+    Controlador principal para queries BI
+    
+    Args:
+        request: BIRequest com intent e db_source
+    
+    Returns:
+        BIResponse com SQL e resultado
+    """
+    result = await bi_query_result(request)
+    return result.to_response()
+
+
+def validate_client_sql(sql: str) -> None:
+    """
+    Validar SQL enviado pelo cliente para paginação/exportação
+    
+    Aceita um único SELECT (ou WITH) de leitura com ORDER BY determinístico
+    no nível externo, para que as páginas não se sobreponham nem pulem linhas.
+    
+    Raises:
+        ValueError: SQL não aceito
+    """
+    first_word = sql.lstrip(" \n\t(").split(None, 1)[0].lower() if sql.strip() else ""
+    if first_word not in {"select", "with"} or not WrenAIClient._is_read_only(sql):
+        raise ValueError("Apenas um único comando SELECT de leitura é aceito")
+    if not WrenAIClient._is_ordered(sql):
+        raise ValueError("O SQL precisa de ORDER BY determinístico (sem LIMIT/OFFSET próprios)")
+
+
+def _encode_cursor(offset: int) -> str:
+    """Gerar cursor opaco a partir do offset"""
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    """Ler offset de um cursor opaco"""
+    if not cursor:
+        return 0
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["o"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if offset < 0:
+        raise ValueError("Cursor inválido")
+    return offset
+
+
+async def bi_rows(request: BIRowsRequest) -> BIRowsResponse:
+    """
+    Buscar uma página do resultado de um SQL (paginação por cursor)
+    
+    Args:
+        request: BIRowsRequest com SQL, cursor e tamanho da página
+    
+    Returns:
+        BIRowsResponse com linhas e cursor da próxima página
+    """
+    validate_client_sql(request.sql)
+    client = await get_wren_client()
+    offset = _decode_cursor(request.cursor)
+    
+    page = await client.fetch_page(
+        request.sql,
+        db_source=request.db_source,
+        limit=request.limit,
+        offset=offset
+    )
+    if page is None:
+        raise ValueError("Não foi possível buscar as linhas do SQL")
+    
+    table, has_more = page
+    return BIRowsResponse(
+        rows=table.to_rows(),
+        next_cursor=_encode_cursor(offset + table.num_rows) if has_more else None
+    )
+
+
+async def bi_export_generator(request: BIExportRequest) -> AsyncIterator[str]:
+    """
+    Exportar o resultado completo de um SQL em NDJSON (uma linha JSON por registro)
+    
+    Args:
+        request: BIExportRequest com SQL e fonte de dados (validar antes com
+            `validate_client_sql` para responder 400 antes do streaming)
+    
+    Yields:
+        Linhas NDJSON
+    """
+    validate_client_sql(request.sql)
+    client = await get_wren_client()
+    
+    async for row in client.iter_rows(
+        request.sql,
+        db_source=request.db_source,
+        page_size=settings.wren_export_page_size
+    ):
+        yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
 
 
 async def get_cache_statistics() -> Dict[str, Any]:
@@ -280,6 +998,31 @@ async def get_cache_statistics() -> Dict[str, Any]:
     return client.get_cache_stats()
 
 
+async def invalidate_cache(tier: str = "results") -> Dict[str, Any]:
+    """
+    Invalidar camadas de cache do Wren
+    
+    Args:
+        tier: "results" (dados), "sql" (intent -> SQL) ou "all"
+    
+    Returns:
+        Dict com status da operação
+    """
+    client = await get_wren_client()
+    
+    if tier == "results":
+        client.invalidate_result_cache()
+    elif tier == "sql":
+        client.invalidate_sql_cache()
+    elif tier == "all":
+        client.invalidate_sql_cache()
+        client.invalidate_result_cache()
+    else:
+        raise ValueError(f"Camada de cache inválida: {tier}")
+    
+    return {"success": True, "message": f"Cache '{tier}' invalidado"}
+
+
 async def health_check() -> bool:
     """Verificar saúde do Wren Engine"""
     client = await get_wren_client()
@@ -2,20 +2,63 @@
 API REST para RAG com Agno, Groq e Qdrant
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.routers import chat_router, knowledge_router
+from app.controllers.knowledge_controller import start_ingestion_workers, stop_ingestion_workers
+from app.controllers.wrenai_controller import close_wren_client, init_wren_client
+from app.routers import chat_router, knowledge_router, wrenai_router
+from utils.embedding_service import embedding_service
+from utils.knowledge_service import knowledge_service
 from utils.llm import LLMConfig
+from utils.reranker import reranker
+from utils.settings import settings
 from utils.vector_db import vector_db
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicializa e finaliza recursos compartilhados da aplicação
+    """
+    print("🚀 Iniciando Agno RAG API...")
+    print(f"📚 Collection: {vector_db.collection}")
+    print(f"🤖 Modelos disponíveis: {list(LLMConfig.MODELS.keys())}")
+    
+    try:
+        if await knowledge_service.ensure_collection():
+            print(f"🗂️ Collection {vector_db.collection} criada")
+    except Exception as e:
+        print(f"⚠️ Qdrant indisponível, collection não verificada: {e}")
+    await init_wren_client()
+    await start_ingestion_workers()
+    if settings.rerank_enabled and settings.rerank_warmup:
+        try:
+            await reranker.warmup()
+        except Exception as e:
+            print(f"⚠️ Reranker não carregado (buscas seguem sem rerank até carregar): {e}")
+    
+    yield
+    
+    await stop_ingestion_workers()
+    await close_wren_client()
+    await knowledge_service.close()
+    await embedding_service.close()
+    reranker.close()
+    print("👋 Agno RAG API finalizada")
+
+
 app = FastAPI(
     title="Agno RAG API",
     description="API para chat com RAG usando Agno, Groq e Qdrant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(chat_router.router)
 app.include_router(knowledge_router.router)
+app.include_router(wrenai_router.router)
 
 
 @app.get("/models")
@@ -40,16 +83,6 @@ async def health_check():
         "knowledge_base": "ready"
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """
-    Inicializa a aplicação
-    """
-    print("🚀 Iniciando Agno RAG API...")
-    print(f"📚 Collection: {vector_db.collection}")
-    print(f"🤖 Modelos disponíveis: {list(LLMConfig.MODELS.keys())}")
-
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,10 +2,10 @@
 Rotas para operações de chat
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
-from app.controllers.chat_controller import chat_stream_generator, chat_with_agent
+from app.controllers.chat_controller import chat_stream_generator, chat_with_agent, validate_chat_request
 from app.schamas.chat_schemas import ChatRequest, ChatResponse
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -16,6 +16,11 @@ async def chat(request: ChatRequest):
     """
     Endpoint para chat com o agent
     """
+    try:
+        validate_chat_request(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         return await chat_with_agent(request)
     except Exception as e:
@@ -23,14 +28,25 @@ async def chat(request: ChatRequest):
 
 
 @router.post("/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     """
-    Endpoint para chat com streaming
+    Endpoint para chat com streaming (Server-Sent Events)
+
+    Eventos: token, tool_start, tool_end, error, done
     """
+    try:
+        validate_chat_request(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         return StreamingResponse(
-            chat_stream_generator(request),
-            media_type="text/plain"
+            chat_stream_generator(request, is_disconnected=http_request.is_disconnected),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no streaming: {str(e)}")
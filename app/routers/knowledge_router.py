@@ -2,20 +2,30 @@
 Rotas para operações de knowledge base
 """
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from typing import List, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 
 from app.controllers.knowledge_controller import (
     add_json_to_knowledge,
     add_pdf_to_knowledge,
     add_url_to_knowledge,
+    cancel_ingestion_job,
     clear_knowledge_base,
+    export_documents,
+    get_embedding_stats,
+    get_ingestion_job,
+    get_rerank_stats,
     list_documents,
+    list_ingestion_jobs,
     search_documents,
 )
 from app.controllers.knowledge_controller import get_knowledge_status as get_status
 from app.schamas.document_schemas import (
     AddContentResponse,
     AddURLRequest,
+    IngestionJobResponse,
     KnowledgeStatusResponse,
     ListDocumentsResponse,
     SearchRequest,
@@ -24,10 +34,10 @@ from app.schamas.document_schemas import (
 router = APIRouter(prefix="/knowledge", tags=["knowledge"])
 
 
-@router.post("/add/url", response_model=AddContentResponse)
+@router.post("/add/url", response_model=AddContentResponse, status_code=202)
 async def add_url_content(request: AddURLRequest):
     """
-    Adiciona conteúdo de uma URL à base de conhecimento
+    Enfileira a ingestão de uma URL (acompanhe em /knowledge/jobs/{job_id})
     """
     try:
         return await add_url_to_knowledge(request)
@@ -35,41 +45,87 @@ async def add_url_content(request: AddURLRequest):
         raise HTTPException(status_code=500, detail=f"Erro ao adicionar URL: {str(e)}")
 
 
-@router.post("/add/json", response_model=AddContentResponse)
-async def add_json_content(file: UploadFile = File(...)):
+@router.post("/add/json", response_model=AddContentResponse, status_code=202)
+async def add_json_content(
+    file: UploadFile = File(...),
+    tags: List[str] = Form(default=[], description="Tags gravadas nos chunks (filtro de busca)"),
+    source_id: Optional[str] = Form(
+        default=None,
+        description="Id estável da origem: reenvios com o mesmo id substituem a versão anterior (padrão: nome + hash do conteúdo)",
+    ),
+):
     """
-    Adiciona conteúdo de um arquivo JSON à base de conhecimento
+    Enfileira a ingestão de um arquivo JSON (acompanhe em /knowledge/jobs/{job_id})
     """
     if not file.filename.endswith('.json'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser JSON")
     
     try:
-        return await add_json_to_knowledge(file)
+        return await add_json_to_knowledge(file, tags, source_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao adicionar JSON: {str(e)}")
 
 
-@router.post("/add/pdf", response_model=AddContentResponse)
-async def add_pdf_content(file: UploadFile = File(...)):
+@router.post("/add/pdf", response_model=AddContentResponse, status_code=202)
+async def add_pdf_content(
+    file: UploadFile = File(...),
+    tags: List[str] = Form(default=[], description="Tags gravadas nos chunks (filtro de busca)"),
+    source_id: Optional[str] = Form(
+        default=None,
+        description="Id estável da origem: reenvios com o mesmo id substituem a versão anterior (padrão: nome + hash do conteúdo)",
+    ),
+):
     """
-    Adiciona conteúdo de um arquivo PDF à base de conhecimento
+    Enfileira a ingestão de um arquivo PDF (acompanhe em /knowledge/jobs/{job_id})
     """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser PDF")
     
     try:
-        return await add_pdf_to_knowledge(file)
+        return await add_pdf_to_knowledge(file, tags, source_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao adicionar PDF: {str(e)}")
 
 
+@router.get("/jobs", response_model=list[IngestionJobResponse])
+async def get_jobs(
+    limit: int = Query(default=50, ge=1, le=500, description="Número de jobs a retornar")
+):
+    """
+    Lista os jobs de ingestão mais recentes
+    """
+    return list_ingestion_jobs(limit=limit)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job(job_id: str):
+    """
+    Retorna estágio, progresso, throughput e erros de um job de ingestão
+    """
+    job = get_ingestion_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancela um job de ingestão enfileirado ou em execução
+    """
+    job = cancel_ingestion_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
 @router.get("/status", response_model=KnowledgeStatusResponse)
 async def get_knowledge_status():
     """
     Retorna status da base de conhecimento
     """
     try:
-        return get_status()
+        return await get_status()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter status: {str(e)}")
 
@@ -80,31 +136,81 @@ async def clear_knowledge():
     Limpa toda a base de conhecimento
     """
     try:
-        return clear_knowledge_base()
+        return await clear_knowledge_base()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao limpar knowledge: {str(e)}")
 
 
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Campos separados por vírgula (ex.: "name,meta_data")"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+
 @router.get("/documents", response_model=ListDocumentsResponse)
 async def get_documents(
     limit: int = Query(default=10, ge=1, le=100, description="Número de documentos a retornar"),
-    offset: int = Query(default=0, ge=0, description="Número de documentos a pular")
+    cursor: Optional[str] = Query(default=None, description="Cursor da página (next_cursor da resposta anterior)"),
+    fields: Optional[str] = Query(default=None, description="Campos do payload separados por vírgula (ex.: name,meta_data)")
 ):
     """
-    Lista os documentos armazenados na base de conhecimento
+    Lista os documentos armazenados na base de conhecimento (paginação por cursor)
     """
     try:
-        return list_documents(limit=limit, offset=offset)
+        return await list_documents(limit=limit, cursor=cursor, fields=_parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar documentos: {str(e)}")
 
 
+@router.get("/documents/export")
+async def export_knowledge_documents(
+    fields: Optional[str] = Query(default=None, description="Campos do payload separados por vírgula")
+):
+    """
+    Exporta todos os documentos em NDJSON (streaming, memória constante)
+    """
+    return StreamingResponse(
+        export_documents(fields=_parse_fields(fields)),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="knowledge.ndjson"'},
+    )
+
+
 @router.post("/search", response_model=ListDocumentsResponse)
 async def search_knowledge(request: SearchRequest):
     """
-    Busca documentos por similaridade semântica
+    Busca documentos por similaridade semântica, BM25 ou híbrida (RRF)
     """
     try:
-        return search_documents(query=request.query, limit=request.limit)
+        mode = request.mode.value if request.mode else None
+        return await search_documents(
+            query=request.query,
+            limit=request.limit,
+            mode=mode,
+            rerank=request.rerank,
+            rerank_budget_ms=request.rerank_budget_ms,
+            filters=request.filters.to_dict() if request.filters else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar documentos: {str(e)}")
+
+
+@router.get("/embedding/stats")
+async def embedding_stats():
+    """
+    Retorna estatísticas do serviço de embeddings (lotes e workers)
+    """
+    return get_embedding_stats()
+
+
+@router.get("/rerank/stats")
+async def rerank_stats():
+    """
+    Retorna métricas do reranker (tempo de rerank e distribuição dos scores)
+    """
+    return get_rerank_stats()
@@ -1,11 +1,109 @@
 
-from fastapi import APIRouter
-from app.controllers.wrenai_controller import bi_query
-from app.schamas.bi_schemas import BIRequest, BIResponse
+from typing import Union
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from app.controllers.wrenai_controller import (
+    bi_export_generator,
+    bi_query,
+    bi_query_result,
+    bi_rows,
+    get_cache_statistics,
+    get_pool_statistics,
+    get_resilience_statistics,
+    invalidate_cache,
+    validate_client_sql,
+)
+from app.schamas.bi_schemas import (
+    BIColumnarResponse,
+    BIExportRequest,
+    BIRequest,
+    BIResponse,
+    BIRowsRequest,
+    BIRowsResponse,
+)
 
 router = APIRouter(prefix="/bi", tags=["bi"])
 
-@router.post("/query", response_model=BIResponse)
-async def wren_query(request: BIRequest):
+@router.post("/query", response_model=Union[BIResponse, BIColumnarResponse])
+async def wren_query(
+    request: BIRequest,
+    format: str = Query(
+        default="rows",
+        pattern="^(rows|columns|arrow)$",
+        description="Formato do resultado: rows (lista de objetos), columns (JSON compacto) ou arrow (Arrow IPC)"
+    )
+):
     """Consulta BI via Wren AI Engine"""
-    return await bi_query(request)
+    if format == "rows":
+        return await bi_query(request)
+    
+    result = await bi_query_result(request)
+    
+    if format == "columns":
+        return result.to_columnar_response()
+    
+    try:
+        content = result.table.to_arrow_ipc()
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return Response(
+        content=content,
+        media_type="application/vnd.apache.arrow.stream",
+        headers={"X-BI-Truncated": str(result.truncated).lower()}
+    )
+
+
+@router.post("/rows", response_model=BIRowsResponse)
+async def wren_rows(request: BIRowsRequest):
+    """Página de linhas de um SQL (paginação por cursor)"""
+    try:
+        return await bi_rows(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/export")
+async def wren_export(request: BIExportRequest):
+    """Exporta o resultado completo de um SQL em NDJSON (streaming)"""
+    try:
+        validate_client_sql(request.sql)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        bi_export_generator(request),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/cache/stats")
+async def wren_cache_stats():
+    """Estatísticas das camadas de cache do Wren"""
+    return await get_cache_statistics()
+
+
+@router.get("/pool/stats")
+async def wren_pool_stats():
+    """Utilização do pool de conexões HTTP com o Wren"""
+    return await get_pool_statistics()
+
+
+@router.get("/resilience/stats")
+async def wren_resilience_stats():
+    """Retries e estado do circuit breaker do Wren"""
+    return await get_resilience_statistics()
+
+
+@router.post("/cache/invalidate")
+async def wren_cache_invalidate(
+    tier: str = Query(default="results", pattern="^(results|sql|all)$", description="Camada a invalidar")
+):
+    """
+    Invalidar cache do Wren (ex: webhook de refresh de dados chama com tier=results)
+    """
+    try:
+        return await invalidate_cache(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,12 +1,43 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
 
 class BIRequest(BaseModel):
     """Pedido de consulta BI. """
     message: str  # "Vendas Q4 por região"
     db_source: str  # "postgres_sales"
+    max_rows: Optional[int] = Field(default=None, ge=1, description="Limite de linhas retornadas (LIMIT no banco)")
 
 class BIResponse(BaseModel):
     """Resposta da consulta BI."""
     sql: str
-    result: dict
+    result: list  # Linhas retornadas pelo Wren
     chart_prompt: str  # Para LLM gerar tabela
+    total_rows: Optional[int] = None  # Total de linhas do resultado (None se desconhecido)
+    truncated: bool = False  # True se result contém apenas parte das linhas
+
+class BIColumnarResponse(BaseModel):
+    """Resposta da consulta BI em formato colunar compacto."""
+    sql: str
+    columns: list[str]  # Nomes das colunas (uma vez só)
+    data: list[list]  # Valores por coluna, na ordem de columns
+    chart_prompt: str
+    total_rows: Optional[int] = None
+    truncated: bool = False
+
+class BIRowsRequest(BaseModel):
+    """Pedido de uma página de linhas de um SQL."""
+    sql: str
+    db_source: str = "default"
+    cursor: Optional[str] = None  # Cursor retornado pela página anterior
+    limit: int = Field(default=100, ge=1, le=10000)
+
+class BIRowsResponse(BaseModel):
+    """Página de linhas de um SQL."""
+    rows: list
+    next_cursor: Optional[str] = None  # None quando não há mais páginas
+
+class BIExportRequest(BaseModel):
+    """Pedido de exportação completa de um SQL."""
+    sql: str
+    db_source: str = "default"
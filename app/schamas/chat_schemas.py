@@ -2,10 +2,12 @@
 Modelos Pydantic para validação de dados da API - Chat
 """
 
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
+from app.schamas.document_schemas import SearchFilters
+
 
 class ChatRequest(BaseModel):
     """Request para chat"""
@@ -15,9 +17,22 @@ class ChatRequest(BaseModel):
         description="Modelo a ser usado"
     )
     stream: bool = Field(default=False, description="Retornar resposta em streaming")
+    session_id: Optional[str] = Field(
+        default=None,
+        description="ID da sessão de chat (uma nova sessão é criada se não informado)"
+    )
+    knowledge_filters: Optional[SearchFilters] = Field(
+        default=None,
+        description="Filtros de metadados aplicados às buscas do agent na knowledge base"
+    )
 
 
 class ChatResponse(BaseModel):
     """Response do chat"""
     response: str
     model: str
+    session_id: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Tokens do turno: prompt_tokens/completion_tokens do modelo e estimativa por parte do contexto"
+    )
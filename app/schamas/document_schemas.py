@@ -2,10 +2,11 @@
 Modelos Pydantic para validação de dados da API - Documentos e Knowledge Base
 """
 
+from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 
 
 class ContentTypeEnum(str, Enum):
@@ -15,11 +16,19 @@ class ContentTypeEnum(str, Enum):
     PDF = "pdf"
 
 
+class SearchModeEnum(str, Enum):
+    """Modos de busca na knowledge base"""
+    DENSE = "dense"  # Similaridade semântica (embedding)
+    SPARSE = "sparse"  # Termos exatos (BM25)
+    HYBRID = "hybrid"  # Denso + BM25 combinados por RRF
+
+
 class AddURLRequest(BaseModel):
     """Request para adicionar URL"""
     url: HttpUrl = Field(..., description="URL do website")
     max_depth: int = Field(default=1, ge=0, le=5, description="Profundidade máxima de crawling")
     max_links: int = Field(default=10, ge=1, le=100, description="Número máximo de links")
+    tags: List[str] = Field(default_factory=list, description="Tags gravadas nos chunks (filtro de busca)")
 
 
 class AddContentResponse(BaseModel):
@@ -28,6 +37,28 @@ class AddContentResponse(BaseModel):
     message: str
     content_type: str
     details: Optional[dict] = None
+    job_id: Optional[str] = Field(None, description="Id do job de ingestão (ver /knowledge/jobs/{id})")
+
+
+class IngestionJobResponse(BaseModel):
+    """Estado e progresso de um job de ingestão"""
+    id: str
+    content_type: str
+    source: str
+    status: str = Field(..., description="queued, running, completed, failed ou cancelled")
+    stage: str = Field(..., description="queued, reading, indexing, cleanup ou done")
+    chunks_total: Optional[int] = None
+    chunks_processed: int = 0
+    chunks_added: int = Field(0, description="Chunks novos ou alterados gravados")
+    chunks_skipped: int = Field(0, description="Chunks inalterados (não reprocessados)")
+    chunks_removed: int = Field(0, description="Chunks removidos por não existirem mais na origem")
+    throughput: Optional[float] = Field(None, description="Chunks por segundo na tentativa atual")
+    points_per_second: Optional[float] = Field(None, description="Pontos gravados por segundo no Qdrant")
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 
 class KnowledgeStatusResponse(BaseModel):
@@ -40,20 +71,48 @@ class KnowledgeStatusResponse(BaseModel):
 class DocumentItem(BaseModel):
     """Item de documento retornado"""
     id: str = Field(..., description="ID do documento")
-    content: str = Field(..., description="Conteúdo do documento")
+    content: Optional[str] = Field(None, description="Conteúdo do documento (omitido se não estiver em fields)")
     metadata: dict = Field(default_factory=dict, description="Metadados do documento")
     score: Optional[float] = Field(None, description="Score de similaridade (se aplicável)")
+    rerank_score: Optional[float] = Field(None, description="Score do cross-encoder (se houve rerank)")
 
 
 class ListDocumentsResponse(BaseModel):
     """Response para listagem de documentos"""
-    total: int
+    total: int = Field(..., description="Total de chunks (aproximado; em cache na listagem)")
     limit: int
-    offset: int
+    offset: int = 0
     documents: list[DocumentItem]
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página (None no fim)")
+
+
+class SearchFilters(BaseModel):
+    """Filtros de metadados da busca (campos combinados com E; listas com OU)"""
+    # Chaves desconhecidas seguem até o KnowledgeService, que as recusa (400)
+    model_config = ConfigDict(extra="allow")
+
+    source: Optional[List[str]] = Field(default=None, description="Origens: URL inicial ou nome do arquivo enviado")
+    domain: Optional[List[str]] = Field(default=None, description="Domínios das páginas (ingestão de URL)")
+    content_type: Optional[List[ContentTypeEnum]] = Field(default=None, description="Tipos de conteúdo")
+    tags: Optional[List[str]] = Field(default=None, description="Chunks com qualquer uma das tags")
+    ingested_after: Optional[datetime] = Field(default=None, description="Ingeridos a partir de")
+    ingested_before: Optional[datetime] = Field(default=None, description="Ingeridos até")
+
+    def to_dict(self) -> dict:
+        """Filtros informados, no formato do KnowledgeService"""
+        data = self.model_dump(exclude_none=True, mode="json")
+        for key in ("ingested_after", "ingested_before"):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value.timestamp()
+        return data
 
 
 class SearchRequest(BaseModel):
     """Request para busca no knowledge base"""
     query: str = Field(..., description="Texto de busca", min_length=1)
     limit: int = Field(default=5, ge=1, le=50, description="Número máximo de resultados")
+    mode: Optional[SearchModeEnum] = Field(default=None, description="dense, sparse ou hybrid (padrão: KNOWLEDGE_SEARCH_MODE)")
+    rerank: Optional[bool] = Field(default=None, description="Reordenar com cross-encoder (padrão: RERANK_ENABLED)")
+    rerank_budget_ms: Optional[float] = Field(default=None, ge=0, description="Orçamento de latência da busca em ms (0 = sem limite)")
+    filters: Optional[SearchFilters] = Field(default=None, description="Filtros de metadados")
@@ -0,0 +1,165 @@
+"""
+Benchmark: busca densa x esparsa (BM25) x híbrida (RRF)
+
+Gera um catálogo sintético de vendas (produtos com SKU e código de região,
+mais documentos de políticas) numa coleção de teste e mede recall@k e
+latência (p50/p95) de cada modo para dois tipos de pergunta:
+- exatas: SKU ou código de região ("estoque do SKU NB-0042")
+- semânticas: paráfrases das políticas ("posso devolver um produto usado?")
+
+Sem --url, usa o Qdrant em memória do qdrant-client (latência não
+representativa do servidor; recall sim).
+
+Uso:
+    python scripts/benchmark_hybrid_search.py --products 500 --k 1 5 10
+    python scripts/benchmark_hybrid_search.py --url http://localhost:6333
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+
+from qdrant_client import AsyncQdrantClient, models
+
+from utils import qdrant_collection
+from utils.embedding_service import embedding_service
+from utils.knowledge_service import KnowledgeService
+from utils.settings import settings
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, sparse_encoder
+
+FAMILIES = {
+    "NB": "Notebook Pro com tela de alta resolução, bateria de longa duração e teclado retroiluminado",
+    "SM": "Smartphone com câmera tripla, 5G e carregamento rápido",
+    "TB": "Tablet leve para leitura e vídeo, com caneta compatível",
+    "MN": "Monitor de 27 polegadas para escritório, ajuste de altura e base giratória",
+    "HS": "Headset sem fio com cancelamento de ruído para chamadas",
+}
+REGIONS = ["SE-01", "SE-02", "S-01", "S-02", "NE-01", "NE-02", "N-01", "CO-01"]
+
+POLICIES = [
+    ("Política de devolução: produtos podem ser devolvidos em até 30 dias com nota fiscal, "
+     "desde que sem sinais de uso.", "posso devolver um produto que já usei?"),
+    ("Descontos acima de 15% precisam de aprovação do gerente regional antes do fechamento.",
+     "quem precisa autorizar um abatimento grande no preço?"),
+    ("A garantia estendida cobre defeitos de fabricação por 24 meses e pode ser contratada "
+     "na venda.", "por quanto tempo o cliente fica coberto contra defeitos?"),
+    ("Metas trimestrais de vendas são definidas por região e revisadas no início de cada "
+     "trimestre.", "com que frequência os objetivos comerciais são revistos?"),
+    ("Pedidos corporativos acima de 50 unidades têm frete grátis e prazo de entrega de 10 dias "
+     "úteis.", "empresas que compram muito pagam o transporte?"),
+    ("O suporte técnico atende por chat das 8h às 20h em dias úteis; fora do horário, "
+     "abra um chamado pelo portal.", "em que horário consigo falar com a assistência?"),
+]
+
+
+def build_corpus(products: int, seed: int = 42) -> Tuple[List[Dict], List[Tuple[str, str, str]]]:
+    """
+    Documentos e perguntas com o documento relevante
+
+    Returns:
+        (documentos, [(tipo, pergunta, id relevante)])
+    """
+    rng = random.Random(seed)
+    documents, queries = [], []
+
+    for number in range(products):
+        family = rng.choice(list(FAMILIES))
+        sku = f"{family}-{number:04d}"
+        region = rng.choice(REGIONS)
+        doc_id = str(uuid.uuid4())
+        content = (
+            f"Ficha do produto {sku}: {FAMILIES[family]}. Estoque de {rng.randint(0, 500)} unidades "
+            f"no centro de distribuição {region}, preço de tabela R$ {rng.randint(500, 9000)}."
+        )
+        documents.append({"id": doc_id, "content": content})
+        queries.append(("exata", f"estoque do SKU {sku}", doc_id))
+
+    for content, question in POLICIES:
+        doc_id = str(uuid.uuid4())
+        documents.append({"id": doc_id, "content": content})
+        queries.append(("semântica", question, doc_id))
+
+    return documents, queries
+
+
+async def load_corpus(client: AsyncQdrantClient, collection: str, documents: List[Dict]) -> None:
+    await qdrant_collection.recreate_collection(client, collection)
+    for start in range(0, len(documents), 256):
+        batch = documents[start:start + 256]
+        contents = [doc["content"] for doc in batch]
+        dense = await embedding_service.embed_many(contents)
+        sparse = sparse_encoder.encode_documents(contents)
+        await client.upsert(
+            collection_name=collection,
+            points=[
+                models.PointStruct(
+                    id=doc["id"],
+                    vector={"": d, SPARSE_VECTOR_NAME: s},
+                    payload={"content": doc["content"], "meta_data": {}},
+                )
+                for doc, d, s in zip(batch, dense, sparse)
+            ],
+            wait=True,
+        )
+
+
+async def run_mode(service: KnowledgeService, mode: str, queries, k_values: List[int]) -> Dict:
+    max_k = max(k_values)
+    hits = {kind: {k: 0 for k in k_values} for kind, _, _ in queries}
+    totals = {kind: 0 for kind, _, _ in queries}
+    latencies = []
+
+    for kind, question, relevant in queries:
+        start = time.perf_counter()
+        results = await service.search(question, limit=max_k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids = [hit.id for hit in results]
+        totals[kind] += 1
+        for k in k_values:
+            hits[kind][k] += relevant in ids[:k]
+
+    latencies.sort()
+    return {
+        "recall": {kind: {k: hits[kind][k] / totals[kind] for k in k_values} for kind in totals},
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def main(url: str, products: int, k_values: List[int]) -> None:
+    settings.hybrid_search_enabled = True
+    client = AsyncQdrantClient(url=url) if url else AsyncQdrantClient(location=":memory:")
+    collection = "benchmark-hybrid-search"
+    vector_db = SimpleNamespace(collection=collection, async_client=client)
+    service = KnowledgeService(vector_db=vector_db, embedding_service=embedding_service)
+
+    documents, queries = build_corpus(products)
+    print(f"Corpus: {len(documents)} documentos, {len(queries)} perguntas\n")
+    await load_corpus(client, collection, documents)
+    await service.search("aquecimento", limit=1, mode="dense")  # Carregar o modelo
+
+    kinds = sorted({kind for kind, _, _ in queries})
+    header = "".join(f"{f'{kind} R@{k}':>16}" for kind in kinds for k in k_values)
+    print(f"{'modo':<10}{header}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode in ("dense", "sparse", "hybrid"):
+        result = await run_mode(service, mode, queries, k_values)
+        row = "".join(f"{result['recall'][kind][k]:>16.2f}" for kind in kinds for k in k_values)
+        print(f"{mode:<10}{row}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+
+    await client.delete_collection(collection)
+    await client.close()
+    await embedding_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL do Qdrant (padrão: em memória)")
+    parser.add_argument("--products", type=int, default=500, help="Produtos no catálogo sintético")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.products, sorted(args.k)))
@@ -0,0 +1,129 @@
+"""
+Servidor HTTP local com um wiki sintético para testar o crawler
+
+- Páginas em árvore (`--fanout` links por página) com latência artificial
+- ETag/Last-Modified e respostas 304 para GET condicional
+- robots.txt bloqueando /private/
+
+Com --run, sobe o servidor e compara WebsiteReader (sequencial) com o
+WebCrawler (1ª passada e 2ª passada com cache/304).
+
+Uso:
+    python scripts/crawl_fixture_server.py --port 8765              # apenas o servidor
+    python scripts/crawl_fixture_server.py --run --depth 3 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+
+def make_handler(fanout: int, latency: float):
+    class WikiHandler(BaseHTTPRequestHandler):
+        requests_served = 0
+        not_modified = 0
+
+        def log_message(self, format, *args):
+            pass
+
+        def _page(self) -> str:
+            path = self.path.rstrip("/") or "/wiki"
+            links = "".join(f'<li><a href="{path}/{i}">{path}/{i}</a></li>' for i in range(fanout))
+            return (
+                f"<html><head><title>{path}</title></head><body>"
+                f"<h1>Página {path}</h1>"
+                f"<p>Conteúdo do wiki interno para {path}. Processos de vendas, "
+                f"políticas de desconto e manuais de produto.</p>"
+                f'<ul>{links}<li><a href="/private/secret">privado</a></li></ul>'
+                f"</body></html>"
+            )
+
+        def do_GET(self):
+            type(self).requests_served += 1
+            if self.path == "/robots.txt":
+                return self._send(200, ROBOTS.encode(), "text/plain")
+
+            time.sleep(latency)
+            body = self._page().encode()
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                type(self).not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._send(200, body, "text/html; charset=utf-8", etag)
+
+        def _send(self, status: int, body: bytes, content_type: str, etag: str = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return WikiHandler
+
+
+def start_server(port: int, fanout: int, latency: float):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fanout, latency))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+async def run_comparison(base_url: str, depth: int, max_links: int, concurrency: int) -> None:
+    from agno.knowledge.reader.website_reader import WebsiteReader
+
+    from utils.crawler import PageCache, WebCrawler
+
+    start_url = f"{base_url}/wiki"
+    print(f"{'modo':<32}{'páginas':>8}{'tempo s':>10}")
+
+    start = time.perf_counter()
+    documents = await WebsiteReader(max_depth=depth, max_links=max_links).async_read(start_url)
+    pages = len({doc.meta_data.get("url") for doc in documents})
+    print(f"{'WebsiteReader (sequencial)':<32}{pages:>8}{time.perf_counter() - start:>10.2f}")
+
+    cache_dir = tempfile.mkdtemp()
+    cache = PageCache(os.path.join(cache_dir, "pages.sqlite"))
+    for label in ("WebCrawler (1ª passada)", "WebCrawler (2ª passada, 304)"):
+        crawler = WebCrawler(max_depth=depth, max_links=max_links, concurrency=concurrency, cache=cache)
+        start = time.perf_counter()
+        pages = [page async for page in crawler.crawl(start_url)]
+        print(f"{label:<32}{len(pages):>8}{time.perf_counter() - start:>10.2f}  {crawler.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fanout", type=int, default=5, help="Links por página")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência por página (s)")
+    parser.add_argument("--run", action="store_true", help="Executar a comparação contra o servidor")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--max-links", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.fanout, args.latency)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    if args.run:
+        asyncio.run(run_comparison(base_url, args.depth, args.max_links, args.concurrency))
+        server.shutdown()
+    else:
+        print(f"Wiki sintético em {base_url}/wiki (Ctrl+C para sair)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,119 @@
+"""
+Teste de carga: latência do chat com buscas concorrentes na knowledge base
+
+Mede a latência (p50/p95/p99) de um endpoint "sonda" em duas fases:
+1. Baseline: apenas a sonda
+2. Carga: a sonda enquanto N workers disparam /knowledge/search em loop
+
+Se as buscas bloqueassem o event loop, a latência da sonda subiria na fase 2.
+
+Uso:
+    python scripts/load_test_knowledge.py --searchers 16 --duration 20
+    python scripts/load_test_knowledge.py --probe chat  # sonda em POST /chat (usa Groq)
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+SEARCH_QUERIES = [
+    "política de devolução de produtos",
+    "metas de vendas da região Sudeste",
+    "processo de aprovação de descontos",
+    "manual do Notebook Pro",
+    "relatório trimestral de vendas",
+]
+
+
+def percentile(values: list, p: float) -> float:
+    """Percentil p (0-100) de uma lista de valores"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class KnowledgeLoadTest:
+    def __init__(self, base_url: str, probe: str, searchers: int, duration: float, interval: float):
+        self.base_url = base_url
+        self.probe = probe
+        self.searchers = searchers
+        self.duration = duration
+        self.interval = interval
+
+    async def _probe_once(self, client: httpx.AsyncClient) -> float:
+        start = time.perf_counter()
+        if self.probe == "chat":
+            response = await client.post("/chat", json={"message": "Olá, tudo bem?"})
+        else:
+            response = await client.get("/")
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    async def _run_probes(self, client: httpx.AsyncClient) -> list:
+        latencies = []
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            latencies.append(await self._probe_once(client))
+            await asyncio.sleep(self.interval)
+        return latencies
+
+    async def _search_worker(self, client: httpx.AsyncClient, stop: asyncio.Event, counter: list):
+        i = 0
+        while not stop.is_set():
+            query = SEARCH_QUERIES[i % len(SEARCH_QUERIES)] + f" {i}"
+            await client.post("/knowledge/search", json={"query": query, "limit": 5})
+            counter[0] += 1
+            i += 1
+
+    async def run(self):
+        timeout = httpx.Timeout(120.0)
+        limits = httpx.Limits(max_connections=self.searchers + 4)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=timeout, limits=limits) as client:
+            print(f"▶ Baseline ({self.duration:.0f}s, sonda={self.probe})...")
+            baseline = await self._run_probes(client)
+
+            print(f"▶ Carga ({self.duration:.0f}s, {self.searchers} buscas concorrentes)...")
+            stop = asyncio.Event()
+            counter = [0]
+            workers = [
+                asyncio.create_task(self._search_worker(client, stop, counter))
+                for _ in range(self.searchers)
+            ]
+            loaded = await self._run_probes(client)
+            stop.set()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        print()
+        print(f"{'fase':<10}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'média ms':>10}")
+        for name, values in (("baseline", baseline), ("carga", loaded)):
+            print(
+                f"{name:<10}{len(values):>6}"
+                f"{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+                f"{percentile(values, 99):>10.1f}{statistics.fmean(values) if values else 0:>10.1f}"
+            )
+        print(f"\nBuscas executadas durante a carga: {counter[0]} ({counter[0] / self.duration:.1f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8081")
+    parser.add_argument("--probe", choices=["health", "chat"], default="health")
+    parser.add_argument("--searchers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=0.05, help="Intervalo entre sondas (s)")
+    args = parser.parse_args()
+
+    load_test = KnowledgeLoadTest(
+        base_url=args.base_url,
+        probe=args.probe,
+        searchers=args.searchers,
+        duration=args.duration,
+        interval=args.interval,
+    )
+    asyncio.run(load_test.run())
@@ -0,0 +1,55 @@
+"""
+Migração da coleção do Qdrant para a configuração atual do Settings
+
+Reconstrói a coleção (quantização, HNSW, on_disk, índices de payload)
+mantendo vetores e payload; não recalcula embeddings.
+
+A coleção é apagada e recriada no lugar (não é sem downtime): execute com a
+API parada ou sem ingestões em andamento. Se interrompida, rode de novo.
+
+Uso:
+    python scripts/migrate_collection.py             # mostra a configuração atual e a nova
+    python scripts/migrate_collection.py --apply     # executa a migração
+"""
+
+import argparse
+import asyncio
+
+from utils import qdrant_collection
+from utils.knowledge_service import knowledge_service
+from utils.settings import settings
+
+
+async def main(apply: bool, batch_size: int) -> None:
+    client = knowledge_service.client
+    collection = knowledge_service.collection
+
+    if await client.collection_exists(collection):
+        info = await client.get_collection(collection)
+        print(f"Coleção {collection}: {info.points_count} pontos")
+        print(f"  atual: {info.config.params.vectors}")
+        print(f"         hnsw={info.config.hnsw_config}")
+        print(f"         quantização={info.config.quantization_config}")
+        print(f"         on_disk_payload={info.config.params.on_disk_payload}")
+    else:
+        print(f"Coleção {collection} não existe (será criada)")
+
+    params = qdrant_collection.collection_params(settings)
+    print("  nova:  " + ", ".join(f"{key}={value}" for key, value in params.items()))
+    print(f"  índices de payload: {list(qdrant_collection.PAYLOAD_INDEXES)}")
+
+    if apply:
+        copied = await qdrant_collection.migrate_collection(client, collection, settings, batch_size)
+        print(f"✅ Migração concluída: {copied} pontos")
+    else:
+        print("Use --apply para migrar")
+
+    await knowledge_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="Executar a migração")
+    parser.add_argument("--batch-size", type=int, default=512, help="Pontos copiados por lote")
+    args = parser.parse_args()
+    asyncio.run(main(args.apply, args.batch_size))
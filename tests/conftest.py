@@ -0,0 +1,19 @@
+"""
+Configuração comum dos testes
+- Variáveis obrigatórias do Settings e arquivos de estado num diretório temporário
+- utils.knowledge substituído: o Knowledge do agno conecta ao Qdrant ao ser criado
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+_DATA_DIR = tempfile.mkdtemp(prefix="test-rag-")
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("INGESTION_JOBS_DIR", os.path.join(_DATA_DIR, "ingestion_jobs"))
+os.environ.setdefault("KNOWLEDGE_HASH_INDEX_PATH", os.path.join(_DATA_DIR, "chunk_hashes.sqlite"))
+os.environ.setdefault("CRAWLER_CACHE_PATH", "")
+
+sys.modules.setdefault("utils.knowledge", types.SimpleNamespace(knowledge=None, get_knowledge=lambda: None))
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.controllers import chat_controller
+from app.schamas.chat_schemas import ChatRequest
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(chat_controller, "_build_agent", lambda *args: SimpleNamespace())
+    named = chat_controller.AgentPool(max_size=2)
+    anonymous = chat_controller.AgentPool(max_size=2)
+    monkeypatch.setattr(chat_controller, "_agent_pool", named)
+    monkeypatch.setattr(chat_controller, "_anonymous_pool", anonymous)
+    return named, anonymous
+
+
+def test_lru_eviction(pools):
+    named, _ = pools
+    first = named.get("a", "m")
+    named.get("b", "m")
+    named.get("a", "m")
+    named.get("c", "m")
+
+    assert named.find("a", "m") is first
+    assert named.find("b", "m") is None
+    assert named.get_stats()["evictions"] == 1
+
+
+def test_anonymous_traffic_does_not_evict_named_sessions(pools):
+    named, anonymous = pools
+    session = chat_controller._get_session(ChatRequest(message="oi", session_id="real"))
+
+    for _ in range(10):
+        chat_controller._get_session(ChatRequest(message="oi"))
+
+    assert chat_controller._get_session(ChatRequest(message="oi", session_id="real")) is session
+    assert named.get_stats()["sessions"] == 1
+    assert anonymous.get_stats()["evictions"] == 8
+
+
+def test_generated_session_id_can_be_reused(pools):
+    first = chat_controller._get_session(ChatRequest(message="oi"))
+    again = chat_controller._get_session(ChatRequest(message="oi", session_id=first.session_id))
+
+    assert again is first
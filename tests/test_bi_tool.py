@@ -0,0 +1,24 @@
+from app.controllers.wrenai_controller import BIResult
+from tools import WrenAi_tools
+from utils.columnar import ColumnarResult
+from utils.settings import settings
+
+
+def _result(rows):
+    return BIResult(
+        sql="SELECT id FROM vendas ORDER BY id",
+        table=ColumnarResult.from_rows([{"id": i} for i in range(rows)]),
+        chart_prompt="Tabela com os resultados",
+        total_rows=rows,
+        truncated=False,
+    )
+
+
+def test_table_follows_bi_tool_max_rows(monkeypatch):
+    monkeypatch.setattr(settings, "bi_tool_max_rows", 15)
+
+    text = WrenAi_tools._format_response(_result(20))
+
+    assert "| 14 |" in text
+    assert "| 15 |" not in text
+    assert "e mais 5 linhas" in text
@@ -0,0 +1,61 @@
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import LRUCache, estimate_size
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" passa a ser o menos usado
+
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_rejects_oversized():
+    value = "x" * 1000
+    cache = LRUCache(max_entries=100, max_bytes=estimate_size(value) * 2)
+    for key in "abc":
+        cache.set(key, value)
+
+    assert len(cache) == 2 and "a" not in cache
+    assert cache.get_stats()["bytes"] <= cache.max_bytes
+
+    cache.set("grande", "x" * 10_000)
+    assert "grande" not in cache
+    assert cache.get_stats()["rejected"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(default_ttl=10)
+    cache.set("padrao", 1)
+    cache.set("curto", 2, ttl=1)
+    cache.set("longo", 3, ttl=100)
+
+    clock[0] += 5
+    assert (cache.get("padrao"), cache.get("curto"), cache.get("longo")) == (1, None, 3)
+
+    clock[0] += 10
+    assert cache.purge_expired() == 1
+    assert len(cache) == 1
+    assert cache.get_stats()["expirations"] == 2
+
+
+def test_overwrite_keeps_byte_count():
+    cache = LRUCache()
+    cache.set("a", "x" * 100)
+    cache.set("a", "y")
+
+    assert cache.get_stats()["bytes"] == estimate_size("y")
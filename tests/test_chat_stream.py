@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+from agno.run.agent import RunEvent
+
+from app.controllers import chat_controller
+from app.schamas.chat_schemas import ChatRequest
+from utils.context_budget import ContextUsage, context_assembler
+
+
+class FakeAgent:
+    """Agent que emite eventos de conteúdo até ser fechado"""
+
+    def __init__(self, block_after=None):
+        self.closed = False
+        self.block_after = block_after  # Simula uma tool call lenta após N tokens
+
+    async def aget_chat_history(self, session_id=None):
+        return []
+
+    def arun(self, message, **kwargs):
+        async def events():
+            try:
+                for index, token in enumerate(["a", "b", "c"]):
+                    if index == self.block_after:
+                        await asyncio.Event().wait()
+                    yield SimpleNamespace(event=RunEvent.run_content.value, content=token)
+                yield SimpleNamespace(event=RunEvent.run_completed.value, metrics=None)
+            finally:
+                self.closed = True
+        return events()
+
+
+def _session(agent):
+    return chat_controller.AgentSession(
+        session_id="s1",
+        model_name="llama-3.3-70b",
+        agent=agent,
+        budget=context_assembler.budget_for("llama-3.3-70b", 2000),
+        usage=ContextUsage(),
+    )
+
+
+def _collect(request, is_disconnected=None):
+    async def run():
+        stream = chat_controller.chat_stream_generator(request, is_disconnected)
+        return await asyncio.wait_for(_consume(stream), 2.0)
+
+    async def _consume(stream):
+        return [event async for event in stream]
+
+    return asyncio.run(run())
+
+
+def test_disconnect_during_slow_tool_cancels_run(monkeypatch):
+    agent = FakeAgent(block_after=1)
+    session = _session(agent)
+    monkeypatch.setattr(chat_controller, "_get_session", lambda request: session)
+    monkeypatch.setattr(chat_controller, "DISCONNECT_POLL_SECONDS", 0.01)
+    cancelled = []
+    monkeypatch.setattr(chat_controller.Agent, "cancel_run", staticmethod(cancelled.append))
+
+    calls = 0
+
+    async def is_disconnected():
+        nonlocal calls
+        calls += 1
+        return calls > 3
+
+    # O agent fica parado após o primeiro token: sem a task de desconexão o stream nunca terminaria
+    events = _collect(ChatRequest(message="oi", session_id="s1"), is_disconnected)
+
+    assert [e.split("\n")[0] for e in events] == ["event: token"]
+    assert len(cancelled) == 1
+    assert agent.closed
+    assert not session.lock.locked()
+
+
+def test_completed_stream_does_not_cancel(monkeypatch):
+    agent = FakeAgent()
+    monkeypatch.setattr(chat_controller, "_get_session", lambda request: _session(agent))
+    cancelled = []
+    monkeypatch.setattr(chat_controller.Agent, "cancel_run", staticmethod(cancelled.append))
+
+    events = _collect(ChatRequest(message="oi", session_id="s1"))
+
+    assert events[-1].startswith("event: done")
+    assert cancelled == []
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from utils.context_budget import TRUNCATION_MARKER, ContextAssembler, TokenCounter, _overlap
+
+
+@pytest.fixture
+def assembler():
+    return ContextAssembler(counter=TokenCounter(chars_per_token=1.0), min_overlap=5)
+
+
+def _naive_overlap(left, right, min_overlap, max_overlap):
+    for size in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def test_overlap_matches_naive_search():
+    generator = random.Random(7)
+    for _ in range(500):
+        left = "".join(generator.choice("ab") for _ in range(generator.randint(0, 30)))
+        right = "".join(generator.choice("ab") for _ in range(generator.randint(0, 30)))
+        for min_overlap, max_overlap in ((1, 40), (3, 10), (5, 5)):
+            assert _overlap(left, right, min_overlap, max_overlap) == _naive_overlap(
+                left, right, min_overlap, max_overlap
+            )
+
+
+def test_dedupe_drops_duplicates_and_trims_overlap(assembler):
+    documents = [
+        {"content": "primeiro chunk com texto repetido no final", "name": "a"},
+        {"content": "primeiro  chunk com texto", "name": "a"},  # Contido (após normalizar)
+        {"content": "texto repetido no final e a continuação", "name": "a"},
+        {"content": "texto repetido no final e outra fonte", "name": "b"},
+        {"content": "primeiro chunk com texto repetido no final", "name": "c"},
+    ]
+
+    kept = assembler.dedupe_chunks(documents)
+
+    assert [document["content"] for document in kept] == [
+        "primeiro chunk com texto repetido no final",
+        "e a continuação",
+        "texto repetido no final e outra fonte",
+    ]
+
+
+def test_dedupe_keeps_container_in_place_of_contained(assembler):
+    kept = assembler.dedupe_chunks([{"content": "meio"}, {"content": "início meio fim"}])
+
+    assert [document["content"] for document in kept] == ["início meio fim"]
+
+
+def test_fit_chunks_respects_budget(assembler):
+    documents = [{"content": "a" * 40}, {"content": "b" * 30}, {"content": "c" * 10}]
+
+    assert [document["content"][0] for document in assembler.fit_chunks(documents, 55)] == ["a", "c"]
+
+    (only,) = assembler.fit_chunks([{"content": "a" * 200}, *documents], 100)
+    assert only["content"].startswith("a") and only["content"].endswith(TRUNCATION_MARKER)
+    assert assembler.count(only["content"]) <= 100
+
+
+def test_compress_tool_output_drops_table_rows(assembler):
+    rows = [f"| {i} | linha {i} |" for i in range(50)]
+    text = "\n".join(["**SQL:** SELECT 1", "| id | nome |", "|---|---|", *rows, "Sugestão: tabela"])
+
+    compressed = assembler.compress_tool_output(text, 300)
+
+    assert assembler.count(compressed) <= 300
+    assert compressed.startswith("**SQL:** SELECT 1\n| id | nome |\n|---|---|\n| 0 |")
+    assert compressed.endswith("Sugestão: tabela")
+    kept = sum(1 for line in compressed.split("\n") if line.startswith("| ") and "linha" in line)
+    assert f"*... {50 - kept} linhas omitidas" in compressed
+    # A próxima linha já não caberia
+    assert assembler.count(compressed.replace(rows[kept - 1], f"{rows[kept - 1]}\n{rows[kept]}")) > 300
+
+
+def test_compress_tool_output_truncates_plain_text(assembler):
+    compressed = assembler.compress_tool_output("x" * 500, 100, keep="tail")
+
+    assert compressed.startswith(TRUNCATION_MARKER)
+    assert assembler.count(compressed) <= 100
+
+
+def test_trim_history_keeps_recent_turns_and_summarizes_rest(assembler):
+    turns = [(f"pergunta {i}", "r" * 40) for i in range(5)]
+
+    kept, summary, used = assembler.trim_history(turns, max_tokens=110, summary_tokens=200)
+
+    assert kept == 2
+    assert used == 2 * (len("pergunta 0") + 40)
+    assert summary.splitlines()[1:] == [f"- Usuário perguntou: pergunta {i}" for i in range(3)]
+
+    assert assembler.trim_history(turns, max_tokens=110, summary_tokens=0)[1] is None
+
+
+def test_dedupe_keeps_original_formatting(assembler):
+    table = "| id | nome |\n|---|---|\n| 1 | Ana |"
+    documents = [
+        {"content": f"Clientes:\n\n{table}\n", "name": "a"},
+        {"content": "| id | nome | |---|---|", "name": "b"},  # Contido (após normalizar)
+        {"content": "Outro\ttrecho\ncom linhas", "name": "c"},
+    ]
+
+    kept = assembler.dedupe_chunks(documents)
+
+    assert [document["content"] for document in kept] == [f"Clientes:\n\n{table}", "Outro\ttrecho\ncom linhas"]
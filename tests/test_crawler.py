@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+
+from utils.crawler import WebCrawler
+
+PAGES = {
+    "/": '<a href="/a">a</a><a href="/b">b</a><a href="/c">c</a>',
+    "/a": "pagina a",
+    "/b": "pagina b",
+    "/c": "pagina c",
+}
+
+
+def _crawl(status=None, max_links=10):
+    status = status or {}
+
+    def handler(request):
+        path = request.url.path
+        if path in status:
+            return httpx.Response(status[path])
+        return httpx.Response(200, html=PAGES.get(path, ""))
+
+    crawler = WebCrawler(
+        max_depth=1,
+        max_links=max_links,
+        respect_robots=False,
+        transport=httpx.MockTransport(handler),
+    )
+
+    async def run():
+        return [page.url async for page in crawler.crawl("https://site.test/")]
+
+    return crawler, asyncio.run(run())
+
+
+def test_clean_crawl_is_complete():
+    crawler, urls = _crawl()
+
+    assert len(urls) == 4
+    assert crawler.complete
+
+
+def test_gone_page_keeps_crawl_complete():
+    crawler, urls = _crawl(status={"/b": 404})
+
+    assert "https://site.test/b" not in urls
+    assert crawler.complete
+
+
+def test_failed_page_marks_crawl_partial():
+    crawler, urls = _crawl(status={"/b": 503})
+
+    assert "https://site.test/b" not in urls
+    assert not crawler.complete
+    assert crawler.get_stats()["errors"] == 1
+
+
+def test_link_limit_marks_crawl_partial():
+    crawler, urls = _crawl(max_links=2)
+
+    assert len(urls) == 2
+    assert not crawler.complete
+
+
+def _run(crawler, start_url):
+    async def run():
+        return [page.url async for page in crawler.crawl(start_url)]
+    return asyncio.run(run())
+
+
+def test_redirected_start_url_keeps_crawling_final_domain():
+    def handler(request):
+        if request.url.host == "example.com":
+            return httpx.Response(301, headers={"location": f"https://www.example.com{request.url.path}"})
+        return httpx.Response(200, html=PAGES.get(request.url.path, ""))
+
+    crawler = WebCrawler(max_depth=1, respect_robots=False, transport=httpx.MockTransport(handler))
+
+    urls = _run(crawler, "https://example.com/")
+
+    assert sorted(urls) == [
+        "https://example.com/",
+        "https://www.example.com/a",
+        "https://www.example.com/b",
+        "https://www.example.com/c",
+    ]
+    assert crawler.complete
+
+
+def _robots_crawler(robots_status):
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return httpx.Response(robots_status, text="")
+        return httpx.Response(200, html=PAGES.get(request.url.path, ""))
+
+    return WebCrawler(max_depth=1, transport=httpx.MockTransport(handler))
+
+
+def test_robots_server_error_blocks_host_and_marks_partial():
+    crawler = _robots_crawler(503)
+
+    assert _run(crawler, "https://site.test/") == []
+    assert not crawler.complete
+
+
+def test_missing_robots_allows_everything():
+    crawler = _robots_crawler(404)
+
+    assert len(_run(crawler, "https://site.test/")) == 4
+    assert crawler.complete
@@ -0,0 +1,70 @@
+import asyncio
+
+import numpy as np
+
+from utils.embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+def test_query_normalization_and_model_in_key():
+    cache = QueryEmbeddingCache(model_id="modelo-a")
+    cache.set("Vendas  por\tRegião", [1.0, 2.0])
+
+    assert normalize_query("  Vendas  por\tRegião ") == "vendas por região"
+    assert cache.get("vendas por região").tolist() == [1.0, 2.0]
+    assert cache.make_key("vendas") != QueryEmbeddingCache(model_id="modelo-b").make_key("vendas")
+
+
+def test_vectors_stored_as_float32():
+    cache = QueryEmbeddingCache(model_id="m")
+
+    assert cache.set("q", [0.5, 0.25]).dtype == np.float32
+    assert cache.get("q").dtype == np.float32
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    writer = QueryEmbeddingCache(model_id="m", disk_path=path)
+    writer.set("vendas", [1.0, 2.0])
+    writer.close()
+
+    reader = QueryEmbeddingCache(model_id="m", disk_path=path)
+    assert len(reader) == 0
+    assert reader.get("vendas").tolist() == [1.0, 2.0]
+    assert len(reader) == 1
+    assert reader.get("vendas").tolist() == [1.0, 2.0]
+
+    stats = reader.get_stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["disk"]["entries"] == 1
+    reader.close()
+
+
+def test_memory_eviction_and_disk_pruning(tmp_path):
+    cache = QueryEmbeddingCache(model_id="m", max_entries=2, disk_path=str(tmp_path / "q.sqlite"), disk_max_entries=10)
+    for i in range(256):
+        cache.set(f"query {i}", [float(i)])
+
+    assert len(cache) == 2
+    assert cache.get_stats()["memory"]["evictions"] == 254
+    # Poda do disco a cada 256 gravações: ficam as mais recentes
+    assert cache.get_stats()["disk"]["entries"] == 10
+    assert cache.get("query 250").tolist() == [250.0]
+    assert cache.get("query 0") is None
+    cache.close()
+
+
+def test_async_path_and_hit_rate(tmp_path):
+    cache = QueryEmbeddingCache(model_id="m", disk_path=str(tmp_path / "q.sqlite"))
+
+    async def run():
+        assert await cache.aget("vendas") is None
+        await cache.aset("vendas", [1.0])
+        assert (await cache.aget("VENDAS")).tolist() == [1.0]
+        assert (await cache.aget("vendas")).tolist() == [1.0]
+
+    asyncio.run(run())
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (2, 0, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    cache.close()
@@ -0,0 +1,75 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from utils import embedding_service as module
+from utils.embedding_service import EmbeddingService
+
+
+def _pid_init(model_name, onnx_threads):
+    pass
+
+
+def _pid_embed(texts):
+    """Executado no worker: devolve o pid para provar que rodou em outro processo"""
+    return np.array([[len(text), os.getpid()] for text in texts], dtype=np.float32)
+
+
+class BrokenExecutor(ThreadPoolExecutor):
+    """Executor que se comporta como um pool de processos com worker morto"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        raise BrokenProcessPool("worker encerrado")
+
+
+def _service(monkeypatch, executors):
+    monkeypatch.setattr(module, "_embed_batch", lambda texts: np.array([[len(t), 1.0] for t in texts]))
+    service = EmbeddingService(model_name="fake", max_wait_ms=1, workers=2, use_processes=False)
+    monkeypatch.setattr(service, "_create_executor", lambda: executors.pop(0))
+    return service
+
+
+def test_batch_tasks_are_tracked_until_done(monkeypatch):
+    service = _service(monkeypatch, [ThreadPoolExecutor(max_workers=2)])
+
+    async def run():
+        vectors = await service.embed_many(["a", "bb", "ccc"])
+        await asyncio.sleep(0)
+        return vectors
+
+    assert asyncio.run(run()) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert service.get_stats()["running_batches"] == 0
+
+
+def test_broken_pool_is_recreated(monkeypatch):
+    service = _service(monkeypatch, [BrokenExecutor(), ThreadPoolExecutor(max_workers=2)])
+
+    assert asyncio.run(service.embed("abcd")) == [4.0, 1.0]
+    assert service.get_stats()["pool_restarts"] == 1
+    assert not isinstance(service._executor, BrokenExecutor)
+
+
+def test_process_pool_uses_spawn(monkeypatch):
+    # Funções do próprio módulo de teste: importáveis pelo processo filho (spawn)
+    monkeypatch.setattr(module, "_init_worker", _pid_init)
+    monkeypatch.setattr(module, "_embed_batch", _pid_embed)
+    service = EmbeddingService(model_name="fake", max_wait_ms=1, workers=1, use_processes=True)
+
+    async def run():
+        try:
+            return await service.embed_many(["a", "bb"]), service._executor._mp_context.get_start_method()
+        finally:
+            await service.close()
+
+    vectors, start_method = asyncio.run(run())
+
+    assert start_method == "spawn"
+    assert [vector[0] for vector in vectors] == [1.0, 2.0]
+    assert vectors[0][1] != os.getpid()
+
+
+def test_default_pool_is_small():
+    assert EmbeddingService(model_name="fake").workers <= module.DEFAULT_WORKERS
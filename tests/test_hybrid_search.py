@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+from qdrant_client import models
+
+from utils import qdrant_collection
+from utils.knowledge_service import KnowledgeService
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, BM25SparseEncoder, token_index, tokenize
+
+
+class FakeQdrantClient:
+    """Coleção com ou sem vetor esparso; registra as consultas"""
+
+    def __init__(self, sparse=True):
+        self.sparse = sparse
+        self.info_calls = 0
+        self.queries = []
+
+    async def collection_exists(self, collection):
+        return True
+
+    async def get_collection(self, collection):
+        self.info_calls += 1
+        sparse_vectors = {SPARSE_VECTOR_NAME: models.SparseVectorParams()} if self.sparse else None
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(sparse_vectors=sparse_vectors)))
+
+    async def query_points(self, **kwargs):
+        self.queries.append(kwargs)
+        point = SimpleNamespace(id=1, score=0.5, payload={"content": "texto", "meta_data": {}, "name": "doc"})
+        return SimpleNamespace(points=[point])
+
+
+class FakeEmbeddingService:
+    async def embed_query(self, query):
+        return [0.1, 0.2]
+
+
+def _service(client):
+    vector_db = SimpleNamespace(async_client=client, collection="teste")
+    return KnowledgeService(vector_db=vector_db, embedding_service=FakeEmbeddingService())
+
+
+def test_tokenize_strips_accents_stopwords_and_splits_codes():
+    assert tokenize("Preço do NB-PRO-15 na Região") == ["preco", "nb-pro-15", "nb", "pro", "15", "regiao"]
+
+
+def test_encode_document_and_query():
+    encoder = BM25SparseEncoder(k1=1.2, b=0.0)
+    document = encoder.encode_document("notebook notebook mouse")
+    weights = dict(zip(document.indices, document.values))
+
+    assert weights[token_index("notebook")] > weights[token_index("mouse")]
+    assert weights[token_index("mouse")] == 1.0  # tf=1 com b=0: (k1 + 1) / (1 + k1)
+
+    query = encoder.encode_query("Mouse mouse notebook")
+    assert query.indices == sorted({token_index("mouse"), token_index("notebook")})
+    assert query.values == [1.0, 1.0]
+
+
+def test_hybrid_query_fuses_dense_and_sparse_prefetch(monkeypatch):
+    monkeypatch.setattr(qdrant_collection, "_sparse_support", {})
+    client = FakeQdrantClient()
+    query_filter = models.Filter(must=[models.FieldCondition(key="meta_data.source", match=models.MatchValue(value="a"))])
+
+    hits = asyncio.run(_service(client)._query("NB-PRO-15", 3, "hybrid", query_filter))
+
+    (request,) = client.queries
+    dense, sparse = request["prefetch"]
+    assert request["query"] == models.FusionQuery(fusion=models.Fusion.RRF)
+    assert request["limit"] == 3
+    assert dense.query == [0.1, 0.2] and dense.using is None
+    assert sparse.using == SPARSE_VECTOR_NAME
+    assert token_index("nb-pro-15") in sparse.query.indices
+    assert dense.filter == sparse.filter == query_filter
+    assert dense.limit == sparse.limit == 3 * qdrant_collection.settings.hybrid_prefetch_multiplier
+    assert [hit.content for hit in hits] == ["texto"]
+
+
+def test_collection_without_sparse_falls_back_then_rechecks(monkeypatch):
+    monkeypatch.setattr(qdrant_collection, "_sparse_support", {})
+    now = [100.0]
+    monkeypatch.setattr(qdrant_collection.time, "monotonic", lambda: now[0])
+    client = FakeQdrantClient(sparse=False)
+    service = _service(client)
+
+    asyncio.run(service._query("notebook", 3, "hybrid"))
+    assert "prefetch" not in client.queries[-1]
+
+    # Migrada com a API rodando: percebida após SPARSE_RECHECK_SECONDS
+    client.sparse = True
+    asyncio.run(service._query("notebook", 3, "hybrid"))
+    assert "prefetch" not in client.queries[-1]
+
+    now[0] += qdrant_collection.SPARSE_RECHECK_SECONDS
+    asyncio.run(service._query("notebook", 3, "hybrid"))
+    assert "prefetch" in client.queries[-1]
+
+    asyncio.run(service._query("notebook", 3, "hybrid"))
+    assert client.info_calls == 2  # Positivo fica em cache
@@ -0,0 +1,234 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from agno.knowledge.document.base import Document
+from fastapi import UploadFile
+
+from app.controllers import knowledge_controller
+from utils import vector_db as vector_db_module
+from utils.hash_index import ChunkHashIndex, chunk_hash
+from utils.ingestion_jobs import IngestionJob
+from utils.vector_db import QdrantBatchWriter
+
+
+class FakeQdrantClient:
+    """Coleção em memória: upsert por id, como no Qdrant"""
+
+    def __init__(self):
+        self.points = {}
+        self.upserts = 0
+        self.fail_on = None  # Conteúdo que faz o upsert do lote falhar
+
+    async def upsert(self, collection_name, points, wait=True):
+        if any(point.payload["content"] == self.fail_on for point in points):
+            raise ConnectionError("qdrant indisponível")
+        self.upserts += 1
+        for point in points:
+            self.points[point.id] = point
+
+    def hashes(self):
+        return {point.payload["meta_data"]["chunk_hash"] for point in self.points.values()}
+
+
+class FakeEmbeddingService:
+    async def embed_many(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class Harness:
+    def __init__(self, monkeypatch, tmp_path):
+        self.client = FakeQdrantClient()
+        self.vector_db = SimpleNamespace(async_client=self.client, collection="test")
+        self.index = ChunkHashIndex(str(tmp_path / "hashes.sqlite"))
+        self.deleted = []
+        self.refreshed = []
+        self.content = []
+        self.crawl_complete = True
+
+        async def ensure_collection(client, collection):
+            return False
+
+        async def has_sparse_vectors(client, collection):
+            return False
+
+        async def iter_batches(job, batch_size, crawler=None):
+            async def batches():
+                for start in range(0, len(self.content), batch_size):
+                    yield [Document(content=text, meta_data={}) for text in self.content[start:start + batch_size]]
+            return batches()
+
+        async def get_source_hashes(source):
+            return set()
+
+        async def delete_chunks(source, hashes):
+            self.deleted.append(set(hashes))
+
+        async def update_chunks_metadata(source, hashes, meta_data):
+            self.refreshed.append((set(hashes), meta_data))
+
+        monkeypatch.setattr(vector_db_module, "ensure_collection", ensure_collection)
+        monkeypatch.setattr(vector_db_module, "has_sparse_vectors", has_sparse_vectors)
+        monkeypatch.setattr(knowledge_controller, "_iter_batches", iter_batches)
+        monkeypatch.setattr(knowledge_controller, "chunk_hash_index", self.index)
+        monkeypatch.setattr(knowledge_controller.knowledge_service, "get_source_hashes", get_source_hashes)
+        monkeypatch.setattr(knowledge_controller.knowledge_service, "delete_chunks", delete_chunks)
+        monkeypatch.setattr(knowledge_controller.knowledge_service, "update_chunks_metadata", update_chunks_metadata)
+        monkeypatch.setattr(
+            knowledge_controller, "_get_crawler", lambda job: SimpleNamespace(complete=self.crawl_complete)
+        )
+        monkeypatch.setattr(knowledge_controller, "get_batch_writer", self.writer)
+        monkeypatch.setattr(knowledge_controller.settings, "ingestion_batch_size", 3)
+
+    def writer(self, on_written=None):
+        return QdrantBatchWriter(
+            vector_db=self.vector_db,
+            embedding_service=FakeEmbeddingService(),
+            batch_size=2,
+            parallelism=2,
+            on_written=on_written,
+        )
+
+    def ingest(self, content, source="dados.json", content_type="json", tags=None):
+        self.content = content
+        job = IngestionJob(content_type=content_type, source=source, params={"tags": tags or []})
+        asyncio.run(knowledge_controller._process_ingestion_job(job, _update))
+        return job
+
+
+def _update(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+@pytest.fixture
+def harness(monkeypatch, tmp_path):
+    return Harness(monkeypatch, tmp_path)
+
+
+def _texts(count, prefix="chunk"):
+    return [f"{prefix} {i}" for i in range(count)]
+
+
+def test_every_batch_of_a_source_is_kept(harness):
+    texts = _texts(10)
+
+    job = harness.ingest(texts)
+
+    assert harness.client.hashes() == {chunk_hash(text) for text in texts}
+    assert harness.client.upserts == 5
+    assert job.chunks_added == 10
+    assert harness.index.get_hashes("dados.json") == harness.client.hashes()
+
+
+def test_payload_has_no_user_key(harness):
+    harness.ingest(_texts(3))
+
+    payload = next(iter(harness.client.points.values())).payload
+    assert set(payload) == {"name", "meta_data", "content", "usage", "content_id", "content_hash"}
+
+
+def test_failed_upsert_fails_job_and_is_not_indexed(harness):
+    texts = _texts(10)
+    harness.client.fail_on = "chunk 5"
+
+    with pytest.raises(ConnectionError):
+        harness.ingest(texts)
+
+    indexed = harness.index.get_hashes("dados.json")
+    assert indexed == harness.client.hashes()
+    assert chunk_hash("chunk 4") not in indexed and chunk_hash("chunk 5") not in indexed
+    assert {chunk_hash(text) for text in texts[:4]} <= indexed
+
+
+def test_retry_resumes_after_last_written_batch(harness):
+    texts = _texts(10)
+    harness.client.fail_on = "chunk 5"
+    with pytest.raises(ConnectionError):
+        harness.ingest(texts)
+    written_before = set(harness.client.points)
+    upserts_before = harness.client.upserts
+
+    harness.client.fail_on = None
+    job = harness.ingest(texts)
+
+    assert job.chunks_skipped == len(written_before)
+    assert job.chunks_added == 10 - len(written_before)
+    assert harness.client.hashes() == {chunk_hash(text) for text in texts}
+    assert harness.client.upserts - upserts_before == -(-job.chunks_added // 2)
+
+
+def test_unchanged_chunks_are_skipped_and_vanished_removed(harness):
+    harness.ingest(_texts(6))
+
+    job = harness.ingest(_texts(5))
+
+    assert job.chunks_skipped == 5
+    assert job.chunks_removed == 1
+    assert harness.deleted == [{chunk_hash("chunk 5")}]
+
+
+def test_unchanged_chunks_get_fresh_tags(harness):
+    harness.ingest(_texts(4), tags=["antiga"])
+
+    harness.ingest(_texts(4), tags=["nova"])
+
+    refreshed = set().union(*(hashes for hashes, _ in harness.refreshed))
+    assert refreshed == {chunk_hash(text) for text in _texts(4)}
+    assert all(meta["tags"] == ["nova"] for _, meta in harness.refreshed)
+
+
+def test_partial_crawl_keeps_missing_chunks(harness):
+    url = "https://example.com"
+    harness.ingest(_texts(6), source=url, content_type="url")
+    harness.crawl_complete = False
+
+    job = harness.ingest(_texts(3), source=url, content_type="url")
+
+    assert harness.deleted == []
+    assert job.chunks_removed == 0
+
+    harness.crawl_complete = True
+    job = harness.ingest(_texts(3), source=url, content_type="url")
+    assert job.chunks_removed == 3
+
+
+def test_uploads_with_same_name_get_distinct_sources(monkeypatch, tmp_path):
+    submitted = []
+
+    class FakeQueue:
+        store = SimpleNamespace(spool_path=lambda job_id, suffix: str(tmp_path / f"{job_id}{suffix}"))
+
+        async def submit(self, job):
+            submitted.append(job)
+
+    monkeypatch.setattr(knowledge_controller, "get_ingestion_queue", lambda: FakeQueue())
+
+    def upload(content):
+        return UploadFile(io.BytesIO(content), filename="dados.json")
+
+    async def run():
+        await knowledge_controller.add_json_to_knowledge(upload(b'[{"a": 1}]'))
+        await knowledge_controller.add_json_to_knowledge(upload(b'[{"a": 2}]'))
+        await knowledge_controller.add_json_to_knowledge(upload(b'[{"a": 1}]'))
+        await knowledge_controller.add_json_to_knowledge(upload(b'[{"a": 3}]'), source_id="catalogo")
+
+    asyncio.run(run())
+
+    sources = [job.source for job in submitted]
+    assert sources[0] != sources[1] and sources[0] == sources[2]
+    assert sources[0].startswith("dados.json#")
+    assert sources[3] == "catalogo"
+    assert submitted[3].params["filename"] == "dados.json"
+    assert (tmp_path / f"{submitted[1].id}.json").read_bytes() == b'[{"a": 2}]'
+
+
+def test_hash_index_opens_lazily(tmp_path):
+    path = tmp_path / "sub" / "hashes.sqlite"
+    index = ChunkHashIndex(str(path))
+    assert not path.exists()
+
+    index.add("origem", ["h1"])
+    assert path.exists()
+    assert index.get_hashes("origem") == {"h1"}
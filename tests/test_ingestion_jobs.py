@@ -0,0 +1,154 @@
+import asyncio
+import threading
+
+from utils.ingestion_jobs import IngestionJob, IngestionJobQueue, JobStatus, JobStore
+
+
+async def _wait_finished(job, timeout=2.0):
+    async def poll():
+        while not job.finished:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def _job(source="dados.json"):
+    return IngestionJob(content_type="json", source=source)
+
+
+def test_jobs_complete_or_fail(tmp_path):
+    async def handler(job, update):
+        if job.source == "ruim.json":
+            raise ValueError("arquivo inválido")
+        update(job, stage="indexing", chunks_processed=3)
+
+    async def run():
+        queue = IngestionJobQueue(handler, JobStore(str(tmp_path)), workers=2)
+        await queue.start()
+        ok, bad = await queue.submit(_job()), await queue.submit(_job("ruim.json"))
+        await _wait_finished(ok)
+        await _wait_finished(bad)
+        await queue.stop()
+        return queue, ok, bad
+
+    queue, ok, bad = asyncio.run(run())
+
+    assert (ok.status, ok.stage, ok.chunks_processed) == (JobStatus.COMPLETED.value, "done", 3)
+    assert (bad.status, bad.error) == (JobStatus.FAILED.value, "arquivo inválido")
+    assert queue.get_stats()["jobs"]["completed"] == 1
+    stored = {job.id: job for job in JobStore(str(tmp_path)).load_all()}
+    assert stored[ok.id].status == JobStatus.COMPLETED.value
+
+
+def test_cancel_running_job_removes_spool(tmp_path):
+    started = None
+    spool = tmp_path / "envio.json"
+    spool.write_text("[]")
+
+    async def handler(job, update):
+        started.set()
+        await asyncio.Event().wait()
+
+    async def run():
+        nonlocal started
+        started = asyncio.Event()
+        queue = IngestionJobQueue(handler, JobStore(str(tmp_path / "jobs")), workers=1)
+        await queue.start()
+        job = _job()
+        job.spool_path = str(spool)
+        await queue.submit(job)
+        await asyncio.wait_for(started.wait(), 2.0)
+        queue.cancel(job.id)
+        await _wait_finished(job)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == JobStatus.CANCELLED.value
+    assert not spool.exists()
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    store = JobStore(str(tmp_path))
+    seen = []
+
+    async def blocked(job, update):
+        update(job, chunks_processed=5)
+        await asyncio.Event().wait()
+
+    async def resumed(job, update):
+        seen.append((job.attempts, job.resumed_from))
+
+    async def run():
+        queue = IngestionJobQueue(blocked, store, workers=1)
+        await queue.start()
+        job = await queue.submit(_job())
+        while job.chunks_processed < 5:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        restarted = IngestionJobQueue(resumed, store, workers=1)
+        await restarted.start()
+        job = restarted.get(job.id)
+        await _wait_finished(job)
+        await restarted.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == JobStatus.COMPLETED.value
+    assert seen == [(2, 5)]
+
+
+def test_finished_jobs_are_pruned(tmp_path):
+    async def handler(job, update):
+        pass
+
+    async def run():
+        queue = IngestionJobQueue(handler, JobStore(str(tmp_path)), workers=1, keep_finished=2)
+        await queue.start()
+        jobs = [await queue.submit(_job(f"{i}.json")) for i in range(4)]
+        for job in jobs:
+            await _wait_finished(job)
+        await queue.stop()
+        return queue, jobs
+
+    queue, jobs = asyncio.run(run())
+
+    assert [job.source for job in queue.list()] == ["3.json", "2.json"]
+    assert {job.id for job in JobStore(str(tmp_path)).load_all()} == {jobs[2].id, jobs[3].id}
+
+
+def test_progress_saves_are_throttled_and_off_loop(tmp_path):
+    class CountingStore(JobStore):
+        def __init__(self, directory):
+            super().__init__(directory)
+            self.saves = []
+
+        def save(self, job):
+            self.saves.append(threading.get_ident())
+            super().save(job)
+
+    store = CountingStore(str(tmp_path))
+
+    async def handler(job, update):
+        update(job, stage="embedding")
+        for processed in range(1, 101):
+            update(job, chunks_processed=processed)
+        update(job, stage="indexing")
+
+    async def run():
+        queue = IngestionJobQueue(handler, store, workers=1)
+        await queue.start()
+        job = await queue.submit(_job())
+        await _wait_finished(job)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    # submit + running + estágios "embedding" e "indexing" + finalização (progresso descartado pelo throttle)
+    assert len(store.saves) == 5
+    assert threading.get_ident() not in store.saves
+    (stored,) = JobStore(str(tmp_path)).load_all()
+    assert (stored.status, stored.chunks_processed) == (JobStatus.COMPLETED.value, job.chunks_processed)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from qdrant_client import models
+
+from app.routers import chat_router, knowledge_router
+from app.schamas.document_schemas import SearchFilters
+from utils.knowledge_service import KnowledgeService, knowledge_service
+
+
+def _condition(key, values):
+    return models.FieldCondition(key=key, match=models.MatchAny(any=values))
+
+
+@pytest.mark.parametrize("name, key", [
+    ("source", "meta_data.source"),
+    ("domain", "meta_data.domain"),
+    ("content_type", "meta_data.content_type"),
+    ("tags", "meta_data.tags"),
+])
+def test_each_field_becomes_match_any(name, key):
+    assert KnowledgeService.build_filter({name: ["a", "b"]}) == models.Filter(must=[_condition(key, ["a", "b"])])
+    assert KnowledgeService.build_filter({name: "a"}) == models.Filter(must=[_condition(key, ["a"])])
+
+
+def test_combined_filter():
+    after = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    filters = SearchFilters(
+        source=["manual.pdf"],
+        content_type=["pdf"],
+        tags=["rh"],
+        ingested_after=after,
+        ingested_before=datetime(2024, 2, 1, tzinfo=timezone.utc),
+    ).to_dict()
+
+    assert KnowledgeService.build_filter(filters) == models.Filter(must=[
+        _condition("meta_data.source", ["manual.pdf"]),
+        _condition("meta_data.content_type", ["pdf"]),
+        _condition("meta_data.tags", ["rh"]),
+        models.FieldCondition(
+            key="meta_data.ingested_at",
+            range=models.Range(gte=after.timestamp(), lte=datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp()),
+        ),
+    ])
+
+
+def test_empty_filters():
+    assert KnowledgeService.build_filter(None) is None
+    assert KnowledgeService.build_filter(SearchFilters().to_dict()) is None
+    assert KnowledgeService.build_filter({"tags": []}) is None
+
+
+def test_unknown_key_is_rejected():
+    filters = SearchFilters.model_validate({"sources": ["manual.pdf"]}).to_dict()
+
+    with pytest.raises(ValueError, match="sources"):
+        KnowledgeService.build_filter(filters)
+    with pytest.raises(ValueError):
+        asyncio.run(knowledge_service.retrieve("férias", filters={"tag": ["rh"]}))
+
+
+def _app():
+    app = FastAPI()
+    app.include_router(chat_router.router)
+    app.include_router(knowledge_router.router)
+    return TestClient(app)
+
+
+def test_routes_answer_400_for_unknown_filters():
+    client = _app()
+
+    response = client.post("/chat", json={"message": "oi", "knowledge_filters": {"tag": ["rh"]}})
+    assert response.status_code == 400
+    assert "tag" in response.json()["detail"]
+
+    response = client.post("/chat/stream", json={"message": "oi", "knowledge_filters": {"tag": ["rh"]}})
+    assert response.status_code == 400
+
+    response = client.post("/knowledge/search", json={"query": "férias", "filters": {"tag": ["rh"]}})
+    assert response.status_code == 400
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.controllers import knowledge_controller
+from utils.knowledge_service import KnowledgeService, decode_cursor, encode_cursor
+
+
+class FakeQdrantClient:
+    """Coleção em memória com scroll por id e registro das contagens"""
+
+    def __init__(self, count):
+        self.points = [
+            SimpleNamespace(id=i, payload={"content": f"chunk {i}", "name": "doc", "meta_data": {"page": i}})
+            for i in range(count)
+        ]
+        self.count_calls = []
+
+    async def count(self, collection, exact=True):
+        self.count_calls.append(exact)
+        return SimpleNamespace(count=len(self.points))
+
+    async def scroll(self, collection_name, limit, offset=None, with_payload=True, with_vectors=False):
+        start = offset or 0
+        page = self.points[start:start + limit]
+        if isinstance(with_payload, list):
+            page = [
+                SimpleNamespace(id=p.id, payload={k: v for k, v in p.payload.items() if k in with_payload})
+                for p in page
+            ]
+        next_offset = start + limit if start + limit < len(self.points) else None
+        return page, next_offset
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeQdrantClient(count=7)
+    service = KnowledgeService(vector_db=SimpleNamespace(async_client=fake, collection="teste"), embedding_service=None)
+    monkeypatch.setattr(knowledge_controller, "knowledge_service", service)
+    monkeypatch.setattr(knowledge_controller.settings, "knowledge_export_batch_size", 3)
+    return fake
+
+
+@pytest.mark.parametrize("offset", [0, 42, str(uuid.uuid4())])
+def test_cursor_round_trip(offset):
+    assert decode_cursor(encode_cursor(offset)) == offset
+    assert encode_cursor(None) is None and decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "bm90LWpzb24", encode_cursor(1)[:-2], "eyJ4IjogMX0", "eyJvIjogW119"])
+def test_malformed_cursor_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_listing_walks_pages_with_approximate_count(client):
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(knowledge_controller.list_documents(limit=3, cursor=cursor, fields=["name"]))
+        seen += [document.id for document in page.documents]
+        assert page.total == 7
+        assert all(document.content is None and document.metadata == {"name": "doc"} for document in page.documents)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [str(i) for i in range(7)]
+    assert client.count_calls[0] is False
+
+
+def test_status_uses_exact_count(client):
+    status = asyncio.run(knowledge_controller.get_knowledge_status())
+
+    assert status.total_documents == 7
+    assert client.count_calls == [True]
+
+
+def test_export_streams_every_point_in_batches(client):
+    async def export():
+        return [block async for block in knowledge_controller.export_documents()]
+
+    blocks = asyncio.run(export())
+
+    assert len(blocks) == 3
+    rows = [json.loads(line) for block in blocks for line in block.splitlines()]
+    assert [row["id"] for row in rows] == [str(i) for i in range(7)]
+    assert rows[0] == {"id": "0", "content": "chunk 0", "name": "doc", "meta_data": {"page": 0}}
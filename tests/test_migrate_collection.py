@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import models
+
+from utils import qdrant_collection
+from utils.settings import settings
+from utils.sparse_encoder import SPARSE_VECTOR_NAME
+
+DIMS = 3
+TEMP = "docs__migration"
+
+
+class FakeQdrantClient:
+    """Coleções em memória: nome -> {"params": ..., "points": {id: ponto}}"""
+
+    def __init__(self):
+        self.collections = {}
+        self.created = []
+
+    def add(self, name, count, sparse=False, params=None):
+        self.collections[name] = {"params": params or {}, "points": {}}
+        for i in range(count):
+            vector = [float(i), 1.0, 0.0]
+            if sparse:
+                vector = {"": vector, SPARSE_VECTOR_NAME: models.SparseVector(indices=[i], values=[1.0])}
+            self.collections[name]["points"][i] = models.Record(id=i, vector=vector, payload={"content": f"chunk {i}"})
+
+    def points(self, name):
+        return self.collections[name]["points"]
+
+    async def collection_exists(self, name):
+        return name in self.collections
+
+    async def get_collection(self, name):
+        vectors = models.VectorParams(size=DIMS, distance=models.Distance.COSINE)
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=vectors, sparse_vectors=None)))
+
+    async def count(self, name, exact=True):
+        return SimpleNamespace(count=len(self.points(name)))
+
+    async def create_collection(self, collection_name, **params):
+        assert collection_name not in self.collections
+        self.created.append(collection_name)
+        self.collections[collection_name] = {"params": params, "points": {}}
+
+    async def create_payload_index(self, collection_name, field_name, field_schema):
+        self.collections[collection_name].setdefault("indexes", set()).add(field_name)
+
+    async def delete_collection(self, name):
+        self.collections.pop(name, None)
+
+    async def scroll(self, collection_name, limit, offset=None, with_payload=True, with_vectors=False):
+        ids = sorted(self.points(collection_name))
+        start = ids.index(offset) if offset is not None else 0
+        page = [self.points(collection_name)[i] for i in ids[start:start + limit]]
+        next_offset = ids[start + limit] if start + limit < len(ids) else None
+        return page, next_offset
+
+    async def upsert(self, collection_name, points, wait=True):
+        for point in points:
+            self.points(collection_name)[point.id] = point
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(qdrant_collection, "_sparse_support", {})
+    return settings.model_copy(update={"embedder_dimensions": DIMS, "hybrid_search_enabled": True})
+
+
+def _migrate(client, config):
+    return asyncio.run(qdrant_collection.migrate_collection(client, "docs", config, batch_size=2))
+
+
+def test_fresh_migration_rebuilds_collection_with_bm25(config):
+    client = FakeQdrantClient()
+    client.add("docs", 5)
+
+    assert _migrate(client, config) == 5
+
+    assert set(client.collections) == {"docs"}
+    assert client.created == [TEMP, "docs"]
+    assert client.collections["docs"]["params"]["sparse_vectors_config"] is not None
+    assert set(qdrant_collection.PAYLOAD_INDEXES) <= client.collections["docs"]["indexes"]
+    points = client.points("docs")
+    assert sorted(points) == [0, 1, 2, 3, 4]
+    assert points[3].vector[""] == [3.0, 1.0, 0.0]
+    assert points[3].vector[SPARSE_VECTOR_NAME].indices  # BM25 calculado do conteúdo
+    assert points[3].payload == {"content": "chunk 3"}
+
+
+def test_resumes_after_interruption_during_copy_back(config):
+    # Interrompida depois de recriar a coleção: a temporária tem todos os pontos
+    client = FakeQdrantClient()
+    client.add(TEMP, 5, sparse=True)
+    client.add("docs", 2, sparse=True)
+
+    assert _migrate(client, config) == 5
+
+    assert set(client.collections) == {"docs"}
+    assert sorted(client.points("docs")) == [0, 1, 2, 3, 4]
+
+
+def test_restarts_after_interruption_during_copy_out(config):
+    # Interrompida copiando para a temporária: a coleção original está intacta
+    client = FakeQdrantClient()
+    client.add("docs", 5)
+    client.add(TEMP, 2)
+
+    assert _migrate(client, config) == 5
+
+    assert set(client.collections) == {"docs"}
+    assert sorted(client.points("docs")) == [0, 1, 2, 3, 4]
+
+
+def test_dimension_mismatch_is_refused(config):
+    client = FakeQdrantClient()
+    client.add("docs", 1)
+
+    with pytest.raises(ValueError):
+        _migrate(client, config.model_copy(update={"embedder_dimensions": 384}))
+    assert client.created == []
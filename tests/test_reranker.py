@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from utils.knowledge_service import SearchHit
+from utils.reranker import CrossEncoderReranker
+
+
+class SlowReranker(CrossEncoderReranker):
+    """Scoring que bloqueia a thread até `release` ser sinalizado"""
+
+    def __init__(self, workers=1):
+        super().__init__(model_name="fake", workers=workers)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def _score(self, query, documents):
+        self.calls += 1
+        self.release.wait(5)
+        return [float(len(doc)) for doc in documents]
+
+
+def _hits(*contents):
+    return [SearchHit(id=content, content=content) for content in contents]
+
+
+def test_timed_out_scoring_does_not_queue_more_work():
+    reranker = SlowReranker(workers=1)
+    hits = _hits("a", "bbb")
+
+    async def run():
+        first = await reranker.rerank("q", hits, top_k=2, timeout=0.05)
+        second = await reranker.rerank("q", hits, top_k=2, timeout=0.05)
+        return first, second
+
+    (first, applied_first), (second, applied_second) = asyncio.run(run())
+
+    assert not applied_first and not applied_second
+    assert reranker.calls == 1
+    stats = reranker.get_stats()
+    assert stats["timeouts"] == 1 and stats["skipped_busy"] == 1
+
+    reranker.release.set()
+    reranker.close()
+
+
+def test_scoring_resumes_when_thread_frees():
+    reranker = SlowReranker(workers=1)
+    reranker.release.set()
+
+    ranked, applied = asyncio.run(reranker.rerank("q", _hits("a", "bbb"), top_k=2, timeout=1))
+
+    assert applied
+    assert [hit.content for hit in ranked] == ["bbb", "a"]
+    assert reranker.get_stats()["in_flight"] == 0
+    reranker.close()
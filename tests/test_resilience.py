@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.controllers import wrenai_controller
+from app.controllers.wrenai_controller import WrenAIClient
+from utils.resilience import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture(autouse=True)
+def no_semantic_cache(monkeypatch):
+    monkeypatch.setattr(wrenai_controller.settings, "wren_semantic_cache_enabled", False)
+
+
+def _half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def _client(handler, breaker=None):
+    client = WrenAIClient(base_url="http://wren")
+    client._retry_policy.max_attempts = 1
+    client.client = httpx.AsyncClient(base_url="http://wren", transport=httpx.MockTransport(handler))
+    if breaker is not None:
+        client._breaker = breaker
+    return client
+
+
+def test_half_open_allows_single_probe():
+    breaker = _half_open_breaker()
+
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("error", [ValueError("payload"), asyncio.CancelledError()])
+def test_probe_released_after_unexpected_error(error):
+    def handler(request):
+        raise error
+
+    client = _client(handler, _half_open_breaker())
+
+    with pytest.raises(type(error)):
+        asyncio.run(client._request("GET", "/health"))
+
+    # Sem sucesso/falha registrados o circuito segue half_open, mas aceita um novo teste
+    assert client._breaker.state == CircuitBreaker.HALF_OPEN
+    assert client._breaker.before_call() is True
+
+
+def test_transport_error_does_not_break_sql_generation():
+    def handler(request):
+        raise httpx.ConnectError("recusada", request=request)
+
+    client = _client(handler)
+
+    assert asyncio.run(client.query_to_sql("vendas de 2024")) is None
+    assert client._breaker.get_stats()["consecutive_failures"] == 1
+
+
+def test_status_error_returns_none():
+    client = _client(lambda request: httpx.Response(400, text="intent inválida"))
+
+    assert asyncio.run(client.query_to_sql("vendas de 2024")) is None
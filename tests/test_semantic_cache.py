@@ -0,0 +1,86 @@
+import numpy as np
+
+import pytest
+
+from utils.semantic_cache import SemanticIntentCache, intent_literals, intent_terms
+
+
+class BagOfWordsEmbedder:
+    """Embedding que ignora números (intents com anos diferentes ficam idênticas)"""
+
+    def get_embedding(self, text):
+        vector = np.zeros(64, dtype=np.float32)
+        for word in text.split():
+            if not any(char.isdigit() for char in word):
+                vector[hash(word) % 64] += 1
+        return vector
+
+
+class ConstantEmbedder:
+    """Embedding igual para qualquer texto (o pior caso para o threshold)"""
+
+    def get_embedding(self, text):
+        return np.ones(8, dtype=np.float32)
+
+
+def _cache(embedder=None):
+    return SemanticIntentCache(embedder or BagOfWordsEmbedder(), threshold=0.9)
+
+
+def _lookup(cache, intent):
+    return cache.lookup_vector(cache.embed(intent), "sales", intent_literals(intent), intent_terms(intent))[0]
+
+
+def _add(cache, intent, sql):
+    cache.add_vector(cache.embed(intent), intent, "sales", sql)
+
+
+def test_literals():
+    assert intent_literals('Vendas de "Loja Centro" em 2024 no Q3') == ("2024", "loja centro", "q3")
+    assert intent_literals("receita de 1.500,50 até 31/12/2023") == ("1.500,50", "31/12/2023")
+
+
+def test_different_year_is_not_reused():
+    cache = _cache()
+    _add(cache, "vendas totais em 2024", "SELECT ... 2024")
+
+    assert _lookup(cache, "vendas totais em 2023") is None
+    assert _lookup(cache, "Vendas totais em 2024") == "SELECT ... 2024"
+    assert cache.get_stats()["literal_mismatches"] == 1
+
+
+def test_quoted_entity_must_match():
+    cache = _cache()
+    _add(cache, 'vendas do cliente "Acme"', "SELECT ... acme")
+
+    assert _lookup(cache, 'vendas do cliente "Globex"') is None
+    assert _lookup(cache, 'vendas do cliente "acme"') == "SELECT ... acme"
+
+
+def test_picks_neighbour_with_same_literals():
+    cache = _cache()
+    _add(cache, "vendas totais em 2024", "SELECT ... 2024")
+    _add(cache, "vendas totais em 2023", "SELECT ... 2023")
+
+    assert _lookup(cache, "vendas totais em 2023") == "SELECT ... 2023"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("vendas na região norte", "vendas na região sul"),
+    ("clientes ativos", "clientes inativos"),
+    ("produto com maior receita", "produto com menor receita"),
+    ("pedidos com desconto", "pedidos sem desconto"),
+])
+def test_different_content_words_are_not_reused(cached, asked):
+    cache = _cache(ConstantEmbedder())
+    _add(cache, cached, "SELECT ...")
+
+    assert _lookup(cache, asked) is None
+    assert cache.get_stats()["term_mismatches"] == 1
+
+
+def test_stopwords_accents_and_plural_are_ignored():
+    cache = _cache(ConstantEmbedder())
+    _add(cache, "Quais as vendas por região?", "SELECT ... regiao")
+
+    assert _lookup(cache, "venda de cada regiao") == "SELECT ... regiao"
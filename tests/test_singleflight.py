@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "sql"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("intent", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["sql"] * 5
+    assert calls == 1
+    assert flight.get_stats() == {"inflight": 0, "leaders": 1, "coalesced": 4, "timeouts": 0}
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("wren fora")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("intent", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert flight.get_stats()["inflight"] == 0
+
+
+def test_caller_timeout_and_cancel_do_not_cancel_leader():
+    flight = SingleFlight()
+    release = None
+
+    async def slow():
+        await release.wait()
+        return "sql"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        impatient = asyncio.create_task(flight.do("intent", slow, timeout=0.01))
+        cancelled = asyncio.create_task(flight.do("intent", slow))
+        patient = asyncio.create_task(flight.do("intent", slow))
+        await asyncio.sleep(0)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        release.set()
+        return await patient
+
+    assert asyncio.run(run()) == "sql"
+    assert flight.get_stats()["timeouts"] == 1
+
+
+def test_key_removed_after_success_and_failure():
+    flight = SingleFlight()
+    outcomes = iter([ValueError("primeira"), "segunda"])
+
+    async def fn():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def run():
+        with pytest.raises(ValueError):
+            await flight.do("intent", fn)
+        assert flight.get_stats()["inflight"] == 0
+        # Nova chamada com a mesma chave executa de novo (sem reaproveitar a falha)
+        result = await flight.do("intent", fn)
+        assert flight.get_stats()["inflight"] == 0
+        return result
+
+    assert asyncio.run(run()) == "segunda"
+    assert flight.get_stats()["leaders"] == 2
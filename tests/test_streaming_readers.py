@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from agno.knowledge.chunking.recursive import RecursiveChunking
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from utils.streaming_readers import (
+    _iter_json_items,
+    close_pdf_pool,
+    iter_pdf_documents,
+    iter_pdf_documents_parallel,
+)
+
+
+def test_top_level_array_yields_items():
+    assert list(_iter_json_items(io.BytesIO(b' \n[{"a": 1}, {"a": 2.5}]'))) == [{"a": 1}, {"a": 2.5}]
+
+
+def test_top_level_object_is_one_item():
+    assert list(_iter_json_items(io.BytesIO(b'{"a": [1, 2]}'))) == [{"a": [1, 2]}]
+
+
+def test_array_is_read_incrementally():
+    # O primeiro item sai antes de o restante (inválido) ser lido
+    items = _iter_json_items(io.BytesIO(b'[{"a": 1}, {"a": ' + b" " * 100_000 + b"!"))
+
+    assert next(items) == {"a": 1}
+    with pytest.raises(Exception):
+        next(items)
+
+
+def _write_pdf(path, pages):
+    """PDF com uma linha de texto por página"""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for number in range(1, pages + 1):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 712 Td (Pagina {number} do relatorio) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+    writer.write(str(path))
+
+
+def test_parallel_pdf_matches_sequential(tmp_path):
+    path = tmp_path / "relatorio.pdf"
+    _write_pdf(path, 7)
+    strategy = RecursiveChunking(chunk_size=1000, overlap=100)
+
+    try:
+        parallel = list(iter_pdf_documents_parallel(str(path), "relatorio", strategy, workers=2, pages_per_task=2))
+    finally:
+        close_pdf_pool()
+    sequential = list(iter_pdf_documents(str(path), "relatorio", strategy))
+
+    def summary(chunks):
+        return [(chunk.id, chunk.meta_data, chunk.content) for chunk in chunks]
+
+    assert summary(parallel) == summary(sequential)
+    assert [chunk.meta_data["page"] for chunk in parallel] == list(range(1, 8))
+    assert "Pagina 7" in parallel[-1].content
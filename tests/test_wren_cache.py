@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.controllers import wrenai_controller
+from app.controllers.wrenai_controller import WrenAIClient
+
+
+@pytest.fixture
+def wren(monkeypatch):
+    """Cliente Wren contando as chamadas a /mcp/sql e /mcp/query"""
+    monkeypatch.setattr(wrenai_controller.settings, "wren_semantic_cache_enabled", False)
+    calls = {"/mcp/sql": 0, "/mcp/query": 0}
+
+    def handler(request):
+        calls[request.url.path] += 1
+        if request.url.path == "/mcp/sql":
+            intent = json.loads(request.content)["intent"]
+            return httpx.Response(200, json={"sql": f"SELECT '{intent}' AS intent"})
+        return httpx.Response(200, json={"data": [{"id": calls["/mcp/query"]}]})
+
+    client = WrenAIClient(base_url="http://wren")
+    client.client = httpx.AsyncClient(base_url="http://wren", transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def test_sql_tier_caches_intent_per_db_source(wren):
+    client, calls = wren
+
+    async def run():
+        first = await client.query_to_sql("vendas de 2024")
+        again = await client.query_to_sql("vendas de 2024")
+        other_source = await client.query_to_sql("vendas de 2024", db_source="outro")
+        uncached = await client.query_to_sql("vendas de 2024", use_cache=False)
+        return first, again, other_source, uncached
+
+    first, again, other_source, uncached = asyncio.run(run())
+
+    assert first == again == other_source == uncached
+    assert calls["/mcp/sql"] == 3
+    stats = client.get_cache_stats()
+    assert (stats["hits"], stats["cached_queries"]) == (1, 2)
+
+
+def test_result_tier_keys_on_normalized_sql(wren):
+    client, calls = wren
+
+    async def run():
+        first = await client.execute_sql("SELECT id FROM vendas")
+        again = await client.execute_sql("SELECT  id\n FROM vendas")
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert again is first
+    assert calls["/mcp/query"] == 1
+    assert client.get_cache_stats()["result_cache"]["entries"] == 1
+
+
+def test_invalidating_results_keeps_sql_tier(wren):
+    client, calls = wren
+
+    async def run():
+        sql = await client.query_to_sql("vendas de 2024")
+        first = await client.execute_sql(sql)
+        client.invalidate_result_cache()
+        await client.query_to_sql("vendas de 2024")
+        refreshed = await client.execute_sql(sql)
+        return first, refreshed
+
+    first, refreshed = asyncio.run(run())
+
+    assert calls == {"/mcp/sql": 1, "/mcp/query": 2}
+    assert first.to_rows() != refreshed.to_rows()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.controllers import wrenai_controller
+from app.controllers.wrenai_controller import WrenAIClient
+from app.schamas.bi_schemas import BIExportRequest, BIRowsRequest
+
+ORDERED = "SELECT id, total FROM vendas ORDER BY id"
+
+
+@pytest.fixture
+def wren(monkeypatch):
+    """Cliente Wren com /mcp/query respondendo `rows` paginado pelo LIMIT/OFFSET do SQL"""
+    monkeypatch.setattr(wrenai_controller.settings, "wren_semantic_cache_enabled", False)
+    rows = [{"id": i, "total": i * 10} for i in range(5)]
+    executed = []
+
+    def handler(request):
+        sql = json.loads(request.content)["sql"]
+        executed.append(sql)
+        words = sql.split()
+        limit = int(words[words.index("LIMIT") + 1])
+        offset = int(words[words.index("OFFSET") + 1]) if "OFFSET" in words else 0
+        return httpx.Response(200, json={"data": rows[offset:offset + limit]})
+
+    client = WrenAIClient(base_url="http://wren")
+    client.client = httpx.AsyncClient(base_url="http://wren", transport=httpx.MockTransport(handler))
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(wrenai_controller, "get_wren_client", get_client)
+    return client, executed
+
+
+def test_paginate_appends_limit_to_ordered_sql():
+    assert (
+        WrenAIClient._paginate_sql(ORDERED + ";", limit=3, offset=6)
+        == ORDERED + " LIMIT 3 OFFSET 6"
+    )
+
+
+def test_paginate_requires_order_for_offset():
+    unordered = "SELECT id, SUM(total) OVER (ORDER BY id) FROM vendas"
+
+    assert WrenAIClient._paginate_sql(unordered, limit=3).startswith("SELECT * FROM (")
+    with pytest.raises(ValueError):
+        WrenAIClient._paginate_sql(unordered, limit=3, offset=3)
+    with pytest.raises(ValueError):
+        WrenAIClient._paginate_sql("SELECT * FROM (SELECT id FROM t ORDER BY id) s", limit=3, offset=3)
+
+
+def test_top_n_sql_keeps_its_order():
+    top_n = "SELECT id, total FROM vendas ORDER BY total DESC LIMIT 5"
+
+    # Já cabe na página: executado sem alteração
+    assert WrenAIClient._paginate_sql(top_n + ";", limit=11) == top_n
+    # Maior que a página: o LIMIT é reduzido, o ORDER BY continua no nível externo
+    assert WrenAIClient._paginate_sql(top_n, limit=3) == "SELECT id, total FROM vendas ORDER BY total DESC LIMIT 3"
+    assert WrenAIClient._paginate_sql(top_n, limit=3, offset=3) == (
+        "SELECT id, total FROM vendas ORDER BY total DESC LIMIT 2 OFFSET 3"
+    )
+    # LIMIT dentro de subquery ou comentário não é do nível externo
+    nested = "SELECT * FROM (SELECT id FROM t ORDER BY id LIMIT 5) s"
+    assert WrenAIClient._paginate_sql(nested, limit=3).startswith("SELECT * FROM (")
+
+
+@pytest.mark.parametrize("cursor", ["nao-e-cursor", wrenai_controller._encode_cursor(-1)])
+def test_invalid_cursor_rejected(wren, cursor):
+    _, executed = wren
+
+    with pytest.raises(ValueError):
+        asyncio.run(wrenai_controller.bi_rows(BIRowsRequest(sql=ORDERED, cursor=cursor)))
+    assert executed == []
+
+
+@pytest.mark.parametrize("sql", [
+    "WITH d AS (DELETE FROM vendas RETURNING *) SELECT * FROM d ORDER BY id",
+    "SELECT id FROM vendas ORDER BY id; DROP TABLE vendas",
+    "SELECT id INTO copia FROM vendas ORDER BY id",
+    "UPDATE vendas SET total = 0",
+    "SELECT id FROM vendas",
+    "SELECT id FROM vendas ORDER BY id LIMIT 10",
+])
+def test_client_sql_rejected(sql):
+    with pytest.raises(ValueError):
+        wrenai_controller.validate_client_sql(sql)
+
+
+def test_client_sql_literals_ignored():
+    wrenai_controller.validate_client_sql(
+        "SELECT id FROM vendas WHERE nota = 'delete; drop' ORDER BY id"
+    )
+
+
+def test_rows_cursor_walks_ordered_pages(wren):
+    _, executed = wren
+    seen = []
+    cursor = None
+    while True:
+        page = asyncio.run(wrenai_controller.bi_rows(BIRowsRequest(sql=ORDERED, cursor=cursor, limit=2)))
+        seen += [row["id"] for row in page.rows]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [0, 1, 2, 3, 4]
+    assert all(sql.startswith(ORDERED + " LIMIT 3") for sql in executed)
+
+
+def test_rows_rejects_unordered_sql(wren):
+    _, executed = wren
+
+    with pytest.raises(ValueError):
+        asyncio.run(wrenai_controller.bi_rows(BIRowsRequest(sql="SELECT id FROM vendas")))
+    assert executed == []
+
+
+def test_export_bypasses_result_cache(wren, monkeypatch):
+    client, _ = wren
+    monkeypatch.setattr(wrenai_controller.settings, "wren_export_page_size", 2)
+
+    async def export():
+        return [line async for line in wrenai_controller.bi_export_generator(BIExportRequest(sql=ORDERED))]
+
+    lines = asyncio.run(export())
+
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2, 3, 4]
+    assert client.get_cache_stats()["result_cache"]["entries"] == 0
@@ -9,6 +9,8 @@ import logging
 
 from agno.tools import tool
 
+from utils.settings import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,17 +48,21 @@ async def bi_query_tool(intent: str, db_source: str = "default") -> str:
 
     try:
         # Importar aqui para evitar circular imports
-        from app.schemas.bi_schemas import BIRequest
+        from app.schamas.bi_schemas import BIRequest
 
-        from app.controllers.wrenai_controller import bi_query
+        from app.controllers.wrenai_controller import bi_query_result
 
         logger.info(f"🔍 Processando query BI: {intent[:60]}...")
 
-        # Criar request
-        request = BIRequest(message=intent, db_source=db_source)
+        # Criar request (busca só as linhas exibidas; LIMIT aplicado no banco)
+        request = BIRequest(
+            message=intent,
+            db_source=db_source,
+            max_rows=settings.bi_tool_max_rows
+        )
 
-        # Executar query
-        result = await bi_query(request)
+        # Executar query (resultado colunar, sem converter para dicts)
+        result = await bi_query_result(request)
 
         # Formatar resposta
         response = _format_response(result)
@@ -86,11 +92,17 @@ async def check_bi_health() -> str:
         Status de saúde do Wren Engine
     """
     try:
-        from app.controllers.wrenai_controller import health_check
+        from app.controllers.wrenai_controller import get_resilience_statistics, health_check
 
         is_healthy = await health_check()
-
-        if is_healthy:
+        breaker = (await get_resilience_statistics())["circuit_breaker"]
+
+        if breaker["state"] == "open":
+            return (
+                "⛔ Wren BI Engine indisponível (circuit breaker aberto após "
+                f"{breaker['consecutive_failures']} falhas). Não tente novas consultas agora."
+            )
+        elif is_healthy:
             return "✅ Wren BI Engine está operacional e pronto para consultas"
         else:
             return "❌ Wren BI Engine indisponível. Tente novamente em alguns momentos."
@@ -118,11 +130,17 @@ async def get_bi_cache_stats() -> str:
         return f"""
             📊 Estatísticas de Cache:
             ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-            • Cache Hits: {stats["hits"]}
-            • Cache Misses: {stats["misses"]}
+            • Cache Hits (SQL): {stats["hits"]}
+            • Cache Misses (SQL): {stats["misses"]}
             • Total de Consultas: {stats["total"]}
-            • Taxa de Acerto: {stats["hit_rate"]}
+            • Taxa de Acerto (SQL): {stats["hit_rate"]}
+            • Taxa de Acerto (Resultados): {stats["result_cache"]["hit_rate"]}
             • Queries em Cache: {stats["cached_queries"]}
+            • Resultados em Cache: {stats["result_cache"]["entries"]}
+            • Cache Semântico: {_format_semantic_stats(stats.get("semantic_cache"))}
+            • Memória em Cache: {stats["cached_bytes"] / 1024:.1f} KB
+            • Despejos (LRU): {stats["evictions"]}
+            • Expiradas (TTL): {stats["expirations"]}
             ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             """
 
@@ -130,12 +148,22 @@ async def get_bi_cache_stats() -> str:
         return f"❌ Erro ao obter estatísticas: {e}"
 
 
+def _format_semantic_stats(stats) -> str:
+    """Resumo das estatísticas do cache semântico"""
+    if not stats:
+        return "desativado"
+    return (
+        f"{stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['near_misses']} near-misses ({stats['hit_rate']})"
+    )
+
+
 def _format_response(bi_response) -> str:
     """
     Formatar resposta do Wren em markdown legível
 
     Args:
-        bi_response: BIResponse object
+        bi_response: BIResult (colunar)
 
     Returns:
         String formatada para apresentação ao usuário
@@ -144,7 +172,7 @@ def _format_response(bi_response) -> str:
     try:
         # Extrair dados
         sql = bi_response.sql
-        result = bi_response.result
+        result = bi_response.table
         chart_prompt = bi_response.chart_prompt
 
         # Formatar SQL
@@ -154,23 +182,24 @@ def _format_response(bi_response) -> str:
                     ```"""
 
         # Formatar dados
-        if isinstance(result, list) and len(result) > 0:
+        if result.num_rows > 0:
             # Converter para tabela markdown
-            if isinstance(result[0], dict):
-                headers = list(result[0].keys())
-                rows = [[row.get(h, "") for h in headers] for row in result]
+            headers = result.columns
+
+            # Limitar às linhas buscadas para a ferramenta (BI_TOOL_MAX_ROWS)
+            display_rows = list(result.head(settings.bi_tool_max_rows).iter_tuples())
 
-                # Limitar a 10 linhas para não sobrecarregar
-                display_rows = rows[:10]
+            table = _create_markdown_table(headers, display_rows)
 
-                table = _create_markdown_table(headers, display_rows)
+            # Aviso se houver mais linhas
+            total_rows = bi_response.total_rows
+            if total_rows is None and not bi_response.truncated:
+                total_rows = result.num_rows
 
-                # Aviso se houver mais linhas
-                more_rows = len(rows) - 10
-                if more_rows > 0:
-                    table += f"\n\n*... e mais {more_rows} linhas*"
-            else:
-                table = f"```\n{str(result)}\n```"
+            if total_rows is None:
+                table += f"\n\n*... e mais linhas (mais de {len(display_rows)} no total)*"
+            elif total_rows > len(display_rows):
+                table += f"\n\n*... e mais {total_rows - len(display_rows)} linhas*"
         else:
             table = "_Nenhum resultado encontrado_"
 
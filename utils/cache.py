@@ -0,0 +1,196 @@
+"""
+Camada de cache em memória com limite de entradas/bytes, TTL e despejo LRU
+"""
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+from pydantic import BaseModel
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimar o tamanho em bytes de um objeto (recursivo)
+
+    Percorre dicts, listas, tuplas, sets e modelos Pydantic, somando o
+    `sys.getsizeof` de cada elemento. É uma aproximação, suficiente para
+    limitar o consumo de memória do cache.
+
+    Args:
+        obj: Objeto a medir
+
+    Returns:
+        Tamanho estimado em bytes
+    """
+    if _seen is None:
+        _seen = set()
+
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    if isinstance(obj, BaseModel):
+        return estimate_size(obj.__dict__, _seen)
+
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        size += sum(
+            estimate_size(k, _seen) + estimate_size(v, _seen)
+            for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+
+    return size
+
+
+class CacheBackend(ABC):
+    """Interface dos backends de cache"""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obter valor (None se ausente ou expirado)"""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Armazenar valor com TTL opcional (segundos)"""
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> bool:
+        """Remover uma entrada"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remover todas as entradas"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do backend"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    size: int
+    expires_at: Optional[float]
+
+
+class LRUCache(CacheBackend):
+    """
+    Cache LRU limitado por número de entradas e por bytes, com TTL por entrada
+
+    - Entradas expiradas são descartadas na leitura
+    - Ao exceder os limites, as entradas menos usadas são despejadas
+    - Entradas maiores que max_bytes não são armazenadas
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        size = estimate_size(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            if size > self.max_bytes:
+                self._rejected += 1
+                return
+
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[key] = _CacheEntry(value=value, size=size, expires_at=expires_at)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """Remover todas as entradas expiradas"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, entry in self._entries.items()
+                if entry.expires_at is not None and entry.expires_at <= now
+            ]
+            for key in expired:
+                self._remove(key)
+            self._expirations += len(expired)
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "rejected": self._rejected,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
@@ -0,0 +1,135 @@
+"""
+Representação colunar compacta para resultados tabulares (BI)
+- Nomes de colunas armazenados uma única vez
+- Colunas numéricas em arrays numpy tipados
+- Conversão para linhas (dicts) apenas na borda da API
+"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+def _to_column(values: List[Any]) -> Any:
+    """
+    Converter valores de uma coluna para o tipo mais compacto
+
+    - Inteiros (sem nulos/booleanos) -> np.int64
+    - Números (sem nulos/booleanos) -> np.float64
+    - Demais -> lista Python
+    """
+    if values and all(type(v) is int for v in values):
+        try:
+            return np.asarray(values, dtype=np.int64)
+        except OverflowError:
+            return values
+    if values and all(type(v) in (int, float) for v in values):
+        return np.asarray(values, dtype=np.float64)
+    return values
+
+
+@dataclass
+class ColumnarResult:
+    """Resultado tabular em formato colunar"""
+    columns: List[str] = field(default_factory=list)
+    data: List[Any] = field(default_factory=list)  # Uma sequência por coluna
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Any], columns: Optional[Sequence[str]] = None) -> "ColumnarResult":
+        """
+        Construir a partir de linhas
+
+        Aceita linhas como dicts (colunas inferidas da primeira linha, se
+        não informadas) ou como listas/tuplas posicionais junto de `columns`.
+
+        Args:
+            rows: Linhas do resultado
+            columns: Nomes das colunas (opcional para linhas dict)
+
+        Returns:
+            ColumnarResult
+        """
+        if not rows:
+            return cls(columns=list(columns or []), data=[[] for _ in (columns or [])])
+
+        if isinstance(rows[0], dict):
+            names = list(columns or rows[0].keys())
+            values = [[row.get(name) for row in rows] for name in names]
+        else:
+            names = list(columns or [f"col_{i}" for i in range(len(rows[0]))])
+            values = [list(col) for col in zip(*rows)]
+
+        return cls(columns=names, data=[_to_column(col) for col in values])
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "ColumnarResult":
+        """Construir a partir do payload do Wren ({"data": [...], "columns": [...]?})"""
+        columns = payload.get("columns")
+        if columns and isinstance(columns[0], dict):
+            columns = [col.get("name") for col in columns]
+        return cls.from_rows(payload.get("data") or [], columns=columns)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column(self, name: str) -> Any:
+        """Valores de uma coluna"""
+        return self.data[self.columns.index(name)]
+
+    def head(self, n: int) -> "ColumnarResult":
+        """Primeiras n linhas"""
+        return ColumnarResult(columns=list(self.columns), data=[col[:n] for col in self.data])
+
+    def _python_columns(self) -> List[List[Any]]:
+        return [col.tolist() if isinstance(col, np.ndarray) else list(col) for col in self.data]
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """Iterar linhas como dicts (uma de cada vez)"""
+        for values in zip(*self._python_columns()):
+            yield dict(zip(self.columns, values))
+
+    def iter_tuples(self) -> Iterator[tuple]:
+        """Iterar linhas como tuplas posicionais"""
+        return zip(*self._python_columns())
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Converter para lista de dicts (borda da API)"""
+        return list(self.iter_rows())
+
+    def to_compact(self) -> Dict[str, Any]:
+        """Converter para JSON compacto: nomes uma vez, valores por coluna"""
+        return {"columns": list(self.columns), "data": self._python_columns()}
+
+    def to_arrow_ipc(self) -> bytes:
+        """
+        Serializar em Arrow IPC (stream)
+
+        Raises:
+            ImportError: Se pyarrow não estiver instalado
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow não instalado, use `uv sync --extra arrow`")
+
+        table = pa.table({name: col for name, col in zip(self.columns, self.data)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def __sizeof__(self) -> int:
+        size = object.__sizeof__(self) + sys.getsizeof(self.columns)
+        size += sum(sys.getsizeof(name) for name in self.columns)
+        for col in self.data:
+            if isinstance(col, np.ndarray):
+                size += col.nbytes
+            else:
+                size += sys.getsizeof(col) + sum(sys.getsizeof(v) for v in col)
+        return size
@@ -0,0 +1,410 @@
+"""
+Orçamento de contexto das chamadas ao LLM
+- Contagem de tokens com tokenizer local (tokenizer.json) ou estimativa por caracteres
+- Orçamento de entrada por modelo: janela de contexto menos a resposta, com teto configurável
+- Chunks da knowledge base sem sobreposição (overlap do RecursiveChunking) e dentro do orçamento
+- Saídas de tools truncadas (tabelas perdem linhas, não o SQL) e histórico recortado/resumido
+"""
+
+import logging
+import math
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from utils.llm import LLMConfig
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = "*[... conteúdo truncado para caber no contexto]*"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class TokenCounter:
+    """
+    Contador de tokens local
+
+    Com `tokenizer_path` (tokenizer.json do modelo, formato HuggingFace
+    `tokenizers`) a contagem é exata; sem ele, ou se o arquivo não carregar,
+    usa a estimativa `len(texto) / chars_per_token`.
+
+    Args:
+        tokenizer_path: Caminho do tokenizer.json ("" = estimativa)
+        chars_per_token: Caracteres por token na estimativa
+    """
+
+    def __init__(self, tokenizer_path: str = "", chars_per_token: float = 3.5):
+        self.tokenizer_path = tokenizer_path
+        self.chars_per_token = chars_per_token
+        self._tokenizer = None
+        self._loaded = not tokenizer_path
+
+    def _get_tokenizer(self) -> Any:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                from tokenizers import Tokenizer
+
+                self._tokenizer = Tokenizer.from_file(self.tokenizer_path)
+                logger.info(f"🧮 Tokenizer carregado de {self.tokenizer_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ Tokenizer {self.tokenizer_path} indisponível, usando estimativa: {e}")
+        return self._tokenizer
+
+    @property
+    def backend(self) -> str:
+        return "tokenizer" if self._get_tokenizer() is not None else "estimativa"
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+@dataclass
+class ContextBudget:
+    """Limites de tokens de entrada de um modelo"""
+    model_name: str
+    context_window: int
+    max_output_tokens: int
+    input_tokens: int  # Prompt inteiro (instruções + histórico + mensagem + RAG + tools)
+    knowledge_tokens: int  # Chunks devolvidos pelo retriever em um run
+    tool_tokens: int  # Saídas de tools somadas em um run
+    history_tokens: int  # Turnos anteriores da sessão
+    summary_tokens: int  # Resumo dos turnos que ficaram de fora
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class ContextUsage:
+    """Tokens estimados por parte do prompt no turno atual de uma sessão"""
+    instructions: int = 0
+    message: int = 0
+    history: int = 0
+    summary: int = 0
+    knowledge: int = 0
+    tools: int = 0
+    history_runs: int = 0
+    dropped_chunks: int = 0
+    truncated_tools: int = 0
+
+    def reset(self) -> None:
+        self.__init__()
+
+    @property
+    def total(self) -> int:
+        return self.instructions + self.message + self.history + self.summary + self.knowledge + self.tools
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total": self.total}
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _overlap(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    """
+    Maior k >= min_overlap com o final de `left` igual ao início de `right`
+
+    Só testa as posições do final de `left` onde aparecem os primeiros
+    `min_overlap` caracteres de `right` (str.find), em vez de comparar
+    todos os tamanhos possíveis.
+    """
+    min_overlap = max(min_overlap, 1)
+    size = min(len(left), len(right), max_overlap)
+    if size < min_overlap:
+        return 0
+
+    head = right[:min_overlap]
+    start = len(left) - size
+    while (position := left.find(head, start)) != -1:
+        if right.startswith(left[position:]):
+            return len(left) - position
+        start = position + 1
+    return 0
+
+
+def _source(document: Dict[str, Any]) -> Any:
+    meta_data = document.get("meta_data") or {}
+    return meta_data.get("source") or document.get("name")
+
+
+class ContextAssembler:
+    """
+    Monta o contexto de cada chamada ao LLM dentro do orçamento do modelo
+
+    Args:
+        counter: Contador de tokens
+        max_input_tokens: Teto de tokens de entrada (limite de TPM do Groq), 0 = só a janela
+        knowledge_tokens: Tokens para chunks da knowledge base por run
+        tool_tokens: Tokens para saídas de tools por run
+        history_tokens: Tokens para turnos anteriores
+        summary_tokens: Tokens para o resumo dos turnos descartados
+        min_overlap: Sobreposição mínima (caracteres) entre chunks para recortá-la
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        max_input_tokens: int = 0,
+        knowledge_tokens: int = 3000,
+        tool_tokens: int = 2000,
+        history_tokens: int = 2000,
+        summary_tokens: int = 300,
+        min_overlap: int = 20,
+    ):
+        self.counter = counter
+        self.max_input_tokens = max_input_tokens
+        self.knowledge_tokens = knowledge_tokens
+        self.tool_tokens = tool_tokens
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.min_overlap = min_overlap
+
+    def count(self, text: Optional[str]) -> int:
+        return self.counter.count(text)
+
+    def budget_for(self, model_name: str, max_output_tokens: int) -> ContextBudget:
+        """
+        Orçamento de entrada do modelo
+
+        As partes (knowledge, tools, histórico) são reduzidas proporcionalmente
+        quando somam mais que 80% da entrada (o resto fica para instruções e
+        a mensagem do usuário).
+        """
+        window = LLMConfig.get_context_window(model_name)
+        input_tokens = max(window - max_output_tokens, 0)
+        if self.max_input_tokens > 0:
+            input_tokens = min(input_tokens, self.max_input_tokens)
+
+        parts = self.knowledge_tokens + self.tool_tokens + self.history_tokens + self.summary_tokens
+        scale = min(1.0, input_tokens * 0.8 / parts) if parts else 1.0
+        return ContextBudget(
+            model_name=model_name,
+            context_window=window,
+            max_output_tokens=max_output_tokens,
+            input_tokens=input_tokens,
+            knowledge_tokens=int(self.knowledge_tokens * scale),
+            tool_tokens=int(self.tool_tokens * scale),
+            history_tokens=int(self.history_tokens * scale),
+            summary_tokens=int(self.summary_tokens * scale),
+        )
+
+    def dedupe_chunks(self, documents: Sequence[Dict[str, Any]], max_overlap: int = 2000) -> List[Dict[str, Any]]:
+        """
+        Remover chunks repetidos ou sobrepostos (na ordem de relevância)
+
+        - Conteúdo igual ou contido em um chunk já escolhido: descartado
+        - Chunk que contém um já escolhido: substitui o escolhido
+        - Sobreposição com um chunk vizinho da mesma fonte (overlap do
+          chunking): a parte repetida é removida do chunk de menor relevância
+
+        Espaços são normalizados só para comparar: o texto devolvido mantém
+        quebras de linha e tabelas markdown originais.
+
+        Custo proporcional a chunks² × tamanho: em código async, chamar fora
+        do event loop (`asyncio.to_thread`), como o retriever do chat.
+        """
+        kept: List[Dict[str, Any]] = []
+        normalized: List[str] = []  # Texto normalizado de cada chunk mantido (comparação)
+        contents: Set[str] = set()
+        for document in documents:
+            content = (document.get("content") or "").strip()
+            key = _normalize(content)
+            if not key or key in contents:
+                continue
+            contents.add(key)
+
+            duplicate = False
+            for index, chosen in enumerate(normalized):
+                if key in chosen:
+                    duplicate = True
+                    break
+                if chosen in key:
+                    kept[index] = dict(document, content=content)
+                    normalized[index] = key
+                    duplicate = True
+                    break
+            if duplicate:
+                continue
+
+            source = _source(document)
+            for chosen in kept:
+                if source is None or _source(chosen) != source:
+                    continue
+                size = _overlap(chosen["content"], content, self.min_overlap, max_overlap)
+                if size:
+                    content = content[size:].lstrip()
+                    continue
+                size = _overlap(content, chosen["content"], self.min_overlap, max_overlap)
+                if size:
+                    content = content[:-size].rstrip()
+            if content:
+                kept.append(dict(document, content=content))
+                normalized.append(_normalize(content))
+        return kept
+
+    def truncate_text(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """
+        Cortar o texto para caber em `max_tokens` (com marcador)
+
+        Args:
+            keep: "head" mantém o início, "tail" mantém o final
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        available = max_tokens - self.count(TRUNCATION_MARKER) - 1
+        if available <= 0:
+            return TRUNCATION_MARKER
+
+        # Busca binária pelo maior trecho que cabe
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            piece = text[:middle] if keep == "head" else text[-middle:]
+            if self.count(piece) <= available:
+                low = middle
+            else:
+                high = middle - 1
+
+        if keep == "head":
+            return f"{text[:low].rstrip()}\n{TRUNCATION_MARKER}"
+        return f"{TRUNCATION_MARKER}\n{text[len(text) - low:].lstrip()}"
+
+    def compress_tool_output(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """
+        Reduzir a saída de uma tool para `max_tokens`
+
+        Tabelas markdown perdem linhas do final (cabeçalho, SQL e sugestão de
+        visualização continuam); sem tabela, o texto é truncado.
+        """
+        if self.count(text) <= max_tokens:
+            return text
+
+        lines = text.split("\n")
+        table = [index for index, line in enumerate(lines) if line.strip().startswith("|")]
+        rows = table[2:]  # Cabeçalho e separador ficam
+        if rows:
+            def with_rows(count: int) -> str:
+                dropped = set(rows[count:])
+                kept = []
+                for index, line in enumerate(lines):
+                    if index not in dropped:
+                        kept.append(line)
+                    if index == rows[-1]:
+                        kept.append(f"*... {len(rows) - count} linhas omitidas para caber no contexto*")
+                return "\n".join(kept)
+
+            # Busca binária pelo maior número de linhas que cabe
+            low, high = -1, len(rows) - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self.count(with_rows(middle)) <= max_tokens:
+                    low = middle
+                else:
+                    high = middle - 1
+            if low >= 0:
+                return with_rows(low)
+        return self.truncate_text(text, max_tokens, keep=keep)
+
+    def fit_chunks(self, documents: Sequence[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Chunks (já sem sobreposição) que cabem em `max_tokens`, na ordem de
+        relevância; o primeiro é truncado se sozinho passar do orçamento
+        """
+        selected: List[Dict[str, Any]] = []
+        used = 0
+        for document in documents:
+            tokens = self.count(document.get("content"))
+            if used + tokens <= max_tokens:
+                selected.append(document)
+                used += tokens
+            elif not selected:
+                selected.append(dict(document, content=self.truncate_text(document["content"], max_tokens)))
+                used = max_tokens
+        return selected
+
+    def assemble_knowledge(
+        self, documents: Sequence[Dict[str, Any]], max_tokens: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Chunks para o prompt: sem sobreposição e dentro de `max_tokens`
+
+        Returns:
+            (chunks, tokens usados)
+        """
+        selected = self.fit_chunks(self.dedupe_chunks(documents), max_tokens)
+        return selected, sum(self.count(document.get("content")) for document in selected)
+
+    def trim_history(
+        self, turns: Sequence[Tuple[str, str]], max_tokens: int, summary_tokens: int
+    ) -> Tuple[int, Optional[str], int]:
+        """
+        Escolher quantos turnos recentes cabem no histórico
+
+        Os turnos descartados viram um resumo extrativo (perguntas anteriores
+        do usuário, mais recentes primeiro) limitado a `summary_tokens`.
+
+        Args:
+            turns: [(mensagem do usuário, resposta)] do mais antigo ao mais recente
+
+        Returns:
+            (turnos mantidos, resumo dos descartados ou None, tokens do histórico mantido)
+        """
+        kept, used = 0, 0
+        for user_message, answer in reversed(turns):
+            tokens = self.count(user_message) + self.count(answer)
+            if used + tokens > max_tokens:
+                break
+            kept += 1
+            used += tokens
+
+        dropped = turns[:len(turns) - kept]
+        if not dropped or summary_tokens <= 0:
+            return kept, None, used
+
+        header = "Resumo de turnos anteriores da conversa (fora do histórico):"
+        lines, total = [], self.count(header)
+        for user_message, _ in reversed(dropped):
+            line = f"- Usuário perguntou: {_normalize(user_message)[:200]}"
+            tokens = self.count(line)
+            if total + tokens > summary_tokens:
+                break
+            lines.append(line)
+            total += tokens
+        if not lines:
+            return kept, None, used
+        return kept, "\n".join([header, *reversed(lines)]), used
+
+
+def get_context_assembler() -> ContextAssembler:
+    """
+    Retorna o montador de contexto configurado
+
+    Returns:
+        Instância de ContextAssembler
+    """
+    return ContextAssembler(
+        counter=TokenCounter(
+            tokenizer_path=settings.context_tokenizer_path,
+            chars_per_token=settings.context_chars_per_token,
+        ),
+        max_input_tokens=settings.llm_max_input_tokens,
+        knowledge_tokens=settings.context_knowledge_tokens,
+        tool_tokens=settings.context_tool_output_tokens,
+        history_tokens=settings.context_history_tokens,
+        summary_tokens=settings.context_history_summary_tokens,
+        min_overlap=settings.context_min_chunk_overlap,
+    )
+
+
+# Instância singleton do montador de contexto
+context_assembler = get_context_assembler()
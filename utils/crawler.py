@@ -0,0 +1,341 @@
+"""
+Crawler assíncrono para ingestão de URLs
+- Busca concorrente com limite global e por host (politeness)
+- Respeita robots.txt (incluindo Crawl-delay); robots.txt indisponível (5xx,
+  429, erro de rede) bloqueia o host, como nos crawlers de busca
+- GET condicional (ETag/Last-Modified) com cache local das páginas já lidas
+- Páginas entregues à medida que chegam (async iterator)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+
+class RobotsUnavailableError(Exception):
+    """robots.txt do host respondeu 5xx ou falhou: nenhuma página do host é buscada"""
+
+
+@dataclass
+class CrawledPage:
+    """Página obtida pelo crawler"""
+    url: str
+    text: str
+    depth: int
+    status: int
+    not_modified: bool = False  # True se veio do cache (304)
+    final_url: Optional[str] = None  # URL após redirecionamentos
+
+
+@dataclass
+class CachedPage:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    text: str
+    links: List[str] = field(default_factory=list)
+
+
+class PageCache:
+    """Cache SQLite de páginas (validadores HTTP, texto extraído e links)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body = json.loads(zlib.decompress(row[2]))
+        return CachedPage(etag=row[0], last_modified=row[1], text=body["text"], links=body["links"])
+
+    def set(self, url: str, page: CachedPage) -> None:
+        body = zlib.compress(json.dumps({"text": page.text, "links": page.links}).encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body) VALUES (?, ?, ?, ?)",
+                (url, page.etag, page.last_modified, body),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+
+def _normalize_url(url: str) -> str:
+    return urldefrag(url)[0]
+
+
+def _parse_html(html: str, base_url: str) -> Tuple[str, List[str]]:
+    """Extrair texto visível e links de uma página HTML"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "footer", "header"]):
+        tag.decompose()
+
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = _normalize_url(urljoin(base_url, anchor["href"]))
+        if urlparse(link).scheme in ("http", "https"):
+            links.append(link)
+
+    text = " ".join(soup.get_text(separator=" ").split())
+    return text, links
+
+
+class _HostLimiter:
+    """Controle de concorrência e intervalo entre requisições de um host"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.next_time = 0.0
+        self.crawl_delay = 0.0
+
+
+class WebCrawler:
+    """
+    Crawler assíncrono em largura (BFS) restrito ao domínio da URL inicial
+    (e ao domínio para onde ela redireciona, ex.: example.com -> www.example.com)
+
+    - `concurrency` requisições simultâneas no total e
+      `per_host_concurrency` por host, com `per_host_delay` (ou o
+      Crawl-delay do robots.txt, se maior) entre requisições ao mesmo host
+    - `max_links` limita o total de URLs visitadas; `max_depth` a profundidade
+    - Com `cache`, envia If-None-Match/If-Modified-Since; em 304 a página
+      é entregue a partir do cache (not_modified=True)
+    - `complete` indica se o último crawl terminou sem falhas de busca
+      (erros de rede, status diferentes de 200/304/404/410, robots.txt
+      indisponível) e sem links
+      descartados pelo `max_links`; só então páginas ausentes podem ser
+      consideradas removidas do site
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 1,
+        max_links: int = 10,
+        concurrency: int = 8,
+        per_host_concurrency: int = 4,
+        per_host_delay: float = 0.0,
+        timeout: float = 10.0,
+        user_agent: str = "agno-rag-api",
+        respect_robots: bool = True,
+        cache: Optional[PageCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_depth = max_depth
+        self.max_links = max_links
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.cache = cache
+        self.transport = transport
+        self._hosts: Dict[str, _HostLimiter] = {}
+        self._robots: Dict[str, asyncio.Future] = {}
+        self._stats = {"fetched": 0, "not_modified": 0, "robots_blocked": 0, "errors": 0}
+        self.complete = False
+
+    async def crawl(self, start_url: str) -> AsyncIterator[CrawledPage]:
+        """
+        Percorrer o site a partir de start_url
+
+        Yields:
+            CrawledPage na ordem em que as páginas chegam
+        """
+        self.complete = False
+        partial = [False]  # Falha de busca ou link descartado pelo max_links
+        start_url = _normalize_url(start_url)
+        domains = {urlparse(start_url).netloc}
+        seen: Set[str] = {start_url}
+        frontier: asyncio.Queue = asyncio.Queue()
+        results: asyncio.Queue = asyncio.Queue()
+        pending = [1]  # URLs na fila ou em andamento
+        frontier.put_nowait((start_url, 0))
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    page, links = await self._fetch(client, url, depth)
+                    if page is not None:
+                        if depth == 0 and page.final_url:
+                            # Domínio final da página inicial (após redirecionamentos)
+                            domains.add(urlparse(page.final_url).netloc)
+                            seen.add(page.final_url)
+                        await results.put(page)
+                    if depth < self.max_depth:
+                        for link in links:
+                            if link in seen or urlparse(link).netloc not in domains:
+                                continue
+                            if len(seen) >= self.max_links:
+                                partial[0] = True
+                                break
+                            seen.add(link)
+                            pending[0] += 1
+                            frontier.put_nowait((link, depth + 1))
+                except Exception as e:
+                    partial[0] = True
+                    self._stats["errors"] += 1
+                    logger.warning(f"⚠️ Erro ao buscar {url}: {e}")
+                finally:
+                    pending[0] -= 1
+                    if pending[0] == 0:
+                        await results.put(None)
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent},
+            transport=self.transport,
+        ) as client:
+            workers = [asyncio.create_task(worker(client)) for _ in range(self.concurrency)]
+            try:
+                while (page := await results.get()) is not None:
+                    yield page
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        self.complete = not partial[0]
+        logger.info(f"🕸️ Crawl de {start_url}: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, url: str, depth: int
+    ) -> Tuple[Optional[CrawledPage], List[str]]:
+        if self.respect_robots and not await self._allowed(client, url):
+            self._stats["robots_blocked"] += 1
+            return None, []
+
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        async with self._host_slot(urlparse(url).netloc):
+            response = await client.get(url, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            self._stats["not_modified"] += 1
+            page = CrawledPage(
+                url, cached.text, depth, 304, not_modified=True, final_url=_normalize_url(str(response.url))
+            )
+            return page, cached.links
+
+        if response.status_code in (404, 410):
+            return None, []
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"status {response.status_code}", request=response.request, response=response
+            )
+        if "html" not in response.headers.get("content-type", ""):
+            return None, []
+
+        self._stats["fetched"] += 1
+        text, links = await asyncio.to_thread(_parse_html, response.text, str(response.url))
+        if self.cache is not None:
+            page = CachedPage(
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                text=text,
+                links=links,
+            )
+            if page.etag or page.last_modified:
+                await asyncio.to_thread(self.cache.set, url, page)
+
+        page = CrawledPage(url, text, depth, response.status_code, final_url=_normalize_url(str(response.url)))
+        return page, links
+
+    def _limiter(self, host: str) -> _HostLimiter:
+        if host not in self._hosts:
+            self._hosts[host] = _HostLimiter(self.per_host_concurrency)
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        """Reservar um slot do host respeitando o intervalo mínimo entre requisições"""
+        limiter = self._limiter(host)
+        async with limiter.semaphore:
+            delay = max(self.per_host_delay, limiter.crawl_delay)
+            if delay > 0:
+                loop = asyncio.get_running_loop()
+                async with limiter.lock:
+                    wait = limiter.next_time - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    limiter.next_time = loop.time() + delay
+            yield
+
+    async def _allowed(self, client: httpx.AsyncClient, url: str) -> bool:
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if host not in self._robots:
+            self._robots[host] = asyncio.ensure_future(
+                self._load_robots(client, f"{parsed.scheme}://{host}/robots.txt", host)
+            )
+        robots = await self._robots[host]
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    async def _load_robots(self, client: httpx.AsyncClient, robots_url: str, host: str) -> Optional[RobotFileParser]:
+        """
+        Carregar robots.txt do host (None = sem restrições)
+
+        - 4xx (ex.: 404): sem restrições
+        - 5xx, 429 ou erro de rede: host bloqueado neste crawl
+
+        Raises:
+            RobotsUnavailableError: robots.txt indisponível
+        """
+        try:
+            response = await client.get(robots_url)
+        except httpx.HTTPError as e:
+            raise RobotsUnavailableError(f"robots.txt de {host} indisponível: {e}") from e
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RobotsUnavailableError(f"robots.txt de {host} indisponível (status {response.status_code})")
+        if response.status_code != 200:
+            return None
+
+        robots = RobotFileParser(robots_url)
+        robots.parse(response.text.splitlines())
+        crawl_delay = robots.crawl_delay(self.user_agent)
+        if crawl_delay:
+            self._limiter(host).crawl_delay = float(crawl_delay)
+        return robots
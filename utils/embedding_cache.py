@@ -0,0 +1,204 @@
+"""
+Cache de embeddings de queries
+- Chave: texto normalizado + id do modelo de embedding
+- Vetores armazenados como float32 (numpy)
+- Camada em memória (LRU) e camada opcional em disco (SQLite), compartilhável entre processos
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Normalizar query para a chave do cache (minúsculas, espaços colapsados)"""
+    return " ".join(query.lower().split())
+
+
+class _DiskStore:
+    """Tabela SQLite chave -> vetor float32 (modo WAL, vários processos)"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).copy()
+
+    def set(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+                (key, vector.tobytes()),
+            )
+            self._writes += 1
+            # Poda periódica das entradas mais antigas (ordem de inserção)
+            if self._writes % 256 == 0:
+                self._conn.execute(
+                    "DELETE FROM query_embeddings WHERE rowid NOT IN "
+                    "(SELECT rowid FROM query_embeddings ORDER BY rowid DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM query_embeddings")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """
+    Cache de embeddings de queries de busca
+
+    - Memória: LRU limitado por entradas e bytes (vetores float32)
+    - Disco (opcional): SQLite compartilhado; hits em disco são promovidos à memória
+    - Métricas de hit/miss por camada
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_entries: int = 4096,
+        max_bytes: int = 16 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 100_000,
+    ):
+        self.model_id = model_id
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._disk: Optional[_DiskStore] = None
+        if disk_path:
+            try:
+                self._disk = _DiskStore(disk_path, disk_max_entries)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Cache de embeddings em disco desabilitado ({disk_path}): {e}")
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def make_key(self, query: str) -> str:
+        """Chave do cache: hash de modelo + query normalizada"""
+        raw = f"{self.model_id}\n{normalize_query(query)}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Obter vetor da query (memória e depois disco)"""
+        key = self.make_key(query)
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._hits += 1
+            return vector
+
+        if self._disk is not None:
+            vector = self._disk_get(key)
+            if vector is not None:
+                return vector
+
+        self._misses += 1
+        return None
+
+    async def aget(self, query: str) -> Optional[np.ndarray]:
+        """Versão assíncrona de get (leitura do disco fora do event loop)"""
+        key = self.make_key(query)
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._hits += 1
+            return vector
+
+        if self._disk is not None:
+            vector = await asyncio.to_thread(self._disk_get, key)
+            if vector is not None:
+                return vector
+
+        self._misses += 1
+        return None
+
+    def set(self, query: str, vector: Any) -> np.ndarray:
+        """Armazenar vetor da query (convertido para float32)"""
+        key = self.make_key(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._memory.set(key, vector)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, vector)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Erro ao gravar embedding no cache em disco: {e}")
+        return vector
+
+    async def aset(self, query: str, vector: Any) -> np.ndarray:
+        """Versão assíncrona de set (escrita no disco fora do event loop)"""
+        if self._disk is None:
+            return self.set(query, vector)
+        return await asyncio.to_thread(self.set, query, vector)
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            vector = self._disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Erro ao ler cache de embeddings em disco: {e}")
+            return None
+        if vector is None:
+            return None
+        self._disk_hits += 1
+        self._memory.set(key, vector)
+        return vector
+
+    def clear(self) -> None:
+        """Limpar memória e disco"""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        lookups = self._hits + self._disk_hits + self._misses
+        stats = {
+            "model": self.model_id,
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory": self._memory.get_stats(),
+        }
+        if self._disk is not None:
+            stats["disk"] = {"path": self._disk.path, "entries": self._disk.count()}
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._memory)
@@ -0,0 +1,303 @@
+"""
+Serviço de embeddings com micro-batching dinâmico
+- Requisições concorrentes são agrupadas em lotes (tamanho máximo / espera máxima)
+- Lotes executados em pool de processos (um modelo FastEmbed por processo)
+- Threads do ONNX Runtime controladas pelas Settings
+- Embeddings de queries de busca reaproveitados via QueryEmbeddingCache
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.fastembed import FastEmbedEmbedder
+
+from utils.embedding_cache import QueryEmbeddingCache
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Workers quando não configurados: cada um carrega uma cópia do modelo
+DEFAULT_WORKERS = 2
+
+# Modelo carregado em cada worker (processo ou thread)
+_worker_model = None
+
+
+def _init_worker(model_name: str, onnx_threads: Optional[int]) -> None:
+    """Carregar o modelo FastEmbed no worker"""
+    global _worker_model
+    if _worker_model is None:
+        from fastembed import TextEmbedding
+
+        _worker_model = TextEmbedding(model_name=model_name, threads=onnx_threads)
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    """Gerar embeddings de um lote de textos (executado no worker)"""
+    return np.asarray(list(_worker_model.embed(texts)), dtype=np.float32)
+
+
+class EmbeddingService:
+    """
+    Agrupa chamadas concorrentes de embedding em micro-lotes
+
+    - `embed()` retorna assim que o lote que contém o texto for processado
+    - Um lote é disparado ao atingir `max_batch_size` ou após `max_wait_ms`
+    - No máximo `workers` lotes executam ao mesmo tempo (um por worker)
+    - `embed_query()` consulta o cache de queries antes de entrar na fila
+    - Um pool de processos quebrado (worker morto) é recriado e o lote repetido uma vez
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        workers: int = 0,
+        onnx_threads: Optional[int] = 1,
+        use_processes: bool = True,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+    ):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers or min(DEFAULT_WORKERS, os.cpu_count() or 1)
+        self.onnx_threads = onnx_threads
+        self.use_processes = use_processes
+        self.query_cache = query_cache
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()  # Lotes em execução (referência mantida até terminarem)
+        self._batches = 0
+        self._items = 0
+        self._pool_restarts = 0
+
+    def _create_executor(self) -> Executor:
+        if not self.use_processes:
+            return ThreadPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.onnx_threads),
+            )
+        # spawn: o processo da API já tem threads (to_thread, SQLite, logging) e fork pode travar o filho
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.onnx_threads),
+        )
+
+    def _restart_executor(self, broken: Executor) -> None:
+        """Substituir um pool quebrado (apenas uma vez, mesmo com vários lotes falhando)"""
+        if self._executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+        self._pool_restarts += 1
+        logger.warning("⚠️ Pool de embeddings quebrado (worker encerrado), recriado")
+
+    def _ensure_started(self) -> None:
+        """Iniciar executor e batcher no event loop atual (lazy)"""
+        if self._batcher is not None and not self._batcher.done():
+            return
+
+        if self._executor is None:
+            self._executor = self._create_executor()
+            logger.info(
+                f"🧮 Embedding service: {self.workers} "
+                f"{'processos' if self.use_processes else 'threads'}, "
+                f"lote até {self.max_batch_size}, espera {self.max_wait * 1000:.0f}ms"
+            )
+
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._batch_loop())
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Gerar embedding de um texto
+
+        Args:
+            text: Texto a embedar
+
+        Returns:
+            Vetor de embedding
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Gerar embedding de uma query de busca (com cache)
+
+        Args:
+            query: Texto da busca
+
+        Returns:
+            Vetor de embedding
+        """
+        if self.query_cache is None:
+            return await self.embed(query)
+
+        vector = await self.query_cache.aget(query)
+        if vector is None:
+            vector = await self.query_cache.aset(query, await self.embed(query))
+        return vector.tolist()
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Gerar embeddings de vários textos (entram nos mesmos lotes)"""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Drenar o que já está na fila antes de esperar
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, _embed_batch, texts)
+        except BrokenProcessPool:
+            self._restart_executor(executor)
+            return await loop.run_in_executor(self._executor, _embed_batch, texts)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+
+        try:
+            vectors = await self._embed_texts(texts)
+            self._batches += 1
+            self._items += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector.tolist())
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar embeddings do lote: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de batching"""
+        stats = {
+            "workers": self.workers,
+            "mode": "process" if self.use_processes else "thread",
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running_batches": len(self._tasks),
+            "pool_restarts": self._pool_restarts,
+        }
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.get_stats()
+        return stats
+
+    async def close(self) -> None:
+        """Parar o batcher e o pool de workers"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.query_cache is not None:
+            self.query_cache.close()
+
+
+@dataclass
+class BatchedFastEmbedEmbedder(FastEmbedEmbedder):
+    """
+    FastEmbedEmbedder cujas chamadas assíncronas passam pelo EmbeddingService
+
+    No Qdrant, `async_get_embedding` é usado na busca (passa pelo cache de
+    queries) e `async_get_embedding_and_usage` na ingestão (sem cache).
+    As chamadas síncronas continuam usando o modelo local do processo.
+    """
+
+    service: Optional[EmbeddingService] = None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        if self.service is None:
+            return await super().async_get_embedding(text)
+        return await self.service.embed_query(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        if self.service is None:
+            return await super().async_get_embedding_and_usage(text)
+        return await self.service.embed(text), None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """
+    Retorna instância configurada do serviço de embeddings
+
+    Returns:
+        Instância de EmbeddingService
+    """
+    query_cache = None
+    if settings.embedding_query_cache_enabled:
+        query_cache = QueryEmbeddingCache(
+            model_id=settings.embedder_model,
+            max_entries=settings.embedding_query_cache_max_entries,
+            max_bytes=settings.embedding_query_cache_max_bytes,
+            disk_path=settings.embedding_query_cache_path or None,
+            disk_max_entries=settings.embedding_query_cache_disk_max_entries,
+        )
+
+    return EmbeddingService(
+        model_name=settings.embedder_model,
+        max_batch_size=settings.embedding_batch_size,
+        max_wait_ms=settings.embedding_batch_wait_ms,
+        workers=settings.embedding_workers,
+        onnx_threads=settings.embedding_onnx_threads,
+        use_processes=settings.embedding_use_processes,
+        query_cache=query_cache,
+    )
+
+
+# Instância singleton do serviço de embeddings
+embedding_service = get_embedding_service()
@@ -0,0 +1,104 @@
+"""
+Índice local de hashes de chunks por origem (deduplicação da ingestão)
+- Tabela SQLite (origem, hash do chunk) espelhando o payload do Qdrant
+- Permite decidir sem consultar o Qdrant quais chunks pular, gravar ou remover
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Set
+
+from utils.settings import settings
+
+
+def chunk_hash(content: str) -> str:
+    """Hash do conteúdo de um chunk"""
+    return hashlib.md5(content.encode("utf-8", errors="replace")).hexdigest()
+
+
+class ChunkHashIndex:
+    """
+    Hashes dos chunks já gravados, agrupados por origem (URL ou arquivo)
+
+    Os métodos são síncronos (SQLite local); no event loop use
+    `asyncio.to_thread`. O arquivo só é aberto (e criado) no primeiro uso.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão aberta sob demanda (chamar com o lock)"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_hashes ("
+                "source TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (source, hash))"
+            )
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    def has_source(self, source: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM chunk_hashes WHERE source = ? LIMIT 1", (source,)
+            ).fetchone()
+        return row is not None
+
+    def get_hashes(self, source: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hash FROM chunk_hashes WHERE source = ?", (source,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, source: str, hashes: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_hashes (source, hash) VALUES (?, ?)",
+                [(source, h) for h in hashes],
+            )
+            self._conn.commit()
+
+    def remove(self, source: str, hashes: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunk_hashes WHERE source = ? AND hash = ?",
+                [(source, h) for h in hashes],
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_hashes")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def get_chunk_hash_index() -> ChunkHashIndex:
+    """
+    Retorna instância configurada do índice de hashes
+
+    Returns:
+        Instância de ChunkHashIndex
+    """
+    return ChunkHashIndex(settings.knowledge_hash_index_path)
+
+
+# Instância singleton do índice de hashes (arquivo aberto no primeiro uso)
+chunk_hash_index = get_chunk_hash_index()
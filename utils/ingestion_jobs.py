@@ -0,0 +1,321 @@
+"""
+Fila de jobs de ingestão da knowledge base
+- Rotas enfileiram e retornam o id do job imediatamente
+- Pool de workers com concorrência configurável
+- Estado persistido em disco (JSON por job) para retomar após reinício
+- Cancelamento de jobs enfileirados ou em execução
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Estados de um job de ingestão"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+
+# Intervalo mínimo entre gravações de progresso de um mesmo job (mudanças de estágio são imediatas)
+SAVE_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class IngestionJob:
+    """Job de ingestão e seu progresso"""
+    content_type: str  # url, json, pdf
+    source: str  # URL ou nome do arquivo enviado
+    params: Dict[str, Any] = field(default_factory=dict)
+    spool_path: Optional[str] = None  # Arquivo enviado, salvo até o fim do job
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JobStatus.QUEUED.value
+    stage: str = "queued"  # queued, reading, indexing, cleanup, done
+    chunks_total: Optional[int] = None
+    chunks_processed: int = 0
+    chunks_added: int = 0  # Chunks novos ou alterados gravados
+    chunks_skipped: int = 0  # Chunks inalterados (já gravados)
+    chunks_removed: int = 0  # Chunks que sumiram da origem
+    points_per_second: Optional[float] = None  # Vazão dos upserts no Qdrant
+    attempts: int = 0
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    resumed_from: int = 0  # chunks_processed no início da tentativa atual
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Chunks por segundo na tentativa atual"""
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        if elapsed <= 0:
+            return None
+        return round((self.chunks_processed - self.resumed_from) / elapsed, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["throughput"] = self.throughput
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestionJob":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+class JobStore:
+    """Persistência dos jobs em disco (um arquivo JSON por job)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def spool_path(self, job_id: str, suffix: str = "") -> str:
+        """Caminho para salvar o arquivo enviado de um job"""
+        return os.path.join(self.directory, f"{job_id}.upload{suffix}")
+
+    def save(self, job: IngestionJob) -> None:
+        path = self._path(job.id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp_path, path)  # Escrita atômica
+
+    def delete(self, job: IngestionJob) -> None:
+        for path in (self._path(job.id), job.spool_path):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+    def load_all(self) -> List[IngestionJob]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    jobs.append(IngestionJob.from_dict(json.load(f)))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"⚠️ Job de ingestão inválido ignorado ({name}): {e}")
+        return sorted(jobs, key=lambda job: job.created_at)
+
+
+# Callback de progresso recebido pelo handler: update(job, stage=..., chunks_processed=...)
+ProgressCallback = Callable[..., None]
+JobHandler = Callable[[IngestionJob, ProgressCallback], Awaitable[None]]
+
+
+class IngestionJobQueue:
+    """
+    Fila de jobs de ingestão com pool de workers
+
+    - `submit()` persiste e enfileira o job
+    - O handler recebe o job e um callback `update(job, **campos)` para
+      reportar estágio e progresso (estágio persistido na hora, progresso
+      no máximo a cada SAVE_INTERVAL_SECONDS)
+    - A gravação em disco roda em thread, fora do event loop, e em ordem
+    - Jobs não finalizados no disco são retomados em `start()`; cabe ao
+      handler pular o que já foi gravado
+    - Ao parar a aplicação, jobs em execução não são marcados como
+      cancelados e voltam à fila no próximo `start()`
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        store: JobStore,
+        workers: int = 2,
+        keep_finished: int = 200,
+    ):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._write_lock = asyncio.Lock()
+        self._writes: Set[asyncio.Task] = set()
+        self._saved_at: Dict[str, float] = {}
+
+    async def start(self) -> None:
+        """Iniciar workers e retomar jobs não finalizados"""
+        self._queue = asyncio.Queue()
+
+        resumed = 0
+        for job in await asyncio.to_thread(self.store.load_all):
+            self._jobs[job.id] = job
+            if not job.finished:
+                job.status = JobStatus.QUEUED.value
+                job.stage = "queued"
+                self._queue.put_nowait(job)
+                resumed += 1
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"📥 Ingestão: {self.workers} workers, {resumed} jobs retomados")
+
+    async def stop(self) -> None:
+        """Parar workers (jobs em execução serão retomados no próximo start)"""
+        tasks = self._workers + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._running.clear()
+
+        # Gravar o progresso ainda não persistido (throttle) antes de sair
+        await asyncio.gather(*self._writes, return_exceptions=True)
+        for job in self._jobs.values():
+            if job.status == JobStatus.RUNNING.value:
+                await self._write(self.store.save, job)
+
+    async def submit(self, job: IngestionJob) -> IngestionJob:
+        """Persistir e enfileirar um job"""
+        if self._queue is None:
+            raise RuntimeError("Fila de ingestão não iniciada")
+
+        await asyncio.to_thread(self.store.save, job)
+        self._jobs[job.id] = job
+        await self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> List[IngestionJob]:
+        """Jobs mais recentes primeiro"""
+        return list(reversed(self._jobs.values()))[:limit]
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Cancelar um job
+
+        Returns:
+            Job (inalterado se já finalizado) ou None se não existir
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        job.cancel_requested = True
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            self._finish(job, JobStatus.CANCELLED)
+        return job
+
+    def update(self, job: IngestionJob, **changes: Any) -> None:
+        """Atualizar progresso de um job (usado pelo handler)"""
+        stage_changed = "stage" in changes and changes["stage"] != job.stage
+        for name, value in changes.items():
+            setattr(job, name, value)
+
+        now = time.monotonic()
+        saved_at = self._saved_at.get(job.id)
+        if stage_changed or saved_at is None or now - saved_at >= SAVE_INTERVAL_SECONDS:
+            self._saved_at[job.id] = now
+            self._write_later(self.store.save, job)
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "jobs": counts,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.status != JobStatus.QUEUED.value:
+                continue  # Cancelado enquanto aguardava
+
+            job.status = JobStatus.RUNNING.value
+            job.attempts += 1
+            job.started_at = time.time()
+            job.finished_at = None
+            job.resumed_from = job.chunks_processed
+            await self._write(self.store.save, job)
+
+            task = asyncio.create_task(self.handler(job, self.update))
+            self._running[job.id] = task
+            try:
+                await asyncio.wait([task])
+            finally:
+                self._running.pop(job.id, None)
+
+            if task.cancelled():
+                if job.cancel_requested:
+                    self._finish(job, JobStatus.CANCELLED)
+            elif task.exception() is not None:
+                error = task.exception()
+                logger.error(f"❌ Job de ingestão {job.id} falhou: {error}")
+                self._finish(job, JobStatus.FAILED, error=str(error))
+            else:
+                self._finish(job, JobStatus.COMPLETED)
+
+    def _finish(self, job: IngestionJob, status: JobStatus, error: Optional[str] = None) -> None:
+        job.status = status.value
+        job.error = error
+        job.finished_at = time.time()
+        if status == JobStatus.COMPLETED:
+            job.stage = "done"
+
+        # Arquivo enviado não é mais necessário
+        if job.spool_path and os.path.exists(job.spool_path):
+            os.unlink(job.spool_path)
+        self._saved_at.pop(job.id, None)
+        self._write_later(self.store.save, job)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Descartar os jobs finalizados mais antigos além de keep_finished"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+            self._write_later(self.store.delete, job)
+
+    async def _write(self, operation: Callable[[IngestionJob], None], job: IngestionJob) -> None:
+        """Executar uma operação do store em thread, uma de cada vez (ordem de chegada)"""
+        async with self._write_lock:
+            try:
+                await asyncio.to_thread(operation, job)
+            except OSError as e:
+                logger.error(f"❌ Falha ao gravar job de ingestão {job.id}: {e}")
+
+    def _write_later(self, operation: Callable[[IngestionJob], None], job: IngestionJob) -> None:
+        """Agendar uma operação do store sem bloquear quem chamou (callbacks síncronos)"""
+        task = asyncio.create_task(self._write(operation, job))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
@@ -0,0 +1,460 @@
+"""
+Serviço assíncrono da Knowledge Base
+- Consultas ao Qdrant via AsyncQdrantClient (sem bloquear o event loop)
+- Embedding (inferência FastEmbed, CPU) no embedding_service (micro-lotes)
+- Busca densa, esparsa (BM25) ou híbrida (fusão RRF numa única consulta)
+- Rerank opcional dos candidatos com cross-encoder local, dentro de um orçamento de latência
+- Filtros de metadados (origem, domínio, tipo, tags, data de ingestão) sobre índices de payload
+- Listagem paginada por cursor (offset do scroll) e exportação em streaming
+"""
+
+import base64
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from agno.vectordb.qdrant import Qdrant
+from qdrant_client import AsyncQdrantClient, models
+
+from utils import qdrant_collection
+from utils.embedding_service import EmbeddingService, embedding_service
+from utils.reranker import CrossEncoderReranker, reranker
+from utils.settings import settings
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, sparse_encoder
+from utils.vector_db import vector_db
+
+logger = logging.getLogger(__name__)
+
+# Filtros de busca → campo do payload (todos com índice, ver qdrant_collection)
+FILTER_FIELDS = {
+    "source": "meta_data.source",
+    "domain": "meta_data.domain",
+    "content_type": "meta_data.content_type",
+    "tags": "meta_data.tags",
+}
+RANGE_FILTERS = ("ingested_after", "ingested_before")
+
+
+def encode_cursor(offset: Optional[Any]) -> Optional[str]:
+    """Cursor opaco a partir do offset do scroll (id do próximo ponto)"""
+    if offset is None:
+        return None
+    data = json.dumps({"o": str(offset) if not isinstance(offset, int) else offset})
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Union[int, str]]:
+    """
+    Offset do scroll a partir do cursor
+
+    Raises:
+        ValueError: Cursor inválido
+    """
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset = json.loads(data)["o"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(offset, (int, str)):
+        raise ValueError("Cursor inválido")
+    return offset
+
+
+@dataclass
+class SearchHit:
+    """Resultado de busca na knowledge base"""
+    id: str
+    content: str
+    meta_data: Dict[str, Any] = field(default_factory=dict)
+    score: Optional[float] = None
+    name: Optional[str] = None
+    rerank_score: Optional[float] = None
+
+
+class KnowledgeService:
+    """
+    Operações assíncronas sobre a coleção da knowledge base
+
+    - Chamadas ao Qdrant usam o AsyncQdrantClient do vector_db
+    - O embedding da query é feito pelo EmbeddingService, que agrupa buscas
+      concorrentes em lotes e roda fora do event loop
+    - Com rerank, `rerank_candidates` resultados são reordenados pelo
+      CrossEncoderReranker e os `limit` melhores são retornados
+    """
+
+    def __init__(
+        self,
+        vector_db: Qdrant,
+        embedding_service: EmbeddingService,
+        reranker: Optional[CrossEncoderReranker] = None,
+    ):
+        self.vector_db = vector_db
+        self.embedding_service = embedding_service
+        self.reranker = reranker
+        self._count: Optional[Tuple[float, int]] = None  # (momento, total)
+
+    @property
+    def collection(self) -> str:
+        return self.vector_db.collection
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        return self.vector_db.async_client
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Gerar embedding da query fora do event loop (com cache de queries)"""
+        return await self.embedding_service.embed_query(query)
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 5,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None,
+        budget_ms: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchHit]:
+        """
+        Busca na knowledge base, com rerank opcional
+
+        O rerank busca `rerank_candidates` resultados e os reordena com o
+        cross-encoder. O orçamento (`budget_ms`) vale para a busca inteira:
+        o que a consulta ao Qdrant consumir sai do tempo do rerank, e se o
+        orçamento acabar os resultados voltam na ordem da busca.
+
+        Args:
+            query: Texto de busca
+            limit: Número máximo de resultados
+            mode: dense, sparse ou hybrid (padrão: `knowledge_search_mode`)
+            rerank: Aplicar rerank (padrão: `rerank_enabled`)
+            budget_ms: Orçamento de latência (padrão: `rerank_budget_ms`; 0 = sem limite)
+            filters: Filtros de metadados (ver `build_filter`)
+
+        Returns:
+            Lista de SearchHit ordenada por relevância
+        """
+        start = time.perf_counter()
+        query_filter = self.build_filter(filters)
+        rerank = settings.rerank_enabled if rerank is None else rerank
+        if not rerank or self.reranker is None:
+            return await self._query(query, limit, mode, query_filter)
+
+        hits = await self._query(query, max(limit, settings.rerank_candidates), mode, query_filter)
+        budget = (settings.rerank_budget_ms if budget_ms is None else budget_ms) / 1000
+        timeout = budget - (time.perf_counter() - start) if budget > 0 else None
+        hits, _ = await self.reranker.rerank(query, hits, limit, timeout)
+        return hits
+
+    async def _query(
+        self,
+        query: str,
+        limit: int,
+        mode: Optional[str],
+        query_filter: Optional[models.Filter] = None,
+    ) -> List[SearchHit]:
+        """
+        Consulta ao Qdrant
+
+        Modos:
+        - dense: similaridade semântica (embedding)
+        - sparse: termos exatos (BM25), bom para nomes de produto, SKUs e códigos
+        - hybrid: as duas buscas numa única consulta, combinadas por RRF
+        Coleções sem o vetor esparso (anteriores à migração) usam a busca densa.
+        """
+        mode = (mode or settings.knowledge_search_mode).lower()
+        if mode not in ("dense", "sparse", "hybrid"):
+            raise ValueError(f"Modo de busca inválido: {mode} (use dense, sparse ou hybrid)")
+        if mode != "dense" and not await qdrant_collection.has_sparse_vectors(self.client, self.collection):
+            mode = "dense"
+
+        if mode == "sparse":
+            response = await self.client.query_points(
+                collection_name=self.collection,
+                query=sparse_encoder.encode_query(query),
+                using=SPARSE_VECTOR_NAME,
+                query_filter=query_filter,
+                limit=limit,
+                with_payload=True,
+                with_vectors=False,
+            )
+        elif mode == "hybrid":
+            vector = await self.embed_query(query)
+            candidates = limit * settings.hybrid_prefetch_multiplier
+            response = await self.client.query_points(
+                collection_name=self.collection,
+                prefetch=[
+                    models.Prefetch(
+                        query=vector,
+                        filter=query_filter,
+                        limit=candidates,
+                        params=qdrant_collection.search_params(),
+                    ),
+                    models.Prefetch(
+                        query=sparse_encoder.encode_query(query),
+                        using=SPARSE_VECTOR_NAME,
+                        filter=query_filter,
+                        limit=candidates,
+                    ),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=limit,
+                with_payload=True,
+                with_vectors=False,
+            )
+        else:
+            vector = await self.embed_query(query)
+            response = await self.client.query_points(
+                collection_name=self.collection,
+                query=vector,
+                query_filter=query_filter,
+                limit=limit,
+                search_params=qdrant_collection.search_params(),
+                with_payload=True,
+                with_vectors=False,
+            )
+
+        return [self._to_hit(point) for point in response.points if point.payload is not None]
+
+    async def retrieve(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca usada pelo Agent (knowledge_retriever), com modo e rerank padrão
+
+        `filters` vem dos `knowledge_filters` do run (validados na requisição
+        do chat): ignorar uma chave desconhecida ampliaria a busca.
+
+        Returns:
+            Documentos como dicionários (name, content, meta_data, score, rerank_score)
+
+        Raises:
+            ValueError: Filtro desconhecido
+        """
+        filters = filters if isinstance(filters, dict) else None
+        hits = await self.search(query, limit=num_documents or 10, filters=filters)
+        return [asdict(hit) for hit in hits]
+
+    async def get_points_count(self, max_age: float = 0, exact: bool = True) -> int:
+        """
+        Número de pontos (chunks) na coleção
+
+        Args:
+            max_age: Reaproveitar o total obtido há menos de `max_age` segundos
+            exact: False usa a contagem aproximada do Qdrant (sem percorrer a coleção)
+        """
+        now = time.monotonic()
+        if max_age > 0 and self._count is not None and now - self._count[0] < max_age:
+            return self._count[1]
+
+        result = await self.client.count(self.collection, exact=exact)
+        self._count = (now, result.count)
+        return result.count
+
+    async def scroll(
+        self,
+        limit: int = 10,
+        offset: Optional[Any] = None,
+        with_payload: Union[bool, List[str]] = True,
+    ) -> Tuple[list, Optional[Any]]:
+        """
+        Percorrer pontos da coleção
+
+        Args:
+            limit: Pontos por página
+            offset: Id do primeiro ponto (offset da página anterior)
+            with_payload: True ou lista de campos do payload
+
+        Returns:
+            (pontos, offset da próxima página ou None no fim)
+        """
+        return await self.client.scroll(
+            collection_name=self.collection,
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=False,
+        )
+
+    async def iter_points(
+        self,
+        batch_size: int = 256,
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+    ) -> AsyncIterator[Any]:
+        """Todos os pontos da coleção, uma página do scroll por vez (memória constante)"""
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+            )
+            for point in points:
+                yield point
+            if offset is None:
+                return
+
+    @staticmethod
+    def build_filter(filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """
+        Filtro do Qdrant a partir dos filtros de busca
+
+        - source, domain, content_type, tags: valor ou lista (qualquer um)
+        - ingested_after / ingested_before: timestamp (segundos) ou datetime
+        Os campos são combinados com E.
+
+        Raises:
+            ValueError: Filtro desconhecido
+        """
+        if not filters:
+            return None
+
+        unknown = set(filters) - set(FILTER_FIELDS) - set(RANGE_FILTERS)
+        if unknown:
+            raise ValueError(f"Filtros desconhecidos: {sorted(unknown)}")
+
+        conditions = []
+        for name, key in FILTER_FIELDS.items():
+            value = filters.get(name)
+            if value is None or value == []:
+                continue
+            values = [str(v) for v in value] if isinstance(value, (list, tuple, set)) else [str(value)]
+            conditions.append(models.FieldCondition(key=key, match=models.MatchAny(any=values)))
+
+        after, before = (filters.get(name) for name in RANGE_FILTERS)
+        if after is not None or before is not None:
+            conditions.append(models.FieldCondition(
+                key="meta_data.ingested_at",
+                range=models.Range(
+                    gte=after.timestamp() if hasattr(after, "timestamp") else after,
+                    lte=before.timestamp() if hasattr(before, "timestamp") else before,
+                ),
+            ))
+
+        return models.Filter(must=conditions) if conditions else None
+
+    @staticmethod
+    def _source_filter(source: str) -> models.Filter:
+        return models.Filter(must=[
+            models.FieldCondition(key="meta_data.source", match=models.MatchValue(value=source)),
+        ])
+
+    async def get_source_hashes(self, source: str) -> Set[str]:
+        """
+        Hashes dos chunks de uma origem gravados no Qdrant
+
+        Usado para reconstruir o índice local de hashes quando ele não
+        conhece a origem.
+        """
+        if not await self.client.collection_exists(self.collection):
+            return set()
+
+        hashes = set()
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=self._source_filter(source),
+                limit=1000,
+                offset=offset,
+                with_payload=["meta_data"],
+                with_vectors=False,
+            )
+            for point in points:
+                value = ((point.payload or {}).get("meta_data") or {}).get("chunk_hash")
+                if value:
+                    hashes.add(value)
+            if offset is None:
+                return hashes
+
+    def _chunks_filters(self, source: str, hashes: Iterable[str], batch_size: int) -> Iterator[models.Filter]:
+        """Filtros por origem + hashes, em lotes de `batch_size` hashes"""
+        hashes = list(hashes)
+        for start in range(0, len(hashes), batch_size):
+            selector = self._source_filter(source)
+            selector.must.append(models.FieldCondition(
+                key="meta_data.chunk_hash",
+                match=models.MatchAny(any=hashes[start:start + batch_size]),
+            ))
+            yield selector
+
+    async def delete_chunks(self, source: str, hashes: Iterable[str], batch_size: int = 1000) -> None:
+        """Remover os chunks de uma origem com os hashes informados"""
+        for selector in self._chunks_filters(source, hashes, batch_size):
+            await self.client.delete(
+                collection_name=self.collection,
+                points_selector=models.FilterSelector(filter=selector),
+            )
+
+    async def update_chunks_metadata(
+        self,
+        source: str,
+        hashes: Iterable[str],
+        meta_data: Dict[str, Any],
+        batch_size: int = 1000,
+    ) -> None:
+        """Atualizar campos de meta_data dos chunks de uma origem (sem regravar vetores)"""
+        for selector in self._chunks_filters(source, hashes, batch_size):
+            await self.client.set_payload(
+                collection_name=self.collection,
+                payload=meta_data,
+                points=models.FilterSelector(filter=selector),
+                key="meta_data",
+            )
+
+    async def ensure_collection(self) -> bool:
+        """Criar a coleção com a configuração do Settings, se não existir"""
+        return await qdrant_collection.ensure_collection(self.client, self.collection)
+
+    async def recreate_collection(self) -> None:
+        """Apagar e recriar a coleção vazia (configuração do Settings)"""
+        await qdrant_collection.recreate_collection(self.client, self.collection)
+        self._count = None
+
+    async def migrate_collection(self) -> int:
+        """Reconstruir a coleção com a configuração atual, mantendo os pontos"""
+        return await qdrant_collection.migrate_collection(self.client, self.collection)
+
+    async def close(self) -> None:
+        """Liberar o cliente assíncrono"""
+        if hasattr(self.vector_db, "async_close"):
+            await self.vector_db.async_close()
+
+    @staticmethod
+    def _to_hit(point: Any) -> SearchHit:
+        payload = point.payload or {}
+        return SearchHit(
+            id=str(point.id),
+            content=payload.get("content", ""),
+            meta_data=payload.get("meta_data") or {},
+            score=getattr(point, "score", None),
+            name=payload.get("name"),
+        )
+
+
+def get_knowledge_service() -> KnowledgeService:
+    """
+    Retorna instância configurada do serviço assíncrono da knowledge base
+
+    Returns:
+        Instância de KnowledgeService
+    """
+    return KnowledgeService(
+        vector_db=vector_db,
+        embedding_service=embedding_service,
+        reranker=reranker,
+    )
+
+
+# Instância singleton do serviço
+knowledge_service = get_knowledge_service()
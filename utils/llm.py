@@ -18,7 +18,7 @@ def get_groq_llm(model_id: str = None) -> Groq:
     """
     model = model_id or settings.default_model
 
-    return Groq(id=model, api_key=settings.groq_api_key)
+    return Groq(id=model, api_key=settings.groq_api_key, max_tokens=settings.agent_max_tokens)
 
 
 class LLMConfig:
@@ -34,6 +34,20 @@ class LLMConfig:
         "mixtral-8x7b": "mixtral-8x7b-32768",
     }
 
+    # Janela de contexto (tokens de entrada + saída) por nome amigável
+    CONTEXT_WINDOWS = {
+        "llama-3.3-70b": 131072,
+        "llama-3.1-70b": 131072,
+        "llama-3.1-8b": 131072,
+        "mixtral-8x7b": 32768,
+    }
+
+    # Janela assumida para modelos fora da tabela
+    DEFAULT_CONTEXT_WINDOW = 8192
+
+    # Instâncias compartilhadas por model_id
+    _instances: dict = {}
+
     @staticmethod
     def get_model(model_name: str = "llama-3.3-70b") -> Groq:
         """
@@ -48,6 +62,38 @@ class LLMConfig:
         model_id = LLMConfig.MODELS.get(model_name, settings.default_model)
         return get_groq_llm(model_id)
 
+    @staticmethod
+    def get_shared_model(model_name: str = "llama-3.3-70b") -> Groq:
+        """
+        Retorna instância compartilhada do modelo pelo nome amigável
+
+        Reutiliza o mesmo cliente Groq entre agents/sessões em vez de
+        criar um novo a cada chamada.
+
+        Args:
+            model_name: Nome amigável do modelo
+
+        Returns:
+            Instância de Groq compartilhada
+        """
+        model_id = LLMConfig.MODELS.get(model_name, settings.default_model)
+        if model_id not in LLMConfig._instances:
+            LLMConfig._instances[model_id] = get_groq_llm(model_id)
+        return LLMConfig._instances[model_id]
+
+    @staticmethod
+    def get_context_window(model_name: str = "llama-3.3-70b") -> int:
+        """
+        Retorna a janela de contexto do modelo pelo nome amigável
+
+        Args:
+            model_name: Nome amigável do modelo
+
+        Returns:
+            Tokens de entrada + saída aceitos pelo modelo
+        """
+        return LLMConfig.CONTEXT_WINDOWS.get(model_name, LLMConfig.DEFAULT_CONTEXT_WINDOW)
+
     @staticmethod
     def list_models() -> dict:
         """
@@ -0,0 +1,260 @@
+"""
+Configuração da coleção do Qdrant (criação e migração)
+- Parâmetros de vetores, HNSW, quantização e armazenamento em disco vindos do Settings
+- Vetor esparso BM25 (busca híbrida) ao lado do vetor denso sem nome
+- Índices de payload nos campos de metadados usados em filtros
+- Migração: reconstrói uma coleção existente com a configuração atual
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from qdrant_client import AsyncQdrantClient, models
+
+from utils.settings import Settings, settings
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, sparse_encoder
+
+logger = logging.getLogger(__name__)
+
+# Campos do payload com índice (filtros de ingestão, dedup e busca)
+PAYLOAD_INDEXES: Dict[str, models.PayloadSchemaType] = {
+    "content_hash": models.PayloadSchemaType.KEYWORD,
+    "meta_data.source": models.PayloadSchemaType.KEYWORD,
+    "meta_data.chunk_hash": models.PayloadSchemaType.KEYWORD,
+    "meta_data.page": models.PayloadSchemaType.INTEGER,
+    "meta_data.content_type": models.PayloadSchemaType.KEYWORD,
+    "meta_data.domain": models.PayloadSchemaType.KEYWORD,
+    "meta_data.tags": models.PayloadSchemaType.KEYWORD,
+    "meta_data.ingested_at": models.PayloadSchemaType.FLOAT,
+}
+
+
+def quantization_config(config: Settings = settings) -> Optional[Any]:
+    """
+    Quantização configurada (`vector_db_quantization`)
+
+    - scalar: int8, 4x menos memória, perda de precisão pequena
+    - binary: 1 bit por dimensão, 32x menos memória; indicado para modelos
+      com muitas dimensões (>= 1024) e sempre com rescoring
+    - none: sem quantização
+    """
+    kind = config.vector_db_quantization.lower()
+    if kind == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=config.vector_db_quantization_quantile,
+            always_ram=config.vector_db_quantization_always_ram,
+        ))
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=config.vector_db_quantization_always_ram,
+        ))
+    if kind == "none":
+        return None
+    raise ValueError(f"Quantização inválida: {config.vector_db_quantization} (use none, scalar ou binary)")
+
+
+def collection_params(config: Settings = settings) -> Dict[str, Any]:
+    """Parâmetros de create_collection a partir do Settings"""
+    return {
+        "vectors_config": models.VectorParams(
+            size=config.embedder_dimensions,
+            distance=models.Distance.COSINE,
+            on_disk=config.vector_db_on_disk,
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=config.vector_db_hnsw_m,
+            ef_construct=config.vector_db_hnsw_ef_construct,
+            on_disk=config.vector_db_hnsw_on_disk,
+        ),
+        "quantization_config": quantization_config(config),
+        "sparse_vectors_config": {
+            SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=config.vector_db_on_disk),
+                modifier=models.Modifier.IDF,
+            ),
+        } if config.hybrid_search_enabled else None,
+        "on_disk_payload": config.vector_db_on_disk_payload,
+    }
+
+
+# Segundos até consultar de novo uma coleção sem vetor esparso (pode ter sido
+# migrada por scripts/migrate_collection.py com a API rodando)
+SPARSE_RECHECK_SECONDS = 30.0
+
+# Coleção -> (tem vetor esparso, momento da consulta)
+_sparse_support: Dict[str, Tuple[bool, float]] = {}
+
+
+async def has_sparse_vectors(client: AsyncQdrantClient, collection: str) -> bool:
+    """
+    Se a coleção tem o vetor esparso BM25 (coleções antigas não têm até migrar)
+
+    Resultado positivo fica em cache; negativo é consultado de novo após
+    `SPARSE_RECHECK_SECONDS`.
+    """
+    now = time.monotonic()
+    cached = _sparse_support.get(collection)
+    if cached is not None and (cached[0] or now - cached[1] < SPARSE_RECHECK_SECONDS):
+        return cached[0]
+
+    if not await client.collection_exists(collection):
+        return False
+    info = await client.get_collection(collection)
+    supported = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    _sparse_support[collection] = (supported, now)
+    return supported
+
+
+def search_params(config: Settings = settings) -> Optional[models.SearchParams]:
+    """
+    Parâmetros de busca: com quantização, a busca usa os vetores quantizados
+    e recalcula o score dos `limit * oversampling` melhores com os vetores
+    originais (rescore)
+    """
+    if config.vector_db_quantization.lower() == "none":
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=config.vector_db_quantization_rescore,
+        oversampling=config.vector_db_quantization_oversampling,
+    ))
+
+
+async def create_payload_indexes(client: AsyncQdrantClient, collection: str) -> None:
+    """Criar os índices de payload (operação idempotente)"""
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        await client.create_payload_index(
+            collection_name=collection,
+            field_name=field_name,
+            field_schema=schema,
+        )
+
+
+async def create_collection(client: AsyncQdrantClient, collection: str, config: Settings = settings) -> None:
+    """Criar a coleção com a configuração atual e seus índices de payload"""
+    await client.create_collection(collection_name=collection, **collection_params(config))
+    await create_payload_indexes(client, collection)
+    _sparse_support[collection] = (config.hybrid_search_enabled, time.monotonic())
+    logger.info(
+        f"🗂️ Coleção {collection} criada: {config.embedder_dimensions} dims, "
+        f"quantização {config.vector_db_quantization}, on_disk={config.vector_db_on_disk}"
+    )
+
+
+async def ensure_collection(client: AsyncQdrantClient, collection: str, config: Settings = settings) -> bool:
+    """
+    Garantir que a coleção existe e tem os índices de payload
+
+    Returns:
+        True se a coleção foi criada agora
+    """
+    if await client.collection_exists(collection):
+        await create_payload_indexes(client, collection)
+        return False
+    await create_collection(client, collection, config)
+    return True
+
+
+async def recreate_collection(client: AsyncQdrantClient, collection: str, config: Settings = settings) -> None:
+    """Apagar e recriar a coleção vazia"""
+    await client.delete_collection(collection)
+    await create_collection(client, collection, config)
+
+
+def _point_vector(point: Any, sparse: bool) -> Any:
+    """Vetores do ponto para a coleção nova, calculando o BM25 se faltar"""
+    vector = point.vector
+    if not sparse:
+        return vector.get("") if isinstance(vector, dict) else vector
+    vectors = dict(vector) if isinstance(vector, dict) else {"": vector}
+    if SPARSE_VECTOR_NAME not in vectors:
+        vectors[SPARSE_VECTOR_NAME] = sparse_encoder.encode_document((point.payload or {}).get("content", ""))
+    return vectors
+
+
+async def _copy_points(
+    client: AsyncQdrantClient, source: str, target: str, batch_size: int, sparse: bool
+) -> int:
+    copied = 0
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            await client.upsert(
+                collection_name=target,
+                points=[
+                    models.PointStruct(id=point.id, vector=_point_vector(point, sparse), payload=point.payload)
+                    for point in points
+                ],
+                wait=True,
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+async def migrate_collection(
+    client: AsyncQdrantClient,
+    collection: str,
+    config: Settings = settings,
+    batch_size: int = 512,
+) -> int:
+    """
+    Reconstruir uma coleção existente com a configuração atual
+
+    Os pontos (vetores e payload) são copiados para uma coleção temporária,
+    a coleção é recriada e os pontos voltam para ela. Os vetores densos não
+    são recalculados, então a dimensão precisa ser a mesma; o vetor esparso
+    BM25 é calculado a partir do conteúdo quando a coleção antiga não o tem.
+
+    Não é sem downtime: entre recriar a coleção e terminar a cópia de volta,
+    buscas retornam resultados incompletos e ingestões concorrentes podem se
+    perder. Executar com a API parada (ou sem ingestões em andamento).
+    Interrompida, a migração é retomada na próxima execução a partir da
+    coleção temporária.
+
+    Returns:
+        Número de pontos migrados
+
+    Raises:
+        ValueError: Dimensão da coleção diferente de `embedder_dimensions`
+    """
+    if not await client.collection_exists(collection):
+        await create_collection(client, collection, config)
+        return 0
+
+    info = await client.get_collection(collection)
+    vectors = info.config.params.vectors
+    size = vectors.size if isinstance(vectors, models.VectorParams) else None
+    if size != config.embedder_dimensions:
+        raise ValueError(
+            f"Coleção {collection} tem vetores de dimensão {size}, esperado "
+            f"{config.embedder_dimensions}; reindexe os documentos em vez de migrar"
+        )
+
+    sparse = config.hybrid_search_enabled
+    temp = f"{collection}__migration"
+    if await client.collection_exists(temp):
+        # Migração anterior interrompida: se a temporária tem mais pontos, a
+        # coleção já foi recriada e os pontos completos estão na temporária
+        current = (await client.count(collection, exact=True)).count
+        saved = (await client.count(temp, exact=True)).count
+        if saved > current:
+            await _copy_points(client, temp, collection, batch_size, sparse)
+        await client.delete_collection(temp)
+
+    await client.create_collection(collection_name=temp, **collection_params(config))
+    copied = await _copy_points(client, collection, temp, batch_size, sparse)
+    await recreate_collection(client, collection, config)
+    await _copy_points(client, temp, collection, batch_size, sparse)
+    await client.delete_collection(temp)
+
+    logger.info(f"🗂️ Coleção {collection} migrada: {copied} pontos")
+    return copied
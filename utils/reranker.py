@@ -0,0 +1,217 @@
+"""
+Rerank local dos resultados da knowledge base
+- Cross-encoder ONNX (FastEmbed) executado em pool de threads
+- Orçamento de latência por busca: sem tempo restante, o rerank é pulado
+- Com prazo e todas as threads ocupadas, o rerank também é pulado: um
+  rerank que estourou o prazo continua rodando na thread e não pode
+  acumular fila
+- Métricas de tempo de rerank e distribuição dos scores
+"""
+
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from utils.settings import settings
+
+if TYPE_CHECKING:
+    from utils.knowledge_service import SearchHit
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+class CrossEncoderReranker:
+    """
+    Reordena candidatos com um cross-encoder (query + chunk → relevância)
+
+    - O modelo é carregado na primeira chamada (ou em `warmup()`) e
+      compartilhado pelas threads do pool
+    - `rerank()` respeita um prazo: se acabar antes do rerank terminar,
+      devolve os candidatos na ordem original
+    - Com prazo, só submete se houver thread livre (`workers`); reranks
+      abandonados por timeout seguem ocupando a thread até terminar
+    - Chunks com score abaixo de `min_score` são descartados
+
+    Args:
+        model_name: Modelo de rerank do FastEmbed
+        workers: Threads do pool (reranks simultâneos)
+        onnx_threads: Threads do ONNX Runtime
+        min_score: Score mínimo para manter um chunk (None = sem corte)
+        window: Reranks recentes considerados nas métricas
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int = 1,
+        onnx_threads: Optional[int] = None,
+        min_score: Optional[float] = None,
+        window: int = 1000,
+    ):
+        self.model_name = model_name
+        self.workers = workers
+        self.onnx_threads = onnx_threads
+        self.min_score = min_score
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0  # Scorings submetidos ainda não terminados (inclusive abandonados)
+        self._in_flight_lock = threading.Lock()
+        self._durations: Deque[float] = deque(maxlen=window)
+        self._top_scores: Deque[float] = deque(maxlen=window)
+        self._scores: Deque[float] = deque(maxlen=window * 10)
+        self._stats = {"reranked": 0, "skipped_budget": 0, "skipped_busy": 0, "timeouts": 0, "errors": 0, "dropped": 0}
+
+    def _load_model(self) -> Any:
+        with self._model_lock:
+            if self._model is None:
+                from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+                start = time.perf_counter()
+                self._model = TextCrossEncoder(model_name=self.model_name, threads=self.onnx_threads)
+                logger.info(f"🔀 Reranker {self.model_name} carregado em {time.perf_counter() - start:.1f}s")
+        return self._model
+
+    def _score(self, query: str, documents: List[str]) -> List[float]:
+        """Scores do cross-encoder (executado no pool)"""
+        return [float(score) for score in self._load_model().rerank(query, documents)]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reranker")
+        return self._executor
+
+    def _submit(self, query: str, documents: List[str]) -> Future:
+        """Submeter um scoring ao pool contando-o até a thread terminar"""
+        with self._in_flight_lock:
+            self._in_flight += 1
+        future = self._get_executor().submit(self._score, query, documents)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future) -> None:
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    async def warmup(self) -> None:
+        """Carregar o modelo antecipadamente (evita a espera na primeira busca)"""
+        await asyncio.get_running_loop().run_in_executor(self._get_executor(), self._load_model)
+
+    async def rerank(
+        self,
+        query: str,
+        hits: List["SearchHit"],
+        top_k: int,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List["SearchHit"], bool]:
+        """
+        Reordenar candidatos pelo score do cross-encoder
+
+        Args:
+            query: Texto da busca
+            hits: Candidatos (ordem da busca vetorial)
+            top_k: Número de resultados
+            timeout: Tempo máximo em segundos (None = sem limite e aguarda thread
+                livre; <= 0 ou todas as threads ocupadas pula o rerank)
+
+        Returns:
+            (resultados, True se o rerank foi aplicado)
+        """
+        if not hits:
+            return hits, False
+        if timeout is not None and timeout <= 0:
+            self._stats["skipped_budget"] += 1
+            return hits[:top_k], False
+
+        if timeout is not None and self._in_flight >= self.workers:
+            self._stats["skipped_busy"] += 1
+            return hits[:top_k], False
+
+        start = time.perf_counter()
+        future = asyncio.wrap_future(self._submit(query, [hit.content for hit in hits]))
+        try:
+            scores = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            return hits[:top_k], False
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"❌ Erro no rerank: {e}")
+            return hits[:top_k], False
+
+        self._durations.append((time.perf_counter() - start) * 1000)
+        self._scores.extend(scores)
+        self._top_scores.append(max(scores))
+        self._stats["reranked"] += 1
+
+        ranked = sorted(
+            (replace(hit, rerank_score=score) for hit, score in zip(hits, scores)),
+            key=lambda hit: hit.rerank_score,
+            reverse=True,
+        )
+        if self.min_score is not None:
+            kept = [hit for hit in ranked if hit.rerank_score >= self.min_score]
+            self._stats["dropped"] += len(ranked) - len(kept)
+            ranked = kept
+        return ranked[:top_k], True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores, tempo de rerank (ms) e distribuição dos scores recentes"""
+        durations, scores, top_scores = list(self._durations), list(self._scores), list(self._top_scores)
+        return {
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            **self._stats,
+            "in_flight": self._in_flight,
+            "rerank_ms": {
+                "p50": _percentile(durations, 0.5),
+                "p95": _percentile(durations, 0.95),
+                "max": round(max(durations), 3) if durations else None,
+            },
+            "scores": {
+                "min": round(min(scores), 3) if scores else None,
+                "p25": _percentile(scores, 0.25),
+                "p50": _percentile(scores, 0.5),
+                "p75": _percentile(scores, 0.75),
+                "max": round(max(scores), 3) if scores else None,
+                "mean": round(statistics.fmean(scores), 3) if scores else None,
+            },
+            "top_score_p50": _percentile(top_scores, 0.5),
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """
+    Retorna o reranker configurado
+
+    Returns:
+        Instância de CrossEncoderReranker
+    """
+    return CrossEncoderReranker(
+        model_name=settings.rerank_model,
+        workers=settings.rerank_workers,
+        onnx_threads=settings.rerank_onnx_threads or None,
+        min_score=settings.rerank_min_score,
+    )
+
+
+# Instância singleton do reranker (modelo carregado sob demanda)
+reranker = get_reranker()
@@ -0,0 +1,184 @@
+"""
+Políticas de resiliência para chamadas externas
+- Retry com backoff exponencial e jitter
+- Orçamento de retries (evita tempestade de retries)
+- Circuit breaker
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada porque o circuito está aberto"""
+
+
+@dataclass
+class RetryPolicy:
+    """Configuração de retry com backoff exponencial e jitter"""
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+    retry_on_status: tuple = (429, 502, 503, 504)
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Calcular espera antes da próxima tentativa (full jitter)
+
+        Args:
+            attempt: Número da tentativa que falhou (1, 2, ...)
+
+        Returns:
+            Tempo de espera em segundos
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """
+    Orçamento de retries proporcional ao volume de requisições
+
+    Cada requisição deposita `ratio` tokens e cada retry consome 1 token,
+    limitando os retries a ~ratio * requisições (mais um mínimo por segundo).
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self._exhausted = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.max_tokens, self._tokens + elapsed * self.min_per_second)
+
+    def deposit(self) -> None:
+        """Registrar uma requisição"""
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """Consumir um token para um retry (False se o orçamento acabou)"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self._exhausted += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tokens": round(self._tokens, 2),
+            "exhausted": self._exhausted,
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estados closed -> open -> half_open
+
+    - closed: chamadas passam; falhas consecutivas abrem o circuito
+    - open: chamadas falham imediatamente até `recovery_timeout`
+    - half_open: uma chamada de teste; sucesso fecha, falha reabre
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._open_count = 0
+        self._open_seconds = 0.0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual (transiciona open -> half_open após o timeout)"""
+        if self._state == self.OPEN and self._opened_at is not None:
+            if time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Verificar se a chamada pode prosseguir
+
+        Returns:
+            True se a chamada é o teste do half_open (liberar com `release_probe`)
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto
+        """
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            self._rejected += 1
+            raise CircuitOpenError("Circuito aberto: serviço indisponível")
+        if state == self.HALF_OPEN:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Registrar chamada bem-sucedida"""
+        if self._state != self.CLOSED:
+            self._close()
+        self._failures = 0
+
+    def release_probe(self) -> None:
+        """
+        Liberar a chamada de teste do half_open
+
+        Chamado ao fim da chamada de teste: se ela terminou sem registrar
+        sucesso ou falha (outra exceção, cancelamento), a próxima chamada
+        pode testar o serviço.
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registrar falha"""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self._state != self.OPEN:
+            self._open_count += 1
+        if self._state == self.HALF_OPEN and self._opened_at is not None:
+            self._open_seconds += time.monotonic() - self._opened_at
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def _close(self) -> None:
+        if self._opened_at is not None:
+            self._open_seconds += time.monotonic() - self._opened_at
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        open_seconds = self._open_seconds
+        if self._opened_at is not None:
+            open_seconds += time.monotonic() - self._opened_at
+
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "open_count": self._open_count,
+            "open_seconds": round(open_seconds, 1),
+            "rejected": self._rejected,
+        }
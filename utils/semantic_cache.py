@@ -0,0 +1,236 @@
+"""
+Cache semântico de intents (NL -> SQL) baseado em embeddings
+- Literais da intent (números, datas, códigos e trechos entre aspas) precisam
+  coincidir: "vendas 2023" e "vendas 2024" têm embeddings quase iguais,
+  mas SQLs diferentes
+- As palavras de conteúdo (sem stopwords e acentos) também: "região norte" e
+  "região sul", "clientes ativos" e "inativos", "maior" e "menor"
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_intent(intent: str) -> str:
+    """
+    Normalizar intent para comparação (minúsculas, sem acentos e
+    pontuação, espaços colapsados)
+    """
+    text = unicodedata.normalize("NFKD", intent.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+# Tokens com dígitos (anos, valores, datas, códigos como Q3 ou SKU-42)
+_NUMERIC_RE = re.compile(r"\w*\d+(?:[.,/:-]\d+)*\w*")
+# Trechos entre aspas (nomes de clientes, produtos, regiões...)
+_QUOTED_RE = re.compile(r'"([^"]+)"|“([^”]+)”|\'([^\']+)\'')
+
+
+def intent_literals(intent: str) -> Tuple[str, ...]:
+    """
+    Literais que mudam o SQL mesmo com embeddings próximos
+
+    Returns:
+        Tupla ordenada (comparação sem depender da posição na frase)
+    """
+    text = intent.lower()
+    quoted = [normalize_intent(next(group for group in match if group)) for match in _QUOTED_RE.findall(text)]
+    numeric = _NUMERIC_RE.findall(_QUOTED_RE.sub(" ", text))
+    return tuple(sorted(quoted + numeric))
+
+
+# Palavras que não mudam o SQL (já normalizadas: minúsculas, sem acentos).
+# Negações (nao, sem) e quantificadores (todos, total) ficam de fora de propósito.
+_STOPWORDS = frozenset("""
+    a o as os um uma uns umas e ou de da do das dos em na no nas nos ao aos
+    por pela pelo pelas pelos para pra com que qual quais quanto quantos quanta
+    quantas como cada me mostre mostrar liste listar exiba exibir ver quero
+    gostaria saber foi foram sao ha tem
+    the of in on for to by and what which show list
+""".split())
+
+
+def intent_terms(intent: str) -> FrozenSet[str]:
+    """
+    Palavras de conteúdo da intent (sem stopwords, acentos e plural simples)
+
+    Intents só reaproveitam o SQL uma da outra com o mesmo conjunto de termos;
+    o embedding cobre ordem, acentuação e stopwords diferentes.
+    """
+    terms = set()
+    for word in normalize_intent(intent).split():
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+@dataclass
+class _Scope:
+    """Índice em memória de um db_source"""
+    vectors: np.ndarray
+    intents: List[str] = field(default_factory=list)
+    sqls: List[str] = field(default_factory=list)
+    literals: List[Tuple[str, ...]] = field(default_factory=list)
+    terms: List[FrozenSet[str]] = field(default_factory=list)
+
+
+class SemanticIntentCache:
+    """
+    Índice em memória de intents já convertidas em SQL
+
+    - Embeddings normalizados (cosseno = produto interno)
+    - Busca limitada ao mesmo db_source
+    - Reaproveita o SQL do vizinho mais próximo acima do threshold cujos
+      literais (números, datas, códigos, trechos entre aspas) e palavras de
+      conteúdo são iguais
+    - Near-miss: melhor vizinho logo abaixo do threshold (ajuda a calibrar)
+    - Vizinhos acima do threshold recusados pelos literais/termos são
+      registrados no log com o score (ajuda a calibrar o threshold)
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        threshold: float = 0.92,
+        near_miss_margin: float = 0.05,
+        max_entries: int = 2048,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.near_miss_margin = near_miss_margin
+        self.max_entries = max_entries
+        self._scopes: Dict[str, _Scope] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._near_misses = 0
+        self._literal_mismatches = 0
+        self._term_mismatches = 0
+
+    def embed(self, intent: str) -> np.ndarray:
+        """Gerar embedding normalizado da intent"""
+        vector = np.asarray(
+            self.embedder.get_embedding(normalize_intent(intent)),
+            dtype=np.float32,
+        )
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup_vector(
+        self,
+        vector: np.ndarray,
+        db_source: str,
+        literals: Tuple[str, ...] = (),
+        terms: FrozenSet[str] = frozenset(),
+    ) -> Tuple[Optional[str], float]:
+        """
+        Buscar o SQL do vizinho mais próximo com os mesmos literais e termos
+
+        Returns:
+            (SQL ou None, score do melhor vizinho)
+        """
+        with self._lock:
+            scope = self._scopes.get(db_source)
+            if scope is None or not scope.sqls:
+                self._misses += 1
+                return None, 0.0
+
+            scores = scope.vectors @ vector
+            score = float(np.max(scores))
+
+            above = np.flatnonzero(scores >= self.threshold)
+            literal_match = False
+            for index in above[np.argsort(-scores[above])]:
+                if scope.literals[index] != literals:
+                    continue
+                literal_match = True
+                if scope.terms[index] == terms:
+                    self._hits += 1
+                    return scope.sqls[index], float(scores[index])
+
+            self._misses += 1
+            if len(above):
+                best = above[np.argmax(scores[above])]
+                if literal_match:
+                    self._term_mismatches += 1
+                else:
+                    self._literal_mismatches += 1
+                logger.info(
+                    f"🔎 Cache semântico: vizinho recusado ({score:.3f}, "
+                    f"{'termos' if literal_match else 'literais'} diferentes): {scope.intents[best][:50]}"
+                )
+                return None, score
+            if score >= self.threshold - self.near_miss_margin:
+                self._near_misses += 1
+            return None, score
+
+    def add_vector(self, vector: np.ndarray, intent: str, db_source: str, sql: str) -> None:
+        """Adicionar intent -> SQL ao índice do db_source"""
+        with self._lock:
+            scope = self._scopes.get(db_source)
+            if scope is None:
+                scope = _Scope(vectors=np.empty((0, vector.shape[0]), dtype=np.float32))
+                self._scopes[db_source] = scope
+
+            scope.vectors = np.vstack([scope.vectors, vector[np.newaxis, :]])
+            scope.intents.append(intent)
+            scope.sqls.append(sql)
+            scope.literals.append(intent_literals(intent))
+            scope.terms.append(intent_terms(intent))
+
+            # Descartar as entradas mais antigas ao exceder o limite
+            overflow = len(scope.sqls) - self.max_entries
+            if overflow > 0:
+                scope.vectors = scope.vectors[overflow:]
+                del scope.intents[:overflow]
+                del scope.sqls[:overflow]
+                del scope.literals[:overflow]
+                del scope.terms[:overflow]
+
+    async def alookup(self, intent: str, db_source: str) -> Tuple[Optional[str], np.ndarray]:
+        """
+        Buscar intent semelhante (embedding fora do event loop)
+
+        Returns:
+            (SQL ou None, embedding da intent para reaproveitar no add)
+        """
+        vector = await asyncio.to_thread(self.embed, intent)
+        sql, _ = self.lookup_vector(vector, db_source, intent_literals(intent), intent_terms(intent))
+        return sql, vector
+
+    def clear(self) -> None:
+        """Limpar o índice"""
+        with self._lock:
+            self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache semântico"""
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "near_misses": self._near_misses,
+                "literal_mismatches": self._literal_mismatches,
+                "term_mismatches": self._term_mismatches,
+                "total": total,
+                "hit_rate": f"{hit_rate:.1f}%",
+                "entries": sum(len(scope.sqls) for scope in self._scopes.values()),
+                "threshold": self.threshold,
+            }
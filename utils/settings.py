@@ -1,6 +1,8 @@
 """
 Configurações da aplicação usando Pydantic Settings
 """
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,16 +19,100 @@ class Settings(BaseSettings):
     # Configurações do Vector DB
     vector_db_url: str = "http://localhost:6333"
     vector_db_collection: str = "agno-rag-api"
+    vector_db_prefer_grpc: bool = True  # gRPC (porta abaixo) para upserts e buscas
+    vector_db_grpc_port: int = 6334
+
+    # Coleção do Qdrant (criação e scripts/migrate_collection.py)
+    vector_db_on_disk: bool = True  # Vetores originais em disco (memmap); em RAM ficam os quantizados
+    vector_db_on_disk_payload: bool = True
+    vector_db_hnsw_m: int = 16
+    vector_db_hnsw_ef_construct: int = 100
+    vector_db_hnsw_on_disk: bool = False
+    vector_db_quantization: str = "scalar"  # none, scalar (int8) ou binary
+    vector_db_quantization_quantile: float = 0.99
+    vector_db_quantization_always_ram: bool = True  # Vetores quantizados sempre em RAM
+    vector_db_quantization_rescore: bool = True  # Recalcular score com os vetores originais
+    vector_db_quantization_oversampling: float = 2.0  # Candidatos = limit * oversampling
+
+    # Busca híbrida (BM25 esparso + denso, fusão RRF)
+    hybrid_search_enabled: bool = True  # Vetores esparsos BM25 na coleção e na ingestão
+    knowledge_search_mode: str = "hybrid"  # Padrão das buscas: dense, sparse ou hybrid
+    hybrid_prefetch_multiplier: int = 4  # Candidatos de cada busca = limit * multiplicador
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    bm25_avg_doc_len: float = 120.0  # Tamanho médio dos chunks em termos
+
+    # Rerank com cross-encoder local (ONNX)
+    rerank_enabled: bool = False  # Padrão das buscas (pode ser ligado por requisição)
+    rerank_model: str = "Xenova/ms-marco-MiniLM-L-6-v2"  # Multilíngue: jinaai/jina-reranker-v2-base-multilingual
+    rerank_candidates: int = 20  # Candidatos buscados no Qdrant para o rerank
+    rerank_budget_ms: float = 300.0  # Orçamento da busca (Qdrant + rerank); estourado = ordem original
+    rerank_min_score: Optional[float] = None  # Descartar chunks com score abaixo (None = sem corte)
+    rerank_workers: int = 1  # Threads do pool de rerank
+    rerank_onnx_threads: int = 0  # Threads do ONNX Runtime (0 = padrão)
+    rerank_warmup: bool = True  # Carregar o modelo no startup (se rerank_enabled)
     embedder_model: str = "sentence-transformers/all-MiniLM-L6-v2"  # Modelos (https://qdrant.github.io/fastembed/examples/Supported_Models/)
     embedder_dimensions: int = 384
 
+    # Serviço de embeddings (micro-batching)
+    embedding_workers: int = 0  # Processos/threads de embedding, um modelo em cada (0 = até 2)
+    embedding_use_processes: bool = True  # False = threads no mesmo processo
+    embedding_onnx_threads: int = 1  # Threads do ONNX Runtime por worker
+    embedding_batch_size: int = 32  # Máximo de textos por lote
+    embedding_batch_wait_ms: float = 5.0  # Espera máxima para completar um lote
+
+    # Cache de embeddings de queries de busca
+    embedding_query_cache_enabled: bool = True
+    embedding_query_cache_max_entries: int = 4096
+    embedding_query_cache_max_bytes: int = 16 * 1024 * 1024  # 16 MB
+    embedding_query_cache_path: str = ""  # Arquivo SQLite compartilhado ("" = só memória)
+    embedding_query_cache_disk_max_entries: int = 100_000
+
     # Configurações do Agent
     debug_mode: bool = True
+    agent_pool_max_size: int = 256  # Máximo de sessões (agents) mantidas em memória
+    agent_pool_anonymous_max_size: int = 32  # Sessões de requests sem session_id (pool separado)
+    agent_max_tokens: int = 2000  # Máximo de tokens na resposta
+
+    # Orçamento de contexto das chamadas ao LLM (tokens)
+    llm_max_input_tokens: int = 8000  # Teto do prompt (limite de TPM do Groq); 0 = só a janela do modelo
+    context_tokenizer_path: str = ""  # tokenizer.json local ("" = estimativa por caracteres)
+    context_chars_per_token: float = 3.5  # Estimativa sem tokenizer
+    context_knowledge_tokens: int = 3000  # Chunks da knowledge base por run
+    context_tool_output_tokens: int = 2000  # Saídas de tools somadas por run
+    context_history_tokens: int = 2000  # Turnos anteriores da sessão
+    context_history_summary_tokens: int = 300  # Resumo dos turnos que não couberam
+    context_history_tool_calls: int = 0  # Resultados de tools de turnos anteriores mantidos no histórico
+    context_min_chunk_overlap: int = 20  # Sobreposição mínima (caracteres) recortada entre chunks
 
     # Configurações de chunking para JSON
     json_chunk_size: int = 500
     json_overlap: int = 50
 
+    # Jobs de ingestão (background)
+    ingestion_workers: int = 2  # Jobs processados em paralelo
+    ingestion_batch_size: int = 64  # Chunks por lote de embedding/upsert
+    ingestion_jobs_dir: str = "data/ingestion_jobs"  # Estado dos jobs e arquivos enviados
+    ingestion_jobs_keep_finished: int = 200  # Jobs finalizados mantidos para consulta
+    pdf_parse_workers: int = 0  # Processos para extrair texto de PDFs (0 = número de CPUs, 1 = sequencial)
+    pdf_pages_per_task: int = 8  # Páginas por tarefa no pool de PDF
+    knowledge_hash_index_path: str = "data/chunk_hashes.sqlite"  # Hashes dos chunks por origem (dedup)
+    knowledge_count_cache_ttl: float = 30.0  # Segundos de cache do total na listagem de documentos
+    knowledge_export_batch_size: int = 512  # Pontos por página do scroll na exportação NDJSON
+    qdrant_upsert_batch_size: int = 256  # Pontos por upsert
+    qdrant_upsert_parallelism: int = 4  # Upserts simultâneos por job
+    qdrant_upsert_wait: bool = False  # True = cada lote espera a indexação (o último sempre espera)
+
+    # Crawler de URLs (ingestão)
+    crawler_enabled: bool = True  # False = WebsiteReader sequencial do agno
+    crawler_concurrency: int = 8  # Requisições simultâneas no total
+    crawler_per_host_concurrency: int = 4  # Requisições simultâneas por host
+    crawler_per_host_delay: float = 0.0  # Intervalo mínimo (s) entre requisições ao mesmo host
+    crawler_timeout: float = 10.0
+    crawler_user_agent: str = "agno-rag-api"
+    crawler_respect_robots: bool = True
+    crawler_cache_path: str = "data/crawler_cache.sqlite"  # ETag/Last-Modified ("" = desabilitado)
+
     # Database URL
     postgres_user: str = "postgres"
     postgres_password: str = "postgres123"
@@ -35,6 +121,47 @@ class Settings(BaseSettings):
 
     wren_url: str = "http://localhost:8000"
 
+    # Pool de conexões HTTP do Wren
+    wren_max_connections: int = 100
+    wren_max_keepalive_connections: int = 20
+    wren_keepalive_expiry: float = 30.0  # Segundos
+    wren_http2: bool = False  # Requer o extra http2 (`uv sync --extra http2`)
+    wren_connect_timeout: float = 5.0
+    wren_read_timeout: float = 60.0
+    wren_write_timeout: float = 10.0
+    wren_pool_timeout: float = 10.0  # Espera por uma conexão livre no pool
+
+    # Retry e circuit breaker do Wren
+    wren_retry_max_attempts: int = 3  # Total de tentativas (1 = sem retry)
+    wren_retry_base_delay: float = 0.2  # Segundos
+    wren_retry_max_delay: float = 2.0  # Segundos
+    wren_retry_budget_ratio: float = 0.2  # Retries por requisição (orçamento)
+    wren_breaker_failure_threshold: int = 5  # Falhas consecutivas para abrir
+    wren_breaker_recovery_timeout: float = 30.0  # Segundos até testar novamente
+
+    # Cache do Wren: intent -> SQL (longa duração)
+    wren_sql_cache_max_entries: int = 4096
+    wren_sql_cache_max_bytes: int = 8 * 1024 * 1024  # 8 MB
+    wren_sql_cache_ttl: float = 86400  # Segundos (0 = sem expiração)
+
+    # Cache do Wren: SQL -> resultado (TTL curto, dados mudam)
+    wren_result_cache_max_entries: int = 512
+    wren_result_cache_max_bytes: int = 64 * 1024 * 1024  # 64 MB
+    wren_result_cache_ttl: float = 300  # Segundos (0 = sem expiração)
+
+    # Cache semântico de intents do Wren (embeddings)
+    wren_semantic_cache_enabled: bool = True
+    wren_semantic_cache_threshold: float = 0.92  # Similaridade de cosseno mínima
+    wren_semantic_cache_max_entries: int = 2048  # Por db_source
+
+    # Tempo máximo (segundos) que um chamador aguarda uma query idêntica em andamento
+    wren_inflight_timeout: float = 90
+
+    # Resultados do Wren
+    bi_tool_max_rows: int = 10  # Linhas buscadas/exibidas pela ferramenta do agent
+    bi_count_truncated_rows: bool = True  # Contar o total exato quando truncado
+    wren_export_page_size: int = 1000  # Linhas por página na exportação
+
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", case_sensitive=False
     )
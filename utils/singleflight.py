@@ -0,0 +1,84 @@
+"""
+Coalescência de chamadas concorrentes (single-flight)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Garante uma única execução em andamento por chave
+
+    - O primeiro chamador (líder) dispara a execução
+    - Chamadores concorrentes com a mesma chave aguardam o mesmo resultado
+    - Exceções são propagadas para todos os que aguardam
+    - O timeout é por chamador: quem desiste não cancela a execução dos demais
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = 0
+        self._coalesced = 0
+        self._timeouts = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Executar `fn` uma única vez por chave entre chamadores concorrentes
+
+        Args:
+            key: Chave de deduplicação
+            fn: Função assíncrona a executar
+            timeout: Tempo máximo de espera deste chamador (segundos)
+
+        Returns:
+            Resultado de `fn`
+
+        Raises:
+            asyncio.TimeoutError: Se o timeout do chamador expirar
+        """
+        task = self._inflight.get(key)
+
+        if task is None:
+            self._leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self._coalesced += 1
+            logger.debug(f"⏳ Aguardando execução em andamento: {key}")
+
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            # shield: o cancelamento/timeout de um chamador não afeta os demais
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise
+
+    def _on_done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Marcar exceção como consumida mesmo se todos os chamadores desistiram
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de coalescência"""
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+            "timeouts": self._timeouts,
+        }
@@ -0,0 +1,104 @@
+"""
+Vetores esparsos BM25 calculados localmente (sem modelo nem rede)
+- Tokens (incluindo códigos compostos como SKUs: "NB-PRO-15") mapeados por hash
+- Documento: peso BM25 da frequência do termo (k1, b); o IDF é aplicado
+  pelo Qdrant (modifier=IDF na coleção)
+- Query: peso 1 para cada termo
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client import models
+
+from utils.settings import settings
+
+# Nome do vetor esparso na coleção (o denso continua sem nome)
+SPARSE_VECTOR_NAME = "bm25"
+
+_TOKEN_RE = re.compile(r"\w+(?:[-_./]\w+)*")
+_PART_RE = re.compile(r"[-_./]")
+
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das em no na nos nas por para com sem "
+    "e ou que se ao aos à às é são foi ser como mais menos qual quais quando onde "
+    "the of and or to in on for with is are".split()
+)
+
+
+def _strip_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Termos do texto: minúsculos, sem acentos e sem stopwords
+
+    Códigos compostos geram o termo inteiro e suas partes
+    ("NB-PRO-15" → "nb-pro-15", "nb", "pro", "15").
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(_strip_accents(text.lower())):
+        if token not in STOPWORDS:
+            tokens.append(token)
+        if _PART_RE.search(token):
+            tokens.extend(part for part in _PART_RE.split(token) if part and part not in STOPWORDS)
+    return tokens
+
+
+def token_index(token: str) -> int:
+    """Índice estável do termo no vetor esparso"""
+    return zlib.crc32(token.encode()) & 0x7FFFFFFF
+
+
+class BM25SparseEncoder:
+    """
+    Codificador BM25 de textos em vetores esparsos do Qdrant
+
+    Args:
+        k1: Saturação da frequência do termo
+        b: Normalização pelo tamanho do documento
+        avg_doc_len: Tamanho médio (em termos) dos chunks
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_len: float = 120.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        counts = Counter(token_index(token) for token in tokenize(text))
+        doc_len = sum(counts.values())
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len)
+        indices = list(counts)
+        values = [tf * (self.k1 + 1) / (tf + norm) for tf in counts.values()]
+        return models.SparseVector(indices=indices, values=values)
+
+    def encode_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        return [self.encode_document(text) for text in texts]
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        indices = sorted({token_index(token) for token in tokenize(text)})
+        return models.SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+def get_sparse_encoder() -> BM25SparseEncoder:
+    """
+    Retorna o codificador BM25 configurado
+
+    Returns:
+        Instância de BM25SparseEncoder
+    """
+    return BM25SparseEncoder(
+        k1=settings.bm25_k1,
+        b=settings.bm25_b,
+        avg_doc_len=settings.bm25_avg_doc_len,
+    )
+
+
+# Instância singleton do codificador
+sparse_encoder = get_sparse_encoder()
@@ -0,0 +1,253 @@
+"""
+Leitura incremental de arquivos para ingestão
+- PDF página a página (pypdf), opcionalmente em paralelo por faixas de páginas
+- JSON item a item (ijson)
+- Chunks gerados sob demanda: a memória fica limitada ao lote em processamento
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Any, AsyncIterator, Iterator, List, Optional, TypeVar
+
+import ijson
+from agno.knowledge.chunking.strategy import ChunkingStrategy
+from agno.knowledge.document.base import Document
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def iter_pdf_documents(path: str, name: str, chunking_strategy: ChunkingStrategy) -> Iterator[Document]:
+    """
+    Gerar chunks de um PDF, uma página por vez
+
+    Args:
+        path: Caminho do arquivo
+        name: Nome do documento
+        chunking_strategy: Estratégia de chunking aplicada a cada página
+
+    Yields:
+        Chunks (Document) com o número da página em meta_data
+    """
+    reader = _open_pdf(path, name)
+    for page_number in range(1, len(reader.pages) + 1):
+        yield from _chunk_pdf_page(reader, page_number, name, chunking_strategy)
+
+
+def _open_pdf(path: str, name: str) -> Any:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise ValueError(f'PDF "{name}" protegido por senha')
+    return reader
+
+
+def _chunk_pdf_page(
+    reader: Any, page_number: int, name: str, chunking_strategy: ChunkingStrategy
+) -> List[Document]:
+    """Extrair o texto de uma página (1-based) e dividir em chunks"""
+    text = reader.pages[page_number - 1].extract_text() or ""
+    if not text.strip():
+        return []
+
+    document = Document(
+        name=name,
+        id=f"{name}_{page_number}",
+        meta_data={"page": page_number},
+        content=text,
+    )
+    return chunking_strategy.chunk(document)
+
+
+def _parse_pdf_range(
+    path: str, name: str, start: int, end: int, chunking_strategy: ChunkingStrategy
+) -> List[Document]:
+    """Chunks das páginas [start, end] (executado em um processo do pool)"""
+    reader = _open_pdf(path, name)
+    chunks = []
+    for page_number in range(start, end + 1):
+        chunks.extend(_chunk_pdf_page(reader, page_number, name, chunking_strategy))
+    return chunks
+
+
+_pdf_pool: Optional[Executor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool(workers: int) -> Executor:
+    """Pool de processos compartilhado para parsing de PDF (criado sob demanda)"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: fork do processo da API (já com threads) pode travar o filho
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
+
+
+def close_pdf_pool() -> None:
+    """Encerrar o pool de parsing de PDF"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+def iter_pdf_documents_parallel(
+    path: str,
+    name: str,
+    chunking_strategy: ChunkingStrategy,
+    workers: int = 0,
+    pages_per_task: int = 8,
+) -> Iterator[Document]:
+    """
+    Gerar chunks de um PDF processando faixas de páginas em paralelo
+
+    - O documento é dividido em faixas de `pages_per_task` páginas
+    - Cada faixa é extraída e dividida em chunks num processo do pool
+    - Os chunks saem na ordem das páginas, com o número da página em meta_data
+    - No máximo 2 faixas por worker ficam em andamento (memória limitada)
+
+    Com um único worker ou PDFs pequenos, usa a leitura sequencial.
+
+    Args:
+        path: Caminho do arquivo
+        name: Nome do documento
+        chunking_strategy: Estratégia de chunking aplicada a cada página
+        workers: Processos do pool (0 = número de CPUs)
+        pages_per_task: Páginas por tarefa
+
+    Yields:
+        Chunks (Document) na ordem das páginas
+    """
+    workers = workers or os.cpu_count() or 1
+    total_pages = len(_open_pdf(path, name).pages)
+
+    if workers <= 1 or total_pages <= pages_per_task:
+        yield from iter_pdf_documents(path, name, chunking_strategy)
+        return
+
+    pool = get_pdf_pool(workers)
+    ranges = iter(
+        (start, min(start + pages_per_task - 1, total_pages))
+        for start in range(1, total_pages + 1, pages_per_task)
+    )
+    in_flight = deque()
+
+    def submit_next() -> None:
+        page_range = next(ranges, None)
+        if page_range is not None:
+            in_flight.append(pool.submit(_parse_pdf_range, path, name, *page_range, chunking_strategy))
+
+    for _ in range(workers * 2):
+        submit_next()
+
+    try:
+        while in_flight:
+            chunks = in_flight.popleft().result()
+            submit_next()
+            yield from chunks
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _iter_json_items(file: IO[bytes]) -> Iterator[Any]:
+    """
+    Itens de um JSON: elementos de um array de topo ou o objeto inteiro
+
+    O array de topo é lido incrementalmente (ijson), sem carregar o
+    arquivo inteiro.
+    """
+    first = file.read(1)
+    while first and first.isspace():
+        first = file.read(1)
+    file.seek(0)
+
+    if first == b"[":
+        yield from ijson.items(file, "item", use_float=True)
+    else:
+        yield from ijson.items(file, "", use_float=True)
+
+
+def iter_json_documents(path: str, name: str, chunking_strategy: ChunkingStrategy) -> Iterator[Document]:
+    """
+    Gerar chunks de um JSON, um item de topo por vez
+
+    Args:
+        path: Caminho do arquivo
+        name: Nome do documento
+        chunking_strategy: Estratégia de chunking aplicada a cada item
+
+    Yields:
+        Chunks (Document) com a posição do item em meta_data["page"]
+    """
+    with open(path, "rb") as file:
+        for page_number, item in enumerate(_iter_json_items(file), start=1):
+            document = Document(
+                name=name,
+                id=f"{name}_{page_number}",
+                meta_data={"page": page_number},
+                content=json.dumps(item, ensure_ascii=False, default=str),
+            )
+            yield from chunking_strategy.chunk(document)
+
+
+def next_batch(chunks: Iterator[Document], size: int) -> List[Document]:
+    """Próximo lote de chunks (lista vazia ao final)"""
+    return list(islice(chunks, size))
+
+
+async def iter_batches_in_thread(chunks: Iterator[T], size: int) -> AsyncIterator[List[T]]:
+    """Lotes de um iterador síncrono, cada lote lido em thread (fora do event loop)"""
+    while batch := await asyncio.to_thread(next_batch, chunks, size):
+        yield batch
+
+
+async def abatch(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    """Agrupar um iterador assíncrono em lotes de até `size` itens"""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def prefetch(batches: AsyncIterator[T], size: int = 1) -> AsyncIterator[T]:
+    """
+    Produzir os próximos `size` lotes em segundo plano enquanto o atual é consumido
+
+    Exceções do produtor são repassadas ao consumidor.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+    done = object()
+
+    async def produce() -> None:
+        try:
+            async for batch in batches:
+                await queue.put(batch)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
@@ -1,11 +1,38 @@
 """
 Configuração do Vector Database (Qdrant)
+- Embedder FastEmbed com micro-batching
+- Writer em lote para ingestão (upserts paralelos)
 """
 
-from agno.knowledge.embedder.fastembed import FastEmbedEmbedder
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from agno.knowledge.document.base import Document
 from agno.vectordb.qdrant import Qdrant
+from qdrant_client import models
 
+from utils.embedding_service import BatchedFastEmbedEmbedder, EmbeddingService, embedding_service
+from utils.qdrant_collection import ensure_collection, has_sparse_vectors
 from utils.settings import settings
+from utils.sparse_encoder import SPARSE_VECTOR_NAME, sparse_encoder
+
+
+def get_embedder() -> BatchedFastEmbedEmbedder:
+    """
+    Retorna instância configurada do embedder (FastEmbed)
+
+    Chamadas assíncronas são agrupadas em micro-lotes pelo embedding_service.
+
+    Returns:
+        Instância configurada de BatchedFastEmbedEmbedder
+    """
+    return BatchedFastEmbedEmbedder(
+        id=settings.embedder_model,
+        dimensions=settings.embedder_dimensions,
+        service=embedding_service,
+    )
 
 
 def get_vector_db() -> Qdrant:
@@ -18,12 +45,190 @@ def get_vector_db() -> Qdrant:
     return Qdrant(
         collection=settings.vector_db_collection,
         url=settings.vector_db_url,
-        embedder=FastEmbedEmbedder(
-            id=settings.embedder_model,
-            dimensions=settings.embedder_dimensions,
-        ),
+        embedder=embedder,
+        prefer_grpc=settings.vector_db_prefer_grpc,
+        grpc_port=settings.vector_db_grpc_port,
+    )
+
+
+class QdrantBatchWriter:
+    """
+    Gravação de chunks no Qdrant em lotes paralelos
+
+    - Embeddings gerados pelo EmbeddingService (micro-lotes)
+    - Pontos acumulados em lotes de `batch_size`
+    - Até `parallelism` upserts em andamento ao mesmo tempo
+    - Com `wait=False` os lotes intermediários não esperam a indexação;
+      `flush()` aguarda os pendentes e grava o último lote com wait=True
+      (barreira de consistência: ao retornar, tudo está visível na busca)
+
+    - `on_written` é chamado com os documentos de cada lote gravado com
+      sucesso (ex.: registrar hashes para retomar o job a partir dali)
+    - Falhas dos upserts em segundo plano ficam guardadas e são lançadas no
+      próximo `add()` ou no `flush()`; os documentos do lote não são
+      repassados ao `on_written`
+
+    O payload segue o formato do Qdrant do agno (name, meta_data, content,
+    content_id, content_hash), então busca e listagem não mudam. Se a coleção
+    tem o vetor esparso BM25, ele é gravado junto do denso (busca híbrida).
+    """
+
+    def __init__(
+        self,
+        vector_db: Qdrant,
+        embedding_service: EmbeddingService,
+        batch_size: int = 256,
+        parallelism: int = 4,
+        wait: bool = False,
+        on_written: Optional[Callable[[List[Document]], Awaitable[None]]] = None,
+    ):
+        self.vector_db = vector_db
+        self.embedding_service = embedding_service
+        self.batch_size = batch_size
+        self.wait = wait
+        self.on_written = on_written
+        self._slots = asyncio.Semaphore(parallelism)
+        self._buffer: List[Tuple[models.PointStruct, Document]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._errors: List[Exception] = []
+        self._points = 0
+        self._batches = 0
+        self._started_at: Optional[float] = None
+        self._sparse = False
+
+    @staticmethod
+    def point_id(document: Document, content_hash: str) -> str:
+        """Id estável do ponto: documento + origem"""
+        return hashlib.md5(f"{document.id}_{content_hash}".encode()).hexdigest()
+
+    async def add(self, documents: List[Document], content_hash: str) -> None:
+        """
+        Embedar documentos e enfileirar os pontos para gravação
+
+        Raises:
+            Exception: Erro de um upsert anterior ainda não reportado
+        """
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+            client, collection = self.vector_db.async_client, self.vector_db.collection
+            await ensure_collection(client, collection)
+            self._sparse = await has_sparse_vectors(client, collection)
+        await self._raise_failed()
+
+        contents = [doc.content for doc in documents]
+        if self._sparse:
+            dense, sparse = await asyncio.gather(
+                self.embedding_service.embed_many(contents),
+                asyncio.to_thread(sparse_encoder.encode_documents, contents),
+            )
+            vectors = [{"": d, SPARSE_VECTOR_NAME: s} for d, s in zip(dense, sparse)]
+        else:
+            vectors = await self.embedding_service.embed_many(contents)
+
+        for document, vector in zip(documents, vectors):
+            # Sem a chave de usuário: não existe no Qdrant do agno 2.2.x e
+            # o filtro IsEmpty das versões novas aceita a chave ausente
+            point = models.PointStruct(
+                id=self.point_id(document, content_hash),
+                vector=vector,
+                payload={
+                    "name": document.name,
+                    "meta_data": document.meta_data,
+                    "content": document.content.replace("\x00", "\ufffd"),
+                    "usage": None,
+                    "content_id": document.content_id,
+                    "content_hash": content_hash,
+                },
+            )
+            self._buffer.append((point, document))
+
+        # Mantém ao menos um ponto no buffer para a barreira do flush()
+        while len(self._buffer) > self.batch_size:
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            await self._slots.acquire()
+            task = asyncio.create_task(self._upsert_background(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """
+        Aguardar upserts pendentes e gravar o restante com wait=True
+
+        Raises:
+            Exception: Erro de algum upsert (o restante não é gravado)
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        await self._raise_failed()
+
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            await self._slots.acquire()
+            await self._upsert(batch, wait=True)
+
+    async def _upsert_background(self, batch: List[Tuple[models.PointStruct, Document]]) -> None:
+        try:
+            await self._upsert(batch, wait=self.wait)
+        except Exception as e:
+            self._errors.append(e)
+
+    async def _upsert(self, batch: List[Tuple[models.PointStruct, Document]], wait: bool) -> None:
+        try:
+            await self.vector_db.async_client.upsert(
+                collection_name=self.vector_db.collection,
+                points=[point for point, _ in batch],
+                wait=wait,
+            )
+            self._points += len(batch)
+            self._batches += 1
+        finally:
+            self._slots.release()
+
+        if self.on_written is not None:
+            await self.on_written([document for _, document in batch])
+
+    async def _raise_failed(self) -> None:
+        """Lançar o primeiro erro de upsert, após os lotes em andamento terminarem"""
+        if self._errors:
+            if self._tasks:
+                await asyncio.gather(*self._tasks)
+            raise self._errors[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0
+        return {
+            "points": self._points,
+            "batches": self._batches,
+            "seconds": round(elapsed, 2),
+            "points_per_second": round(self._points / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def get_batch_writer(
+    on_written: Optional[Callable[[List[Document]], Awaitable[None]]] = None,
+) -> QdrantBatchWriter:
+    """
+    Retorna um writer em lote configurado (um por ingestão)
+
+    Args:
+        on_written: Chamado com os documentos de cada lote gravado
+
+    Returns:
+        Instância de QdrantBatchWriter
+    """
+    return QdrantBatchWriter(
+        vector_db=vector_db,
+        embedding_service=embedding_service,
+        batch_size=settings.qdrant_upsert_batch_size,
+        parallelism=settings.qdrant_upsert_parallelism,
+        wait=settings.qdrant_upsert_wait,
+        on_written=on_written,
     )
 
 
+# Instância singleton do embedder (compartilhada com outros caches/índices)
+embedder = get_embedder()
+
 # Instância singleton do vector DB
 vector_db = get_vector_db()